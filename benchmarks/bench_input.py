@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+输入吞吐量基准测试
+通过ActionExecutor向输入后端发送大量点击和拖拽，统计每秒事件数和平滑移动的调度抖动。
+默认使用记录后端（不需要显示器），Linux下可用 --backend xtest 在Xvfb中测量真实注入开销
+
+用法:
+    python benchmarks/bench_input.py [--backend recording] [--clicks 500] [--drags 20] [--save]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.action_executor import ActionExecutor
+from src.core.input_backend import RecordingInputBackend, create_input_backend
+
+
+class TimingBackend(RecordingInputBackend):
+    """在真实后端外包一层记录：事件照常发送，同时记录时间戳"""
+    
+    def __init__(self, inner):
+        super().__init__(inner.move_rate)
+        self.inner = inner
+        self.name = f"{inner.name}+timing"
+    
+    def _move_now(self, x, y, scheduled=None):
+        self.inner._move_now(x, y, scheduled)
+        super()._move_now(x, y, scheduled)
+    
+    def position(self):
+        return self.inner.position()
+    
+    def mouse_down(self, button='left'):
+        self.inner.mouse_down(button)
+        super().mouse_down(button)
+    
+    def mouse_up(self, button='left'):
+        self.inner.mouse_up(button)
+        super().mouse_up(button)
+    
+    def press(self, key):
+        self.inner.press(key)
+        super().press(key)
+    
+    def hotkey(self, *keys):
+        self.inner.hotkey(*keys)
+        super().hotkey(*keys)
+    
+    def close(self):
+        self.inner.close()
+
+
+def run_clicks(executor, backend, count: int) -> dict:
+    """连续提交点击，测量不带移动时长时的事件吞吐量"""
+    backend.clear()
+    start = time.monotonic()
+    for i in range(count):
+        executor.click(100 + i % 200, 100 + i % 150, move_duration=0)
+    executor.flush()
+    stats = backend.summary()
+    stats['actions_per_second'] = round(count / (time.monotonic() - start), 1)
+    return stats
+
+
+def run_drags(executor, backend, count: int, duration: float) -> dict:
+    """提交带时长的拖拽，测量平滑移动的调度抖动"""
+    backend.clear()
+    for i in range(count):
+        executor.drag([(100, 100), (400, 100), (400, 300)], duration)
+    executor.flush()
+    return backend.summary()
+
+
+def format_stats(stats: dict) -> str:
+    """格式化一组统计结果"""
+    return ', '.join(f"{key}={value}" for key, value in stats.items())
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="输入后端吞吐量和调度抖动基准测试")
+    parser.add_argument('--backend', default='recording', help="输入后端: recording、xtest 或 pyautogui")
+    parser.add_argument('--clicks', type=int, default=500, help="点击次数")
+    parser.add_argument('--drags', type=int, default=20, help="拖拽次数")
+    parser.add_argument('--drag-duration', type=float, default=0.1, help="每次拖拽的时长（秒）")
+    parser.add_argument('--save', action='store_true', help="将结果写入 logs/input_benchmark.md")
+    args = parser.parse_args()
+    
+    if args.backend == 'recording':
+        backend = RecordingInputBackend()
+    else:
+        backend = TimingBackend(create_input_backend(args.backend))
+    
+    executor = ActionExecutor(click_delay=0, backend=backend)
+    try:
+        click_stats = run_clicks(executor, backend, args.clicks)
+        drag_stats = run_drags(executor, backend, args.drags, args.drag_duration)
+    finally:
+        executor.stop()
+        backend.close()
+    
+    print(f"输入后端: {backend.name}")
+    print(f"点击吞吐量: {format_stats(click_stats)}")
+    print(f"拖拽调度抖动: {format_stats(drag_stats)}")
+    
+    if args.save:
+        from src.utils.logger import reset_logger
+        
+        logger = reset_logger("logs/input_benchmark.md")
+        logger.add_section("输入吞吐量基准测试", level=1)
+        logger.add_info(f"输入后端: {backend.name}")
+        logger.add_info(f"点击 ({args.clicks} 次): {format_stats(click_stats)}")
+        logger.add_info(f"拖拽 ({args.drags} 次, {args.drag_duration} 秒): {format_stats(drag_stats)}")
+        logger.finalize_session()
+        print("\n📋 结果已保存到 logs/input_benchmark.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+冷启动基准测试
+测量各个包在全新解释器中的导入耗时，并列出 -X importtime 统计的最慢模块
+
+用法:
+    python benchmarks/bench_startup.py [--runs 5] [--top 15] [--save]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils.import_profiler import measure_cold_start, measure_import_times, format_import_report
+
+
+# 需要跟踪的导入入口：只读工具使用的包不应加载任何重量级依赖
+TRACKED_MODULES = [
+    'src.utils',
+    'src.core',
+    'src.core.window_manager',
+    'src.core.screenshot',
+    'src.recognition',
+]
+
+BASELINE_MODULE = 'sys'
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="冷启动导入耗时基准测试")
+    parser.add_argument('--runs', type=int, default=5, help="每个模块的冷启动次数")
+    parser.add_argument('--top', type=int, default=15, help="importtime报告显示的模块数")
+    parser.add_argument('--save', action='store_true', help="将结果写入 logs/startup_benchmark.md")
+    args = parser.parse_args()
+
+    baseline = measure_cold_start(BASELINE_MODULE, args.runs)
+    print(f"解释器基线: {baseline['median_ms']} ms (中位数, {args.runs} 次)")
+    print()
+    print(f"{'模块':<28}{'中位数(ms)':>12}{'净增(ms)':>12}  已加载的重量级依赖")
+
+    results = []
+    for module in TRACKED_MODULES:
+        stats = measure_cold_start(module, args.runs)
+        stats['overhead_ms'] = round(stats['median_ms'] - baseline['median_ms'], 1)
+        results.append(stats)
+        heavy = ', '.join(stats['heavy_modules_loaded']) or '无'
+        print(f"{module:<28}{stats['median_ms']:>12}{stats['overhead_ms']:>12}  {heavy}")
+
+    print()
+    print("src.core.screenshot 导入耗时排行（-X importtime）:")
+    records = measure_import_times('src.core.screenshot')
+    report = format_import_report(records, args.top)
+    print(report)
+
+    if args.save:
+        from src.utils.logger import reset_logger
+
+        logger = reset_logger("logs/startup_benchmark.md")
+        logger.add_section("冷启动基准测试", level=1)
+        logger.add_info(f"解释器基线: {baseline['median_ms']} ms")
+        for stats in results:
+            heavy = ', '.join(stats['heavy_modules_loaded']) or '无'
+            logger.add_info(
+                f"{stats['module']}: 中位数 {stats['median_ms']} ms, "
+                f"净增 {stats['overhead_ms']} ms, 重量级依赖: {heavy}"
+            )
+        logger.add_section("导入耗时排行")
+        logger.add_text(report)
+        logger.finalize_session()
+        print("\n📋 结果已保存到 logs/startup_benchmark.md")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+调色板校准工具
+从标注了纯色区域的样本截图生成地图调色板配置（templates/palettes/<地图名>.json），
+并报告每张样本中无法归类的像素比例
+
+用法:
+    # 列出截图中的主要颜色，帮助确定各类别的标注区域
+    python calibrate_palette.py --suggest 12 --frame screenshots/tokyo.png
+
+    # 按标注区域生成调色板，regions.json 形如 {"road": [[x, y, w, h], ...], "house_red": [...]}
+    python calibrate_palette.py --map tokyo --sample screenshots/tokyo.png:regions/tokyo.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from src.recognition.palette import PaletteLibrary, PaletteProfile, UNKNOWN, class_name
+
+
+def suggest_colors(frame: np.ndarray, count: int):
+    """用k-means列出截图中的主要颜色及其占比"""
+    pixels = frame[::4, ::4, :3].reshape(-1, 3).astype(np.float32)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+    _, labels, centers = cv2.kmeans(pixels, count, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+    shares = np.bincount(labels.ravel(), minlength=count) / len(labels)
+    print(f"{'BGR颜色':<20}{'占比':>8}")
+    for index in np.argsort(shares)[::-1]:
+        color = tuple(int(c) for c in centers[index])
+        print(f"{str(color):<20}{shares[index] * 100:>7.1f}%")
+
+
+def report_coverage(profile: PaletteProfile, frame: np.ndarray, name: str):
+    """打印样本帧的分类结果分布"""
+    classes = profile.classify(frame)
+    ids, counts = np.unique(classes, return_counts=True)
+    total = classes.size
+    unknown = counts[ids == UNKNOWN].sum() / total * 100
+    print(f"{name}: 未归类像素 {unknown:.1f}%")
+    for cid, count in sorted(zip(ids, counts), key=lambda item: -item[1])[:8]:
+        print(f"  {class_name(int(cid)):<20}{count / total * 100:>6.1f}%")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="地图调色板校准工具")
+    parser.add_argument('--map', help="地图名（配置文件名）")
+    parser.add_argument('--sample', action='append', default=[],
+                        help="样本截图和标注文件，格式为 截图路径:标注JSON路径，可重复")
+    parser.add_argument('--frame', help="--suggest 使用的截图")
+    parser.add_argument('--suggest', type=int, help="列出截图中的N种主要颜色")
+    parser.add_argument('--max-distance', type=float, default=40.0, help="最大颜色距离")
+    parser.add_argument('--palette-dir', help="配置目录，默认使用 recognition.palette_dir")
+    args = parser.parse_args()
+    
+    if args.suggest:
+        if not args.frame:
+            parser.error("--suggest 需要 --frame")
+        frame = cv2.imread(args.frame)
+        if frame is None:
+            parser.error(f"无法读取截图: {args.frame}")
+        suggest_colors(frame, args.suggest)
+        return
+    
+    if not args.map or not args.sample:
+        parser.error("生成调色板需要 --map 和至少一个 --sample")
+    
+    samples = []
+    for spec in args.sample:
+        frame_path, _, regions_path = spec.rpartition(':')
+        frame = cv2.imread(frame_path)
+        if frame is None:
+            parser.error(f"无法读取截图: {frame_path}")
+        with open(regions_path, 'r', encoding='utf-8') as f:
+            samples.append((frame, json.load(f)))
+    
+    profile = PaletteProfile.from_samples(args.map, samples, args.max_distance)
+    library = PaletteLibrary(args.palette_dir)
+    path = library.save(profile)
+    print(f"✅ 已保存 {len(profile.entries)} 个调色板条目到 {path}")
+    
+    for (frame, _), spec in zip(samples, args.sample):
+        report_coverage(profile, frame, spec.rpartition(':')[0])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 执行游玩按钮点击脚本
-使用确认正确的坐标(564, 497)执行实际点击操作
+通过界面布局索引定位游玩按钮（锚点匹配，窗口大小变化时自动重新锚定）并执行点击
 """
 
 import sys
@@ -16,7 +16,12 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 from src.utils.logger import get_logger, reset_logger
 from src.core.window_manager import WindowManager
 from src.core.screenshot import ScreenshotManager
-import pyautogui
+from src.core.coordinate_mapper import CoordinateMapper, IMAGE
+from src.core.action_executor import ActionExecutor
+from src.core.latency_tracker import LatencyTracker
+from src.core.frame import Frame
+from src.recognition.screen_classifier import ScreenClassifier, MAIN_MENU, UNKNOWN
+from src.recognition.ui_layout import UILayout
 
 
 def execute_play_button_click():
@@ -45,7 +50,7 @@ def execute_play_button_click():
         logger.add_section("点击前截图")
         window_region = window_manager.get_window_screenshot_region()
         screenshot_path = screenshot_manager.take_screenshot(
-            window_region, 
+            window_region,
             "点击前界面截图"
         )
         
@@ -56,46 +61,67 @@ def execute_play_button_click():
         logger.add_success("点击前截图成功")
         logger.add_image("点击前界面", screenshot_path)
         
-        # 使用确认正确的游玩按钮坐标
+        # 通过界面布局索引定位游玩按钮
         logger.add_section("游玩按钮坐标确认")
         
-        play_button_coords = (564, 497)  # 用户确认的正确坐标
+        img = cv2.imread(screenshot_path)
+        if img is None:
+            logger.add_error("无法读取截图")
+            return False
+        # 界面分类、布局定位和亮度分析共享同一帧的派生视图
+        frame = Frame(img)
+        
+        layout = UILayout(generation_source=lambda: window_manager.geometry_generation)
+        play_button = layout.locate(MAIN_MENU, 'play_button', frame)
+        if play_button is None:
+            logger.add_error("无法定位游玩按钮")
+            return False
+        play_button_coords = play_button['center']
         
         logger.add_success(f"游玩按钮坐标: {play_button_coords}")
-        logger.add_info("此坐标已通过标记图确认正确")
+        if play_button['anchored']:
+            logger.add_info("坐标由锚点匹配得到")
+        else:
+            logger.add_warning("锚点模板未匹配，使用布局中的名义位置")
+        
+        # 有界面参考特征时先确认当前界面
+        classifier = ScreenClassifier()
+        current_screen = MAIN_MENU
+        if classifier.ready:
+            current_screen = classifier.classify(frame)['screen']
+            logger.add_info(f"当前界面: {current_screen}")
+            if current_screen not in (MAIN_MENU, UNKNOWN):
+                logger.add_warning("当前不在主菜单，游玩按钮坐标可能无效")
         
         # 验证坐标有效性
-        img = cv2.imread(screenshot_path)
-        if img is not None:
-            height, width = img.shape[:2]
-            x, y = play_button_coords
+        height, width = img.shape[:2]
+        x, y = play_button_coords
+        
+        if 0 <= x < width and 0 <= y < height:
+            logger.add_success("坐标在有效范围内")
+            
+            # 分析按钮区域
+            roi_size = 50
+            x1 = max(0, x - roi_size)
+            y1 = max(0, y - roi_size)
+            x2 = min(width, x + roi_size)
+            y2 = min(height, y + roi_size)
             
-            if 0 <= x < width and 0 <= y < height:
-                logger.add_success("坐标在有效范围内")
+            gray_roi = frame.gray[y1:y2, x1:x2]
+            if gray_roi.size > 0:
+                mean_brightness = np.mean(gray_roi)
+                std_brightness = np.std(gray_roi)
                 
-                # 分析按钮区域
-                roi_size = 50
-                x1 = max(0, x - roi_size)
-                y1 = max(0, y - roi_size)
-                x2 = min(width, x + roi_size)
-                y2 = min(height, y + roi_size)
+                logger.add_info(f"按钮区域亮度: {mean_brightness:.1f}")
+                logger.add_info(f"亮度标准差: {std_brightness:.1f}")
                 
-                roi = img[y1:y2, x1:x2]
-                if roi.size > 0:
-                    gray_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-                    mean_brightness = np.mean(gray_roi)
-                    std_brightness = np.std(gray_roi)
-                    
-                    logger.add_info(f"按钮区域亮度: {mean_brightness:.1f}")
-                    logger.add_info(f"亮度标准差: {std_brightness:.1f}")
-                    
-                    if std_brightness > 15:
-                        logger.add_success("按钮区域确认为有效UI元素")
-                    else:
-                        logger.add_warning("按钮区域亮度变化较小，但继续执行")
-            else:
-                logger.add_error("坐标超出图片范围")
-                return False
+                if std_brightness > 15:
+                    logger.add_success("按钮区域确认为有效UI元素")
+                else:
+                    logger.add_warning("按钮区域亮度变化较小，但继续执行")
+        else:
+            logger.add_error("坐标超出图片范围")
+            return False
         
         # 创建点击位置标记
         logger.add_section("创建点击位置标记")
@@ -121,11 +147,14 @@ def execute_play_button_click():
         # 计算实际点击坐标
         logger.add_section("计算点击坐标")
         
-        window_left, window_top = window_region[0], window_region[1]
-        click_x = window_left + play_button_coords[0]
-        click_y = window_top + play_button_coords[1]
+        # 按钮坐标位于截图像素空间，经映射器换算窗口偏移和HiDPI缩放
+        mapper = CoordinateMapper()
+        mapper.update(window_region, window_manager.geometry_generation)
+        mapper.update_pixel_ratio(img.shape)
+        click_x, click_y = mapper.to_screen(*play_button_coords, source=IMAGE)
         
-        logger.add_info(f"窗口偏移: ({window_left}, {window_top})")
+        logger.add_info(f"窗口偏移: ({window_region[0]}, {window_region[1]})")
+        logger.add_info(f"截图像素比例: {mapper.pixel_ratio}")
         logger.add_info(f"游玩按钮相对坐标: {play_button_coords}")
         logger.add_info(f"游玩按钮绝对坐标: ({click_x}, {click_y})")
         
@@ -137,24 +166,36 @@ def execute_play_button_click():
         logger.add_info(f"坐标: {play_button_coords}")
         logger.add_info(f"功能: 进入游戏选择界面")
         
-        # 确保鼠标移动到正确位置
-        pyautogui.moveTo(click_x, click_y, duration=0.3)
-        time.sleep(0.2)
-        
-        # 执行点击
+        # 点击由执行器的工作线程完成（先移动到目标位置再点击）
         logger.add_info("执行点击...")
-        pyautogui.click(click_x, click_y)
+        latency_tracker = LatencyTracker(screenshot_manager)
+        latency_tracker.set_screen(current_screen)
+        probe = latency_tracker.begin(window_region)
+        executor = ActionExecutor()
+        future = executor.click(click_x, click_y)
+        # 点击一发出就开始检测画面变化，不等执行器的点击间隔结束
+        change = latency_tracker.complete(probe, future, timeout=5.0)
+        result = future.result(timeout=10)
+        executor.stop()
         logger.add_success("✅ 点击操作已执行！")
+        logger.add_info(f"点击耗时: {result['duration_s']:.2f}秒")
         
-        # 等待界面切换
+        # 等待界面切换：画面一有明显变化就返回，再等动画结束
         logger.add_section("等待界面切换")
         logger.add_info("等待界面切换...")
-        time.sleep(3)  # 给更多时间让界面完全加载
+        if change['changed']:
+            logger.add_success(f"检测到界面变化，响应延迟: {change['latency_s'] * 1000:.0f}毫秒")
+            stable = screenshot_manager.wait_for_stable(window_region, timeout=3.0)
+            logger.add_info(f"界面稳定耗时: {stable['elapsed_s'] * 1000:.0f}毫秒")
+        elif not change['issued']:
+            logger.add_warning("点击未能发出，无法测量响应延迟")
+        else:
+            logger.add_warning(f"{change['latency_s']:.1f}秒内未检测到界面变化")
         
         # 截取点击后的界面
         logger.add_section("点击后验证")
         after_screenshot_path = screenshot_manager.take_screenshot(
-            window_region, 
+            window_region,
             "点击后界面截图"
         )
         
@@ -163,10 +204,11 @@ def execute_play_button_click():
             logger.add_image("点击后界面", after_screenshot_path)
             
             # 对比两张图片验证界面是否切换
-            img1 = cv2.imread(screenshot_path)
+            img1 = frame.bgr
             img2 = cv2.imread(after_screenshot_path)
             
-            if img1 is not None and img2 is not None:
+            if img2 is not None:
+                after_frame = Frame(img2)
                 # 计算图片差异
                 diff = cv2.absdiff(img1, img2)
                 diff_mean = np.mean(diff)
@@ -179,20 +221,21 @@ def execute_play_button_click():
                     
                     # 简单分析新界面
                     logger.add_section("新界面分析")
-                    gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-                    mean_brightness2 = np.mean(gray2)
+                    if classifier.ready:
+                        logger.add_info(f"新界面: {classifier.classify(after_frame)['screen']}")
+                    mean_brightness2 = np.mean(after_frame.gray)
                     logger.add_info(f"新界面平均亮度: {mean_brightness2:.1f}")
                     
-                    if abs(mean_brightness2 - np.mean(cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY))) > 10:
+                    if abs(mean_brightness2 - np.mean(frame.gray)) > 10:
                         logger.add_success("新界面亮度明显不同，确认界面切换成功")
                     
                     return True
-                    
+                
                 elif diff_mean > 10:
                     logger.add_warning("界面有变化，但可能不是完整的页面切换")
                     logger.add_info("可能是动画效果或部分UI更新")
                     return True
-                    
+                
                 else:
                     logger.add_error("界面变化很小，可能点击无效")
                     logger.add_error("可能原因:")
@@ -206,7 +249,7 @@ def execute_play_button_click():
         else:
             logger.add_error("点击后截图失败")
             return False
-        
+    
     except Exception as e:
         logger.add_error(f"执行点击失败: {str(e)}")
         import traceback
@@ -221,7 +264,7 @@ def execute_play_button_click():
 def main():
     """主函数"""
     print("🎮 执行游玩按钮点击")
-    print("使用确认正确的坐标: (564, 497)")
+    print("通过界面布局索引定位游玩按钮")
     print("目标: 点击游玩按钮，进入下一个页面")
     print()
     
@@ -237,4 +280,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
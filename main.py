@@ -3,8 +3,12 @@
 Mini Motorways 自动化系统主启动脚本
 """
 
+import argparse
+import asyncio
 import sys
+import threading
 import time
+from collections import deque
 from pathlib import Path
 
 # 添加src目录到Python路径
@@ -16,7 +20,125 @@ from src.core.window_manager import WindowManager
 from src.core.screenshot import ScreenshotManager
 
 
-def main():
+async def run_game_loop(window_manager, screenshot_manager, duration=None,
+                        executor=None, classifier=None, map_state=None):
+    """
+    运行截图→识别→决策→操作的流水线游戏循环
+    
+    决策响应中的 actions 为操作列表（参考布局坐标）：
+    {'type': 'click', 'x': x, 'y': y} 或 {'type': 'drag', 'path': [[x, y], ...]}
+    
+    截图阶段顺便检测相对上一帧变化的区域，识别阶段只重新提取上次识别以来变化过的格子；
+    运行期间由窗口监视器跟踪窗口移动和缩放，截图区域和坐标映射随之更新
+    
+    Args:
+        window_manager: 已找到游戏窗口的窗口管理器
+        screenshot_manager: 截图管理器
+        duration: 运行时间（秒），None则一直运行
+        executor: 输入执行器，None则新建（结束时停止）
+        classifier: 界面分类器，None则新建
+        map_state: 增量地图状态，None则新建
+    
+    Returns:
+        GameLoop.summary() 的结果
+    """
+    from src.core.game_loop import GameLoop, LoopStage, CAPTURE, RECOGNIZE, DECIDE, ACT
+    from src.core.coordinate_mapper import CoordinateMapper
+    from src.core.action_executor import ActionExecutor
+    from src.core.window_watcher import WindowWatcher
+    from src.recognition.screen_classifier import ScreenClassifier, IN_GAME
+    from src.recognition.map_state import MapState
+    from src.remote.decision_client import DecisionClient
+    from src.remote.payload import PayloadEncoder
+    
+    config = get_config()
+    classifier = classifier or ScreenClassifier()
+    map_state = map_state or MapState()
+    mapper = CoordinateMapper()
+    # 订阅时立即推送一次当前区域，之后窗口每次移动或缩放都会推送
+    watcher = WindowWatcher(window_manager)
+    watcher.subscribe(screenshot_manager.on_window_region_changed)
+    watcher.subscribe(mapper.update)
+    owns_executor = executor is None
+    executor = executor or ActionExecutor()
+    
+    # (帧序号, 相对上一帧的变化区域)：截图和识别在不同线程，识别阶段可能跳过被丢弃的帧
+    region_history = deque(maxlen=64)
+    history_lock = threading.Lock()
+    previous = {'capture': None, 'map': None}
+    
+    def capture():
+        frame = screenshot_manager.grab_frame()
+        last = previous['capture']
+        regions = None if last is None else screenshot_manager.changed_regions(last.gray, frame.gray)
+        previous['capture'] = frame
+        with history_lock:
+            region_history.append((frame.seq, regions))
+        return frame
+    
+    def changed_since_map_update(frame):
+        """上次更新地图的帧到本帧之间所有截图的变化区域；记录缺失或尺寸变化时返回None（整幅重新提取）"""
+        last, previous['map'] = previous['map'], frame.seq
+        with history_lock:
+            seqs = [seq for seq, _ in region_history]
+            if last not in seqs or frame.seq not in seqs:
+                return None
+            entries = list(region_history)[seqs.index(last) + 1:seqs.index(frame.seq) + 1]
+        if any(regions is None for _, regions in entries):
+            return None
+        return [rect for _, regions in entries for rect in regions]
+    
+    def recognize(frame):
+        mapper.update_pixel_ratio(frame.shape)
+        screen = classifier.classify(frame)['screen']
+        state = {'time': frame.captured_at, 'screen': screen}
+        if screen == IN_GAME:
+            map_state.update(frame, changed_since_map_update(frame), timestamp=frame.captured_at)
+            # 识别下一帧时地图会被原地更新，决策阶段使用与版本号对应的副本
+            state['grid'], state['map_version'] = map_state.snapshot()
+        return state
+    
+    def act(decision):
+        last = None
+        for action in (decision or {}).get('actions', []):
+            if action.get('type') == 'click':
+                last = executor.click(*mapper.to_screen(action['x'], action['y']))
+            elif action.get('type') == 'drag':
+                last = executor.drag([tuple(point) for point in mapper.to_screen_int(action['path']).tolist()])
+        # 等待本帧的操作执行完，下一帧的操作不会与其交错
+        if last is not None:
+            last.result()
+        return decision
+    
+    streaming = config.get('remote_server.streaming', False)
+    async with DecisionClient() as client:
+        encoder = PayloadEncoder()
+        stream = client.stream(encoder) if streaming else None
+        if stream is not None:
+            await stream.start()
+            decide = stream.decide_state
+        else:
+            async def decide(state):
+                return await client.decide_state(state, encoder)
+        
+        loop = GameLoop([
+            LoopStage(CAPTURE, capture),
+            LoopStage(RECOGNIZE, recognize),
+            LoopStage(DECIDE, decide),
+            LoopStage(ACT, act),
+        ])
+        watcher.start()
+        try:
+            return await loop.run(duration=duration)
+        finally:
+            watcher.stop()
+            if stream is not None:
+                await stream.close()
+            if owns_executor:
+                executor.stop()
+
+
+def main(args=None):
     """主函数"""
     # 初始化日志和配置
     logger = reset_logger()  # 重置日志，开始新会话
@@ -93,6 +215,15 @@ def main():
         logger.add_success("所有基础功能测试通过")
         logger.add_info("系统已准备就绪，可以开始游戏自动化")
         
+        if args is not None and args.loop:
+            logger.add_section("游戏循环")
+            if not config.get('remote_server.enabled', False):
+                logger.add_error("游戏循环需要远程决策，请在配置中启用 remote_server.enabled")
+                return False
+            summary = asyncio.run(run_game_loop(window_manager, screenshot_manager, args.duration))
+            logger.add_info(f"游戏循环结束: 完成 {summary['completed']}/{summary['frames']} 帧，"
+                            f"{summary['fps']} 帧/秒")
+        
         return True
         
     except Exception as e:
@@ -105,7 +236,10 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(description="Mini Motorways 自动化系统")
+    parser.add_argument('--loop', action='store_true', help="基础检查通过后运行流水线游戏循环")
+    parser.add_argument('--duration', type=float, default=None, help="游戏循环运行时间（秒），默认一直运行")
+    success = main(parser.parse_args())
     if success:
         print("\n✅ 系统启动成功！")
         print("📋 请查看 logs/session_log.md 获取详细日志")
@@ -1,12 +1,37 @@
 """
 核心模块
 包含窗口管理、截图、游戏状态识别等核心功能
+
+子模块在首次访问时才导入，避免只需读取日志或统计的工具也要加载cv2、pyautogui等依赖
 """
 
-from .window_manager import WindowManager
-from .screenshot import ScreenshotManager
+import importlib
+
+_LAZY_EXPORTS = {
+    'WindowManager': '.window_manager',
+    'ScreenshotManager': '.screenshot',
+    'Frame': '.frame',
+    'GameLoop': '.game_loop',
+    'LoopStage': '.game_loop',
+}
 
 __all__ = [
     'WindowManager',
-    'ScreenshotManager'
-] 
\ No newline at end of file
+    'ScreenshotManager',
+    'Frame',
+    'GameLoop',
+    'LoopStage'
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
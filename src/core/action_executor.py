@@ -0,0 +1,424 @@
+"""
+输入操作执行器
+调用方把点击、拖拽、按键、等待条件等操作放入队列，由专门的工作线程按顺序执行，
+每个操作通过Future报告完成情况；截图和识别可以在鼠标移动期间继续运行。
+事件的实际发送由输入后端负责（pyautogui、XTest或记录后端）
+"""
+
+import math
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Optional, Sequence, Tuple
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from .input_backend import InputBackend, create_input_backend
+
+# 拖拽基准速度（像素/秒），乘以 automation.drag_speed
+BASE_DRAG_SPEED = 1500.0
+
+
+class Action:
+    """输入操作基类"""
+    
+    kind = 'action'
+    
+    def __init__(self):
+        self.future = Future()
+        self.enqueued_at = None
+        self.started_at = None
+        # 产生效果的输入事件实际发出的时间，用于测量点击到画面的延迟
+        self.issued_at = None
+        # 输入事件发出后立即置位（早于日志记录和操作后的间隔），操作结束时也会置位
+        self.issued = threading.Event()
+        self.finished_at = None
+        # 延迟跟踪器通过Future找到操作，等待 issued 而不是等待操作完全结束
+        self.future.action = self
+    
+    def mark_issued(self, issued_at: Optional[float] = None):
+        """记录输入事件已发出"""
+        self.issued_at = issued_at if issued_at is not None else time.monotonic()
+        self.issued.set()
+    
+    def describe(self) -> dict:
+        """操作详情，用于日志记录"""
+        return {}
+
+
+class MoveAction(Action):
+    """移动鼠标"""
+    
+    kind = 'move'
+    
+    def __init__(self, x: int, y: int, duration: Optional[float] = None):
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.duration = duration
+    
+    def describe(self) -> dict:
+        return {"坐标": f"({self.x}, {self.y})"}
+
+
+class ClickAction(Action):
+    """移动到目标位置并点击"""
+    
+    kind = 'click'
+    
+    def __init__(self, x: int, y: int, button: str = 'left', clicks: int = 1,
+                 move_duration: Optional[float] = None):
+        super().__init__()
+        self.x = x
+        self.y = y
+        self.button = button
+        self.clicks = clicks
+        self.move_duration = move_duration
+    
+    def describe(self) -> dict:
+        return {"坐标": f"({self.x}, {self.y})", "按键": self.button, "次数": self.clicks}
+
+
+class DragAction(Action):
+    """按住鼠标沿路径拖拽"""
+    
+    kind = 'drag'
+    
+    def __init__(self, path: Sequence[Tuple[int, int]], duration: Optional[float] = None,
+                 button: str = 'left', durations: Optional[Sequence[float]] = None,
+                 press_settle: float = 0.0, release_settle: float = 0.0):
+        """
+        Args:
+            path: 拖拽经过的点
+            duration: 总时长（秒），None则按 drag_speed 计算；指定durations时忽略
+            button: 鼠标按键
+            durations: 每一段的移动时长（秒），长度为 len(path) - 1
+            press_settle: 按下后开始移动前的停顿（秒）
+            release_settle: 松开前的停顿（秒）
+        """
+        super().__init__()
+        if len(path) < 2:
+            raise ValueError("拖拽路径至少需要两个点")
+        if durations is not None and len(durations) != len(path) - 1:
+            raise ValueError("分段时长数量必须等于路径段数")
+        self.path = [(int(x), int(y)) for x, y in path]
+        self.duration = duration
+        self.button = button
+        self.durations = list(durations) if durations is not None else None
+        self.press_settle = press_settle
+        self.release_settle = release_settle
+    
+    def describe(self) -> dict:
+        return {"起点": self.path[0], "终点": self.path[-1], "路径点数": len(self.path)}
+
+
+class KeyAction(Action):
+    """按键或组合键"""
+    
+    kind = 'key'
+    
+    def __init__(self, *keys: str):
+        super().__init__()
+        if not keys:
+            raise ValueError("至少需要一个按键")
+        self.keys = keys
+    
+    def describe(self) -> dict:
+        return {"按键": '+'.join(self.keys)}
+
+
+class WaitUntilAction(Action):
+    """阻塞队列直到条件满足或超时，用于让后续操作等待界面就绪"""
+    
+    kind = 'wait_until'
+    
+    def __init__(self, predicate: Callable[[], bool], timeout: float = 5.0, interval: float = 0.02):
+        super().__init__()
+        self.predicate = predicate
+        self.timeout = timeout
+        self.interval = interval
+    
+    def describe(self) -> dict:
+        return {"超时": f"{self.timeout}秒"}
+
+
+class ActionExecutor:
+    """输入操作执行器"""
+    
+    BASE_DRAG_SPEED = BASE_DRAG_SPEED
+    
+    def __init__(self, click_delay: Optional[float] = None, drag_speed: Optional[float] = None,
+                 move_duration: Optional[float] = None, backend: Optional[InputBackend] = None):
+        """
+        初始化执行器
+        
+        Args:
+            click_delay: 每次点击后的间隔（秒），None则使用 automation.click_delay
+            drag_speed: 拖拽速度倍率，None则使用 automation.drag_speed
+            move_duration: 点击前移动鼠标的时长（秒），None则使用 automation.move_duration
+            backend: 输入后端，None则按 automation.input_backend 创建
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.backend = backend or create_input_backend(self.config.get('automation.input_backend', 'auto'))
+        self.click_delay = click_delay if click_delay is not None else \
+            self.config.get('automation.click_delay', 0.1)
+        self.drag_speed = drag_speed if drag_speed is not None else \
+            self.config.get('automation.drag_speed', 1.0)
+        self.move_duration = move_duration if move_duration is not None else \
+            self.config.get('automation.move_duration', 0.3)
+        
+        self._queue = queue.Queue()
+        self._pending = deque()
+        self._pending_lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        # 已提交但尚未完成的操作数，归零时置位空闲事件
+        self._outstanding = 0
+        self._outstanding_lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self.stats = {
+            'executed': 0,
+            'coalesced': 0,
+            'failed': 0,
+            'cancelled': 0
+        }
+    
+    def submit(self, action: Action) -> Future:
+        """
+        提交操作到队列
+        
+        Args:
+            action: 输入操作
+        
+        Returns:
+            操作完成时设置结果的Future
+        """
+        action.enqueued_at = time.monotonic()
+        with self._outstanding_lock:
+            self._outstanding += 1
+            self._idle.clear()
+        self._queue.put(action)
+        if self._thread is None:
+            self.start()
+        return action.future
+    
+    def move(self, x: int, y: int, duration: Optional[float] = None) -> Future:
+        """移动鼠标"""
+        return self.submit(MoveAction(x, y, duration))
+    
+    def click(self, x: int, y: int, button: str = 'left', clicks: int = 1,
+              move_duration: Optional[float] = None) -> Future:
+        """移动到目标位置并点击"""
+        return self.submit(ClickAction(x, y, button, clicks, move_duration))
+    
+    def drag(self, path: Sequence[Tuple[int, int]], duration: Optional[float] = None) -> Future:
+        """沿路径拖拽，duration为None时按 drag_speed 计算"""
+        return self.submit(DragAction(path, duration))
+    
+    def drag_trajectory(self, trajectory) -> Future:
+        """按DragPlanner生成的轨迹拖拽（一次按下、逐段移动、一次松开）"""
+        return self.submit(DragAction(
+            trajectory.as_path(),
+            durations=trajectory.durations,
+            press_settle=trajectory.press_settle,
+            release_settle=trajectory.release_settle
+        ))
+    
+    def key(self, *keys: str) -> Future:
+        """按下单个键，或同时按下组合键"""
+        return self.submit(KeyAction(*keys))
+    
+    def wait_until(self, predicate: Callable[[], bool], timeout: float = 5.0) -> Future:
+        """在队列中插入等待条件"""
+        return self.submit(WaitUntilAction(predicate, timeout))
+    
+    def start(self):
+        """启动工作线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._worker_loop, name="ActionExecutor", daemon=True)
+        self._thread.start()
+    
+    def stop(self, wait: bool = True, timeout: float = 5.0):
+        """
+        停止工作线程
+        
+        Args:
+            wait: 是否先执行完已排队的操作
+            timeout: 等待超时（秒）
+        """
+        if wait:
+            self.flush(timeout)
+        else:
+            self.cancel_pending()
+        self._stop_event.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的操作全部执行完毕
+        
+        Returns:
+            是否在超时前完成
+        """
+        return self._idle.wait(timeout)
+    
+    def cancel_pending(self) -> int:
+        """
+        取消所有尚未开始执行的操作
+        
+        Returns:
+            取消的操作数量
+        """
+        cancelled = 0
+        with self._pending_lock:
+            self._drain_queue()
+            while self._pending:
+                action = self._pending.popleft()
+                if action.future.cancel():
+                    cancelled += 1
+                self._finish_one()
+        self.stats['cancelled'] += cancelled
+        return cancelled
+    
+    def _finish_one(self):
+        """一个操作结束（执行、合并或取消），更新空闲状态"""
+        with self._outstanding_lock:
+            self._outstanding -= 1
+            if self._outstanding <= 0:
+                self._outstanding = 0
+                self._idle.set()
+    
+    def _drain_queue(self):
+        """把队列中已有的操作移入本地缓冲（调用方需持有 _pending_lock）"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._pending.append(item)
+    
+    def _next_action(self) -> Optional[Action]:
+        """取出下一个操作，同时缓冲后续操作以便向前查看和合并"""
+        with self._pending_lock:
+            if self._pending:
+                self._drain_queue()
+                return self._pending.popleft()
+        
+        item = self._queue.get()
+        if item is None:
+            return None
+        with self._pending_lock:
+            self._pending.append(item)
+            self._drain_queue()
+            return self._pending.popleft()
+    
+    def _is_redundant_move(self, action: Action) -> bool:
+        """移动操作后面紧跟着另一个带位置的操作时，这次移动没有意义"""
+        if not isinstance(action, MoveAction):
+            return False
+        with self._pending_lock:
+            return bool(self._pending) and \
+                isinstance(self._pending[0], (MoveAction, ClickAction, DragAction))
+    
+    def _worker_loop(self):
+        """工作线程主循环"""
+        while not self._stop_event.is_set():
+            action = self._next_action()
+            if action is None:
+                continue
+            if not action.future.set_running_or_notify_cancel():
+                self._finish_one()
+                continue
+            
+            if self._is_redundant_move(action):
+                self.stats['coalesced'] += 1
+                action.future.set_result({'action': action.kind, 'coalesced': True})
+                self._finish_one()
+                continue
+            
+            action.started_at = time.monotonic()
+            try:
+                self._perform(action)
+                action.finished_at = time.monotonic()
+                self.stats['executed'] += 1
+                action.future.set_result({
+                    'action': action.kind,
+                    'coalesced': False,
+                    'started_at': action.started_at,
+                    'issued_at': action.issued_at or action.started_at,
+                    'finished_at': action.finished_at,
+                    'queued_s': action.started_at - action.enqueued_at,
+                    'duration_s': action.finished_at - action.started_at
+                })
+            except Exception as e:
+                action.finished_at = time.monotonic()
+                self.stats['failed'] += 1
+                self.logger.add_error(f"执行操作失败 ({action.kind}): {str(e)}")
+                action.future.set_exception(e)
+            finally:
+                action.issued.set()
+            
+            self._finish_one()
+    
+    def drag_duration(self, path: Sequence[Tuple[int, int]]) -> float:
+        """按路径长度和 drag_speed 计算拖拽时长（秒）"""
+        length = sum(math.dist(path[i], path[i + 1]) for i in range(len(path) - 1))
+        speed = self.BASE_DRAG_SPEED * max(self.drag_speed, 0.01)
+        return length / speed
+    
+    def _perform(self, action: Action):
+        """在工作线程中执行单个操作"""
+        if isinstance(action, MoveAction):
+            duration = self.move_duration if action.duration is None else action.duration
+            self.backend.move_to(action.x, action.y, duration)
+        
+        elif isinstance(action, ClickAction):
+            duration = self.move_duration if action.move_duration is None else action.move_duration
+            if duration > 0:
+                self.backend.move_to(action.x, action.y, duration)
+            issued_at = time.monotonic()
+            self.backend.click(action.x, action.y, action.clicks, action.button)
+            action.mark_issued(issued_at)
+            self.logger.add_action("点击", action.describe())
+            time.sleep(self.click_delay)
+        
+        elif isinstance(action, DragAction):
+            durations = action.durations
+            if durations is None:
+                duration = self.drag_duration(action.path) if action.duration is None else action.duration
+                durations = [duration / (len(action.path) - 1)] * (len(action.path) - 1)
+            self.backend.drag_path(action.path, durations, action.button,
+                                   action.press_settle, action.release_settle)
+            # 拖拽在松开鼠标时才生效，延迟从松开时算起
+            action.mark_issued()
+            self.logger.add_action("拖拽", action.describe())
+            time.sleep(self.click_delay)
+        
+        elif isinstance(action, KeyAction):
+            issued_at = time.monotonic()
+            if len(action.keys) == 1:
+                self.backend.press(action.keys[0])
+            else:
+                self.backend.hotkey(*action.keys)
+            action.mark_issued(issued_at)
+            self.logger.add_action("按键", action.describe())
+        
+        elif isinstance(action, WaitUntilAction):
+            deadline = time.monotonic() + action.timeout
+            while not action.predicate():
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待条件超时 ({action.timeout}秒)")
+                time.sleep(action.interval)
+        
+        else:
+            raise TypeError(f"未知的操作类型: {type(action).__name__}")
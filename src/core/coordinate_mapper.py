@@ -0,0 +1,213 @@
+"""
+坐标映射器
+在参考布局空间、截图像素空间、窗口空间和屏幕空间之间做仿射变换，
+支持Retina/HiDPI缩放和窗口偏移；变换矩阵只在窗口几何变化时重新计算，
+点和矩形框数组通过一次NumPy运算批量转换
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.config import get_config
+
+
+# 支持的坐标空间
+REFERENCE = 'reference'  # 参考布局空间（game.expected_resolution 下的窗口像素）
+IMAGE = 'image'          # 窗口截图的像素空间（HiDPI下为物理像素）
+WINDOW = 'window'        # 窗口内的逻辑坐标（点）
+SCREEN = 'screen'        # 屏幕逻辑坐标，鼠标操作使用该空间
+
+SPACES = (REFERENCE, IMAGE, WINDOW, SCREEN)
+
+
+class CoordinateMapper:
+    """坐标映射器
+    
+    所有变换都表示为3x3齐次矩阵，先统一变换到屏幕空间再求逆得到反向变换
+    """
+    
+    def __init__(self, reference_size: Optional[Tuple[int, int]] = None,
+                 keep_aspect: Optional[bool] = None,
+                 pixel_ratio: Optional[float] = None):
+        """
+        初始化坐标映射器
+        
+        Args:
+            reference_size: 参考布局分辨率 (width, height)，None则使用 game.expected_resolution
+            keep_aspect: 参考布局是否等比缩放（居中留边），None则使用配置文件设置
+            pixel_ratio: 截图像素与逻辑坐标之比（Retina为2.0），None则使用配置或由截图自动推断
+        """
+        config = get_config()
+        if reference_size is None:
+            reference_size = config.get('game.expected_resolution', [1920, 1080])
+        if keep_aspect is None:
+            keep_aspect = config.get('game.keep_aspect', False)
+        if pixel_ratio is None:
+            pixel_ratio = config.get('game.pixel_ratio')
+        
+        self.reference_size = (float(reference_size[0]), float(reference_size[1]))
+        self.keep_aspect = keep_aspect
+        self.pixel_ratio = float(pixel_ratio) if pixel_ratio else 1.0
+        self._fixed_pixel_ratio = bool(pixel_ratio)
+        
+        self.region = None
+        self.generation = -1
+        self.recompute_count = 0
+        self._to_screen = {}
+        self._from_screen = {}
+        # 空间对之间的组合矩阵，几何变化时清空
+        self._matrices = {}
+    
+    @property
+    def ready(self) -> bool:
+        """是否已经获得窗口几何"""
+        return self.region is not None
+    
+    def update(self, region: Sequence[int], generation: Optional[int] = None):
+        """
+        更新窗口区域（可直接作为WindowWatcher的订阅回调）
+        
+        Args:
+            region: 窗口区域 (left, top, width, height)，逻辑坐标
+            generation: 几何代数；与当前相同时跳过重新计算
+        """
+        region = tuple(region)
+        if generation is not None and generation == self.generation and region == self.region:
+            return
+        self.region = region
+        self.generation = generation if generation is not None else self.generation + 1
+        self._recompute()
+    
+    def update_pixel_ratio(self, image_shape: Sequence[int]):
+        """
+        根据窗口截图的尺寸推断HiDPI缩放比例
+        
+        Args:
+            image_shape: 截图数组的shape (height, width[, channels])
+        """
+        if self._fixed_pixel_ratio or self.region is None or self.region[2] <= 0:
+            return
+        ratio = round(image_shape[1] / self.region[2], 2)
+        if ratio > 0 and ratio != self.pixel_ratio:
+            self.pixel_ratio = ratio
+            self._recompute()
+    
+    def _recompute(self):
+        """重新计算各空间到屏幕空间的变换矩阵"""
+        left, top, width, height = self.region
+        ref_w, ref_h = self.reference_size
+        
+        window_to_screen = np.array([
+            [1.0, 0.0, left],
+            [0.0, 1.0, top],
+            [0.0, 0.0, 1.0]
+        ])
+        
+        inv_ratio = 1.0 / self.pixel_ratio
+        image_to_window = np.diag([inv_ratio, inv_ratio, 1.0])
+        
+        scale_x, scale_y = width / ref_w, height / ref_h
+        offset_x = offset_y = 0.0
+        if self.keep_aspect:
+            scale_x = scale_y = min(scale_x, scale_y)
+            offset_x = (width - ref_w * scale_x) / 2
+            offset_y = (height - ref_h * scale_y) / 2
+        reference_to_window = np.array([
+            [scale_x, 0.0, offset_x],
+            [0.0, scale_y, offset_y],
+            [0.0, 0.0, 1.0]
+        ])
+        
+        self._to_screen = {
+            SCREEN: np.eye(3),
+            WINDOW: window_to_screen,
+            IMAGE: window_to_screen @ image_to_window,
+            REFERENCE: window_to_screen @ reference_to_window
+        }
+        self._from_screen = {space: np.linalg.inv(matrix) for space, matrix in self._to_screen.items()}
+        self._matrices = {}
+        self.recompute_count += 1
+    
+    def matrix(self, source: str, target: str) -> np.ndarray:
+        """
+        获取从source空间到target空间的3x3变换矩阵
+        
+        Args:
+            source: 源坐标空间
+            target: 目标坐标空间
+        
+        Returns:
+            3x3齐次变换矩阵
+        """
+        if self.region is None:
+            raise RuntimeError("坐标映射器尚未获得窗口区域")
+        key = (source, target)
+        m = self._matrices.get(key)
+        if m is None:
+            if source not in SPACES or target not in SPACES:
+                raise ValueError(f"未知的坐标空间: {source} -> {target}")
+            m = self._from_screen[target] @ self._to_screen[source]
+            self._matrices[key] = m
+        return m
+    
+    def transform(self, points, source: str = REFERENCE, target: str = SCREEN) -> np.ndarray:
+        """
+        批量转换点坐标
+        
+        Args:
+            points: 形如 (N, 2) 的点数组或点列表
+            source: 源坐标空间
+            target: 目标坐标空间
+        
+        Returns:
+            (N, 2) 的float数组
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        m = self.matrix(source, target)
+        return points @ m[:2, :2].T + m[:2, 2]
+    
+    def transform_boxes(self, boxes, source: str = REFERENCE, target: str = SCREEN) -> np.ndarray:
+        """
+        批量转换矩形框 (x1, y1, x2, y2)
+        
+        Args:
+            boxes: 形如 (N, 4) 的矩形框数组
+            source: 源坐标空间
+            target: 目标坐标空间
+        
+        Returns:
+            (N, 4) 的float数组
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        corners = self.transform(boxes.reshape(-1, 2), source, target).reshape(-1, 4)
+        # 各轴缩放均为正，左上角和右下角的顺序保持不变
+        return corners
+    
+    def to_screen(self, x: float, y: float, source: str = REFERENCE) -> Tuple[int, int]:
+        """
+        转换单个点到屏幕坐标（用于鼠标操作）
+        
+        Args:
+            x: 横坐标
+            y: 纵坐标
+            source: 源坐标空间
+        
+        Returns:
+            屏幕坐标 (x, y)，已取整
+        """
+        point = self.transform((x, y), source, SCREEN)[0]
+        return (int(round(point[0])), int(round(point[1])))
+    
+    def to_screen_int(self, points, source: str = REFERENCE) -> np.ndarray:
+        """
+        批量转换点到取整的屏幕坐标
+        
+        Args:
+            points: 形如 (N, 2) 的点数组
+            source: 源坐标空间
+        
+        Returns:
+            (N, 2) 的int32数组
+        """
+        return np.rint(self.transform(points, source, SCREEN)).astype(np.int32)
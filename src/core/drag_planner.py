@@ -0,0 +1,227 @@
+"""
+道路拖拽路径规划器
+把道路格子路径压缩为最少的拐点，拐点在拐角格子内部圆滑过渡并停留片刻，按速度/停顿参数
+生成屏幕坐标下的拖拽轨迹（平滑后的形状按拐点列表缓存），交给输入执行器一次性流畅地画完整条道路
+"""
+
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.config import get_config
+from .action_executor import BASE_DRAG_SPEED
+from .coordinate_mapper import CoordinateMapper, REFERENCE
+
+
+class DragTrajectory:
+    """拖拽轨迹：屏幕坐标拐点及每段移动时长"""
+    
+    __slots__ = ('points', 'durations', 'press_settle', 'release_settle')
+    
+    def __init__(self, points: np.ndarray, durations: Sequence[float],
+                 press_settle: float, release_settle: float):
+        """
+        Args:
+            points: (N, 2) 的屏幕坐标拐点
+            durations: N-1 段移动各自的时长（秒）
+            press_settle: 按下鼠标后、开始移动前的停顿（秒）
+            release_settle: 到达终点后、松开鼠标前的停顿（秒）
+        """
+        self.points = points
+        self.durations = list(durations)
+        self.press_settle = press_settle
+        self.release_settle = release_settle
+    
+    @property
+    def total_duration(self) -> float:
+        """整条轨迹的执行时长（秒）"""
+        return self.press_settle + sum(self.durations) + self.release_settle
+    
+    def as_path(self) -> list:
+        """拐点列表 [(x, y), ...]"""
+        return [(int(x), int(y)) for x, y in self.points]
+
+
+def compress_tile_path(tiles) -> np.ndarray:
+    """
+    去掉直线段中间的格子，只保留起点、拐点和终点
+    
+    Args:
+        tiles: (N, 2) 的格子坐标 (col, row)，相邻格子可以是横、竖或斜向相邻
+    
+    Returns:
+        (M, 2) 的int数组，M <= N
+    """
+    tiles = np.asarray(tiles, dtype=np.int32).reshape(-1, 2)
+    if len(tiles) <= 2:
+        return tiles
+    steps = np.diff(tiles, axis=0)
+    # 方向用符号表示，相邻两步方向不同的位置就是拐点
+    directions = np.sign(steps)
+    turns = np.any(directions[1:] != directions[:-1], axis=1)
+    keep = np.concatenate(([True], turns, [True]))
+    return tiles[keep]
+
+
+class DragPlanner:
+    """道路拖拽路径规划器
+    
+    游戏按光标经过的格子铺路，因此拐角的圆弧限制在拐角格子内部（半径不超过半个格距），
+    圆滑过渡不会改变道路经过的格子
+    """
+    
+    BASE_DRAG_SPEED = BASE_DRAG_SPEED
+    
+    # 圆弧半径上限（格距的比例），保证圆弧不离开拐角格子（斜向时也在半格之内）
+    MAX_CORNER_RADIUS = 0.45
+    
+    def __init__(self, mapper: Optional[CoordinateMapper] = None,
+                 grid_origin: Tuple[float, float] = (0.0, 0.0),
+                 tile_pitch: float = 1.0,
+                 drag_speed: Optional[float] = None,
+                 settle: Optional[float] = None,
+                 corner_pause: Optional[float] = None,
+                 corner_radius: Optional[float] = None,
+                 corner_samples: int = 4,
+                 cache_size: int = 512):
+        """
+        初始化规划器
+        
+        Args:
+            mapper: 坐标映射器，格子中心按参考布局空间计算后映射到屏幕；None表示格子坐标直接按屏幕像素计算
+            grid_origin: 格子(0, 0)中心的坐标（参考布局空间）
+            tile_pitch: 相邻格子中心的间距（参考布局像素）
+            drag_speed: 拖拽速度倍率，None则使用 automation.drag_speed
+            settle: 按下后和松开前的停顿（秒），None则使用 automation.drag_settle
+            corner_pause: 每个拐点额外停留的时间（秒），None则使用 automation.drag_corner_pause
+            corner_radius: 拐角圆弧半径（格距的比例，0表示不圆滑），None则使用 automation.drag_corner_radius
+            corner_samples: 每段圆弧的采样点数
+            cache_size: 形状缓存容量
+        """
+        config = get_config()
+        self.mapper = mapper
+        self.grid_origin = (float(grid_origin[0]), float(grid_origin[1]))
+        self.tile_pitch = float(tile_pitch)
+        self.drag_speed = drag_speed if drag_speed is not None else config.get('automation.drag_speed', 1.0)
+        self.settle = settle if settle is not None else config.get('automation.drag_settle', 0.05)
+        self.corner_pause = corner_pause if corner_pause is not None else \
+            config.get('automation.drag_corner_pause', 0.02)
+        if corner_radius is None:
+            corner_radius = config.get('automation.drag_corner_radius', 0.3)
+        self.corner_radius = min(max(float(corner_radius), 0.0), self.MAX_CORNER_RADIUS)
+        self.corner_samples = max(1, int(corner_samples))
+        # 以压缩后的相对拐点列表为键（通常只有几个点），缓存平滑后的形状
+        self._relative_shape = lru_cache(maxsize=cache_size)(self._build_relative_shape)
+    
+    def set_grid(self, grid_origin: Tuple[float, float], tile_pitch: float):
+        """更新网格校准参数（网格校准结果变化时调用）"""
+        self.grid_origin = (float(grid_origin[0]), float(grid_origin[1]))
+        self.tile_pitch = float(tile_pitch)
+    
+    def _build_relative_shape(self, corners: Tuple[Tuple[int, int], ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        平滑相对起点的拐点列表（按拐点列表缓存）
+        
+        每个拐点替换为拐角格子内的二次贝塞尔圆弧（半径为0时保留尖角），并在圆弧中点（或拐点）
+        重复一个点作为停顿段
+        
+        Returns:
+            (points, pauses)：(N, 2) 的格子空间坐标，以及 N-1 段中哪些是停顿段
+        """
+        corners = np.asarray(corners, dtype=np.float64)
+        points = [corners[0]]
+        pauses = []
+        pause = self.corner_pause > 0
+        for i in range(1, len(corners) - 1):
+            corner = corners[i]
+            incoming = corner - corners[i - 1]
+            outgoing = corners[i + 1] - corner
+            radius = min(self.corner_radius, np.hypot(*incoming) / 2, np.hypot(*outgoing) / 2)
+            if radius <= 0:
+                points.append(corner)
+                pauses.append(False)
+                if pause:
+                    points.append(corner)
+                    pauses.append(True)
+                continue
+            entry = corner - incoming / np.hypot(*incoming) * radius
+            leave = corner + outgoing / np.hypot(*outgoing) * radius
+            points.append(entry)
+            pauses.append(False)
+            samples = np.linspace(0.0, 1.0, self.corner_samples + 1)[1:]
+            middle = int(np.argmax(samples >= 0.5))
+            for j, t in enumerate(samples):
+                points.append((1 - t) ** 2 * entry + 2 * t * (1 - t) * corner + t ** 2 * leave)
+                pauses.append(False)
+                if pause and j == middle:
+                    points.append(points[-1])
+                    pauses.append(True)
+        points.append(corners[-1])
+        pauses.append(False)
+        
+        points = np.array(points)
+        pauses = np.array(pauses, dtype=bool)
+        points.setflags(write=False)
+        pauses.setflags(write=False)
+        return points, pauses
+    
+    def cache_info(self):
+        """形状缓存命中统计"""
+        return self._relative_shape.cache_info()
+    
+    def tiles_to_screen(self, tiles) -> np.ndarray:
+        """
+        批量把格子坐标转换为屏幕坐标（格子中心）
+        
+        Args:
+            tiles: (N, 2) 的格子坐标
+        
+        Returns:
+            (N, 2) 的float数组
+        """
+        tiles = np.asarray(tiles, dtype=np.float64).reshape(-1, 2)
+        points = tiles * self.tile_pitch + self.grid_origin
+        if self.mapper is not None:
+            points = self.mapper.transform(points, REFERENCE)
+        return points
+    
+    def plan(self, tiles) -> DragTrajectory:
+        """
+        为一条道路格子路径生成拖拽轨迹
+        
+        Args:
+            tiles: (N, 2) 的格子坐标序列，N >= 2
+        
+        Returns:
+            拖拽轨迹
+        """
+        tiles = np.asarray(tiles, dtype=np.int32).reshape(-1, 2)
+        if len(tiles) < 2:
+            raise ValueError("道路路径至少需要两个格子")
+        
+        corners = compress_tile_path(tiles)
+        start = corners[0]
+        shape, pauses = self._relative_shape(tuple(map(tuple, (corners - start).tolist())))
+        
+        points = np.rint(self.tiles_to_screen(shape + start))
+        lengths = np.hypot(*np.diff(points, axis=0).T)
+        speed = self.BASE_DRAG_SPEED * max(self.drag_speed, 0.01)
+        # 停顿段是拐点处重复的点，只停留不移动，确保游戏识别到方向变化
+        durations = np.where(pauses, self.corner_pause, lengths / speed)
+        
+        return DragTrajectory(points.astype(np.int32), durations.tolist(), self.settle, self.settle)
+    
+    def execute(self, tiles, executor):
+        """
+        规划并提交拖拽到输入执行器
+        
+        Args:
+            tiles: 道路格子路径
+            executor: ActionExecutor
+        
+        Returns:
+            拖拽完成时设置结果的Future
+        """
+        trajectory = self.plan(tiles)
+        return executor.drag_trajectory(trajectory)
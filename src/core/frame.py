@@ -0,0 +1,168 @@
+"""
+帧对象
+一次截图及其派生视图（灰度、半尺寸、四分之一尺寸、HSV等）。派生视图在首次访问时计算且只计算一次，
+随帧一起释放；同一帧的所有使用者共享这些视图，不再各自重复做颜色转换和缩放
+"""
+
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from ..utils.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+def _bgr(frame: 'Frame'):
+    image = frame.image
+    if image.ndim == 3 and image.shape[2] == 4:
+        return np.ascontiguousarray(image[:, :, :3])
+    return image
+
+
+def _gray(frame: 'Frame'):
+    image = frame.image
+    if image.ndim == 2:
+        return image
+    code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(image, code)
+
+
+# 内置的派生视图：名称 -> 计算函数（参数为帧，可以依赖其他视图）
+VIEW_BUILDERS: Dict[str, Callable[['Frame'], object]] = {
+    'bgr': _bgr,
+    'gray': _gray,
+    'half': lambda frame: cv2.pyrDown(frame.view('bgr')),
+    'quarter': lambda frame: cv2.pyrDown(frame.view('half')),
+    'gray_half': lambda frame: cv2.pyrDown(frame.view('gray')),
+    'gray_quarter': lambda frame: cv2.pyrDown(frame.view('gray_half')),
+    'hsv': lambda frame: cv2.cvtColor(frame.view('bgr'), cv2.COLOR_BGR2HSV),
+}
+
+# 灰度金字塔各层对应的视图名称
+_GRAY_LEVELS = ('gray', 'gray_half', 'gray_quarter')
+
+# 所有帧的累计命中/计算次数
+_totals = {'hits': 0, 'misses': 0}
+
+
+def register_view(name: str, builder: Callable[['Frame'], object]):
+    """
+    注册自定义派生视图（如调色板类别图）
+    
+    Args:
+        name: 视图名称
+        builder: 计算函数，参数为帧
+    """
+    VIEW_BUILDERS[name] = builder
+
+
+def view_statistics() -> Dict[str, int]:
+    """所有帧的派生视图累计命中和计算次数"""
+    return dict(_totals)
+
+
+class Frame:
+    """一次截图
+    
+    image 为原始缓冲区（mss截图为BGRA，也可以是BGR或灰度数组），region 为截图区域
+    (left, top, width, height)，seq 为帧序号，captured_at 为 time.monotonic() 截图时间
+    """
+    
+    __slots__ = ('image', 'region', 'seq', 'captured_at', 'hits', 'misses', '_views')
+    
+    def __init__(self, image, region: Optional[Tuple[int, int, int, int]] = None,
+                 seq: int = 0, captured_at: Optional[float] = None):
+        self.image = image
+        self.region = region
+        self.seq = seq
+        self.captured_at = captured_at if captured_at is not None else time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self._views: Dict[str, object] = {}
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """与BGR视图一致的形状（去掉alpha通道）"""
+        shape = self.image.shape
+        if len(shape) == 3 and shape[2] == 4:
+            return shape[:2] + (3,)
+        return shape
+    
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+    
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+    
+    @property
+    def age(self) -> float:
+        """距截图的时间（秒）"""
+        return time.monotonic() - self.captured_at
+    
+    def view(self, name: str):
+        """
+        获取派生视图（首次访问时计算）
+        
+        Raises:
+            KeyError: 未注册的视图名称
+        """
+        value = self._views.get(name)
+        if value is not None:
+            self.hits += 1
+            _totals['hits'] += 1
+            return value
+        value = VIEW_BUILDERS[name](self)
+        self._views[name] = value
+        self.misses += 1
+        _totals['misses'] += 1
+        return value
+    
+    def has_view(self, name: str) -> bool:
+        """视图是否已计算"""
+        return name in self._views
+    
+    @property
+    def bgr(self):
+        """BGR图像（连续内存）"""
+        return self.view('bgr')
+    
+    @property
+    def gray(self):
+        """灰度图"""
+        return self.view('gray')
+    
+    @property
+    def half(self):
+        """半尺寸BGR图像"""
+        return self.view('half')
+    
+    @property
+    def quarter(self):
+        """四分之一尺寸BGR图像"""
+        return self.view('quarter')
+    
+    @property
+    def hsv(self):
+        """HSV图像"""
+        return self.view('hsv')
+    
+    def gray_level(self, level: int):
+        """灰度金字塔第level层（0为原尺寸，每层边长减半，与cv2.pyrDown一致）"""
+        if level < len(_GRAY_LEVELS):
+            return self.view(_GRAY_LEVELS[level])
+        name = f'gray_level{level}'
+        if name not in VIEW_BUILDERS:
+            VIEW_BUILDERS[name] = lambda frame, level=level: cv2.pyrDown(frame.gray_level(level - 1))
+        return self.view(name)
+    
+    def release(self):
+        """释放所有派生视图"""
+        self._views.clear()
+
+
+def as_bgr(image):
+    """帧或数组统一转为BGR数组（数组原样返回）"""
+    return image.bgr if isinstance(image, Frame) else image
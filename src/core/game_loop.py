@@ -0,0 +1,312 @@
+"""
+流水线游戏循环
+截图、识别、决策、操作四个阶段各自在独立的协程中并发运行，阶段之间用有界队列连接：
+第N帧的决策请求在途、第N-1帧的操作正在执行时，第N+1帧已经在截图和识别。
+每个阶段有延迟预算，过期的工作（帧太旧、已被更新的帧取代）直接丢弃，
+整体吞吐量接近最慢的单个阶段，而不是各阶段耗时之和
+"""
+
+import asyncio
+import inspect
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from ..utils.latency import latency_distribution
+
+# 默认的阶段名称
+CAPTURE = 'capture'
+RECOGNIZE = 'recognize'
+DECIDE = 'decide'
+ACT = 'act'
+
+
+class LoopStage:
+    """循环的一个阶段
+    
+    第一个阶段是数据源，函数不带参数（如截图）；之后每个阶段的函数以上一阶段的结果为参数。
+    函数可以是协程函数（直接在事件循环中等待，如决策请求），普通函数在线程池中执行（如截图、识别）；
+    返回None表示本帧到此为止（如当前不在游戏界面）
+    """
+    
+    def __init__(self, name: str, func: Callable, budget_ms: Optional[float] = None,
+                 concurrency: int = 1, max_age: Optional[float] = None, drop_superseded: bool = True):
+        """
+        初始化阶段
+        
+        Args:
+            name: 阶段名称
+            func: 阶段函数
+            budget_ms: 单次处理的延迟预算（毫秒），超出时计数并记录警告，None表示不限
+            concurrency: 同时处理的工作数（如允许多个决策请求在途）
+            max_age: 开始处理时帧的最大年龄（秒），超过则丢弃，None则使用循环的 max_age
+            drop_superseded: 输入队列已满时是否丢弃最旧的工作（否则上游等待）
+        """
+        self.name = name
+        self.func = func
+        self.budget_ms = budget_ms
+        self.concurrency = max(1, int(concurrency))
+        self.max_age = max_age
+        self.drop_superseded = drop_superseded
+        self.is_async = inspect.iscoroutinefunction(func)
+
+
+class _Work:
+    """在阶段之间传递的一帧工作"""
+    
+    __slots__ = ('seq', 'captured_at', 'value')
+    
+    def __init__(self, seq: int, captured_at: float, value):
+        self.seq = seq
+        self.captured_at = captured_at
+        self.value = value
+
+
+class GameLoop:
+    """流水线游戏循环
+    
+    用法::
+        
+        loop = GameLoop([
+            LoopStage(CAPTURE, screenshot_manager.grab_frame),
+            LoopStage(RECOGNIZE, recognize),
+            LoopStage(DECIDE, stream.decide_state),
+            LoopStage(ACT, act),
+        ])
+        await loop.run(duration=60)
+    """
+    
+    def __init__(self, stages: Sequence[LoopStage], queue_size: Optional[int] = None,
+                 max_age: Optional[float] = None, max_fps: Optional[float] = None,
+                 max_samples: int = 500, register: bool = True):
+        """
+        初始化游戏循环
+        
+        Args:
+            stages: 阶段列表（至少两个，第一个为数据源）
+            queue_size: 阶段之间队列的容量，None则使用 automation.loop_queue_size
+            max_age: 帧的最大年龄（秒），超过后不再处理，None则使用 automation.loop_max_age
+            max_fps: 数据源的最大帧率，None则使用 automation.loop_max_fps（0表示不限制）
+            max_samples: 每个阶段保留的最近耗时样本数
+            register: 是否把统计注册到日志系统的会话统计
+        """
+        if len(stages) < 2:
+            raise ValueError("游戏循环至少需要两个阶段")
+        config = get_config()
+        self.logger = get_logger()
+        self.stages: List[LoopStage] = list(stages)
+        self.queue_size = int(queue_size or config.get('automation.loop_queue_size', 1))
+        self.max_age = float(max_age if max_age is not None else config.get('automation.loop_max_age', 0.5))
+        self.max_fps = float(max_fps if max_fps is not None else config.get('automation.loop_max_fps', 30))
+        budgets = config.get('automation.loop_budgets', {}) or {}
+        for stage in self.stages:
+            if stage.budget_ms is None and stage.name in budgets:
+                stage.budget_ms = float(budgets[stage.name])
+        
+        self._queues: List[asyncio.Queue] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._outstanding = 0
+        self._source_done = False
+        self._last_final_seq = -1
+        self._durations = {stage.name: deque(maxlen=max_samples) for stage in self.stages}
+        self._end_to_end: deque = deque(maxlen=max_samples)
+        self.stats = {stage.name: {'processed': 0, 'skipped': 0, 'stale': 0, 'superseded': 0,
+                                   'over_budget': 0, 'errors': 0} for stage in self.stages}
+        self.frames = 0
+        self.completed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        if register:
+            self.logger.register_statistics("游戏循环", self.statistics)
+    
+    def stop(self):
+        """请求停止循环（数据源不再产生新帧，在途的工作处理完后 run 返回）"""
+        if self._stop is not None:
+            self._stop.set()
+    
+    def _retire(self):
+        """一帧工作结束（完成或丢弃）"""
+        self._outstanding -= 1
+        if self._source_done and self._outstanding <= 0:
+            self._drained.set()
+    
+    def _offer(self, index: int, work: _Work):
+        """把工作放入第index个阶段的输入队列；队列已满时按该阶段的策略丢弃最旧的工作"""
+        queue = self._queues[index]
+        stage = self.stages[index]
+        while queue.full() and stage.drop_superseded:
+            queue.get_nowait()
+            self.stats[stage.name]['superseded'] += 1
+            self._retire()
+        if not queue.full():
+            queue.put_nowait(work)
+            return None
+        return queue.put(work)
+    
+    async def _call(self, stage: LoopStage, *args):
+        """执行阶段函数（协程直接等待，普通函数放入线程池）"""
+        if stage.is_async:
+            return await stage.func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, stage.func, *args)
+    
+    def _record(self, stage: LoopStage, elapsed: float):
+        self._durations[stage.name].append(elapsed)
+        stats = self.stats[stage.name]
+        stats['processed'] += 1
+        if stage.budget_ms is not None and elapsed * 1000 > stage.budget_ms:
+            stats['over_budget'] += 1
+            if stats['over_budget'] == 1 or stats['over_budget'] % 100 == 0:
+                self.logger.add_warning(f"游戏循环阶段 {stage.name} 超出延迟预算: "
+                                        f"{elapsed * 1000:.1f}ms > {stage.budget_ms:.1f}ms（第{stats['over_budget']}次）")
+    
+    async def _source(self, frames: Optional[int]):
+        """数据源阶段：按最大帧率产生新帧，直到达到帧数或收到停止请求"""
+        stage = self.stages[0]
+        interval = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        next_at = time.monotonic()
+        try:
+            while not self._stop.is_set() and (frames is None or self.frames < frames):
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_at = max(next_at + interval, time.monotonic())
+                captured_at = time.monotonic()
+                try:
+                    value = await self._call(stage)
+                except Exception as e:
+                    self.stats[stage.name]['errors'] += 1
+                    self.logger.add_error(f"游戏循环阶段 {stage.name} 失败: {str(e)}")
+                    continue
+                self._record(stage, time.monotonic() - captured_at)
+                if value is None:
+                    self.stats[stage.name]['skipped'] += 1
+                    continue
+                work = _Work(self.frames, captured_at, value)
+                self.frames += 1
+                self._outstanding += 1
+                waiting = self._offer(1, work)
+                if waiting is not None:
+                    await waiting
+        finally:
+            self._source_done = True
+            if self._outstanding <= 0:
+                self._drained.set()
+    
+    async def _worker(self, index: int):
+        """处理第index个阶段的输入队列"""
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        max_age = stage.max_age if stage.max_age is not None else self.max_age
+        final = index == len(self.stages) - 1
+        queue = self._queues[index]
+        while True:
+            work = await queue.get()
+            started = time.monotonic()
+            # 帧太旧，或最后阶段已经处理过更新的帧（并发阶段可能乱序完成）
+            if (max_age > 0 and started - work.captured_at > max_age) or (final and work.seq < self._last_final_seq):
+                stats['stale'] += 1
+                self._retire()
+                continue
+            try:
+                value = await self._call(stage, work.value)
+            except Exception as e:
+                stats['errors'] += 1
+                self.logger.add_error(f"游戏循环阶段 {stage.name} 失败: {str(e)}")
+                self._retire()
+                continue
+            finished = time.monotonic()
+            self._record(stage, finished - started)
+            if final:
+                self._last_final_seq = max(self._last_final_seq, work.seq)
+                self._end_to_end.append(finished - work.captured_at)
+                self.completed += 1
+                self._retire()
+            elif value is None:
+                stats['skipped'] += 1
+                self._retire()
+            else:
+                work.value = value
+                waiting = self._offer(index + 1, work)
+                if waiting is not None:
+                    await waiting
+    
+    async def run(self, frames: Optional[int] = None, duration: Optional[float] = None) -> dict:
+        """
+        运行循环
+        
+        Args:
+            frames: 数据源产生的帧数，None表示不限
+            duration: 最长运行时间（秒），None表示不限；二者都为None时一直运行到 stop()
+        
+        Returns:
+            summary() 的结果
+        """
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._stop = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._outstanding = 0
+        self._source_done = False
+        threads = sum(stage.concurrency for stage in self.stages if not stage.is_async)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="GameLoop")
+        self.started_at = time.monotonic()
+        
+        workers = [asyncio.create_task(self._worker(index))
+                   for index in range(1, len(self.stages))
+                   for _ in range(self.stages[index].concurrency)]
+        source = asyncio.create_task(self._source(frames))
+        try:
+            if duration is not None:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), duration)
+                except asyncio.TimeoutError:
+                    self._stop.set()
+            await source
+            await self._drained.wait()
+        finally:
+            source.cancel()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(source, *workers, return_exceptions=True)
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self.finished_at = time.monotonic()
+        return self.summary()
+    
+    def summary(self) -> dict:
+        """
+        运行结果汇总
+        
+        Returns:
+            {'frames', 'completed', 'fps', 'end_to_end': 分布, 'stages': {阶段名: {计数..., 'latency': 分布}}}
+        """
+        elapsed = ((self.finished_at or time.monotonic()) - self.started_at) if self.started_at else 0.0
+        return {
+            'frames': self.frames,
+            'completed': self.completed,
+            'fps': round(self.completed / elapsed, 2) if elapsed > 0 else 0.0,
+            'end_to_end': latency_distribution(self._end_to_end, scale=1000),
+            'stages': {name: dict(self.stats[name],
+                                  latency=latency_distribution(self._durations[name], scale=1000))
+                       for name in self.stats}
+        }
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        summary = self.summary()
+        e2e = summary['end_to_end']
+        lines = {
+            '帧数': f"{summary['frames']}（完成 {summary['completed']}，{summary['fps']} 帧/秒）",
+            '端到端延迟': f"p50={e2e['p50_ms']}ms, p90={e2e['p90_ms']}ms, max={e2e['max_ms']}ms"
+        }
+        for name, stage in summary['stages'].items():
+            latency = stage['latency']
+            lines[f"阶段 {name}"] = (
+                f"p50={latency['p50_ms']}ms, p90={latency['p90_ms']}ms, 超预算={stage['over_budget']}, "
+                f"过期={stage['stale']}, 被取代={stage['superseded']}, 失败={stage['errors']}"
+            )
+        return lines
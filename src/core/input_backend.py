@@ -0,0 +1,399 @@
+"""
+输入后端
+把鼠标和键盘事件的发送与操作调度分开：真实运行使用pyautogui，Linux/Xvfb下可直接用
+XTest扩展注入事件，无头测试使用记录后端为每个事件打时间戳，用于测量吞吐量和调度抖动
+"""
+
+import sys
+import time
+import threading
+from typing import Optional, Sequence, Tuple, List
+
+from ..utils.config import get_config
+from ..utils.lazy_import import lazy_import
+
+pyautogui = lazy_import('pyautogui')
+X = lazy_import('Xlib.X')
+XK = lazy_import('Xlib.XK')
+xdisplay = lazy_import('Xlib.display')
+xtest = lazy_import('Xlib.ext.xtest')
+
+
+# X11鼠标按键编号
+_X11_BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+
+# pyautogui键名到X keysym名称的映射（其余键名直接按keysym名称查找）
+_X11_KEY_ALIASES = {
+    'esc': 'Escape',
+    'escape': 'Escape',
+    'enter': 'Return',
+    'return': 'Return',
+    'tab': 'Tab',
+    'backspace': 'BackSpace',
+    'ctrl': 'Control_L',
+    'shift': 'Shift_L',
+    'alt': 'Alt_L',
+    'up': 'Up',
+    'down': 'Down',
+    'left': 'Left',
+    'right': 'Right',
+}
+
+
+class InputBackend:
+    """输入后端接口
+    
+    子类至少需要实现 _move_now、mouse_down、mouse_up、press 和 position；
+    带时长的移动由基类按固定频率插值，每一步都对齐到预定时间点，避免误差累积
+    """
+    
+    name = 'base'
+    
+    def __init__(self, move_rate: Optional[float] = None):
+        """
+        Args:
+            move_rate: 带时长移动时每秒发送的移动事件数，None则使用 automation.move_rate
+        """
+        if move_rate is None:
+            move_rate = get_config().get('automation.move_rate', 120)
+        self.move_rate = max(float(move_rate), 1.0)
+    
+    def _move_now(self, x: int, y: int, scheduled: Optional[float] = None):
+        """
+        立即把鼠标移动到指定位置
+        
+        Args:
+            x: 屏幕横坐标
+            y: 屏幕纵坐标
+            scheduled: 该事件预定的发送时间（time.monotonic），用于统计调度抖动
+        """
+        raise NotImplementedError
+    
+    def position(self) -> Tuple[int, int]:
+        """当前鼠标位置"""
+        raise NotImplementedError
+    
+    def mouse_down(self, button: str = 'left'):
+        """按下鼠标按键"""
+        raise NotImplementedError
+    
+    def mouse_up(self, button: str = 'left'):
+        """松开鼠标按键"""
+        raise NotImplementedError
+    
+    def press(self, key: str):
+        """按下并松开单个键"""
+        raise NotImplementedError
+    
+    def hotkey(self, *keys: str):
+        """依次按下组合键后逆序松开（默认实现退化为逐个按键）"""
+        for key in keys:
+            self.press(key)
+    
+    def move_to(self, x: int, y: int, duration: float = 0.0):
+        """
+        移动鼠标，duration大于0时按 move_rate 平滑插值
+        
+        Args:
+            x: 目标横坐标
+            y: 目标纵坐标
+            duration: 移动时长（秒）
+        """
+        if duration <= 0:
+            self._move_now(int(x), int(y))
+            return
+        
+        start_x, start_y = self.position()
+        steps = max(1, int(duration * self.move_rate))
+        start = time.monotonic()
+        for i in range(1, steps + 1):
+            scheduled = start + duration * i / steps
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            t = i / steps
+            self._move_now(round(start_x + (x - start_x) * t),
+                           round(start_y + (y - start_y) * t), scheduled)
+    
+    def click(self, x: int, y: int, clicks: int = 1, button: str = 'left'):
+        """在指定位置点击"""
+        self._move_now(int(x), int(y))
+        for _ in range(clicks):
+            self.mouse_down(button)
+            self.mouse_up(button)
+    
+    def drag_path(self, points: Sequence[Tuple[int, int]], durations: Sequence[float],
+                  button: str = 'left', press_settle: float = 0.0, release_settle: float = 0.0):
+        """
+        按住鼠标沿路径拖拽
+        
+        Args:
+            points: 路径点，至少两个
+            durations: 每一段的移动时长（秒），长度为 len(points) - 1
+            button: 鼠标按键
+            press_settle: 按下后开始移动前的停顿（秒）
+            release_settle: 松开前的停顿（秒）
+        """
+        self.move_to(*points[0])
+        self.mouse_down(button)
+        try:
+            if press_settle > 0:
+                time.sleep(press_settle)
+            for point, duration in zip(points[1:], durations):
+                self.move_to(point[0], point[1], duration)
+            if release_settle > 0:
+                time.sleep(release_settle)
+        finally:
+            self.mouse_up(button)
+    
+    def close(self):
+        """释放后端资源"""
+        pass
+
+
+class PyAutoGUIInputBackend(InputBackend):
+    """pyautogui后端（macOS和桌面Linux的默认选择）"""
+    
+    name = 'pyautogui'
+    
+    def __init__(self, move_rate: Optional[float] = None, failsafe: Optional[bool] = None):
+        """
+        Args:
+            move_rate: 保留给基类，pyautogui使用自身的插值
+            failsafe: 是否启用pyautogui的角落紧急停止，None则使用 automation.failsafe
+        """
+        super().__init__(move_rate)
+        if failsafe is None:
+            failsafe = get_config().get('automation.failsafe', False)
+        self.failsafe = failsafe
+        self._configured = False
+        # 当前按住的鼠标按键：按住期间的移动必须作为拖拽事件发送
+        self._held: Optional[str] = None
+    
+    def _configure(self):
+        """首次发送事件时再设置pyautogui，避免仅创建对象就导入pyautogui"""
+        if not self._configured:
+            pyautogui.FAILSAFE = self.failsafe
+            self._configured = True
+    
+    def _move_now(self, x: int, y: int, scheduled: Optional[float] = None):
+        self.move_to(x, y)
+    
+    def move_to(self, x: int, y: int, duration: float = 0.0):
+        self._configure()
+        if self._held is None:
+            pyautogui.moveTo(int(x), int(y), duration=duration, _pause=False)
+        elif (int(x), int(y)) == self.position():
+            # pyautogui不能对零距离的拖拽插值，原地停留
+            if duration > 0:
+                time.sleep(duration)
+        else:
+            # macOS上按住按键时 moveTo 只产生移动事件，游戏收不到拖拽
+            pyautogui.dragTo(int(x), int(y), duration=duration, button=self._held,
+                             mouseDownUp=False, _pause=False)
+    
+    def position(self) -> Tuple[int, int]:
+        x, y = pyautogui.position()
+        return (int(x), int(y))
+    
+    def mouse_down(self, button: str = 'left'):
+        self._configure()
+        pyautogui.mouseDown(button=button, _pause=False)
+        self._held = button
+    
+    def mouse_up(self, button: str = 'left'):
+        self._configure()
+        try:
+            pyautogui.mouseUp(button=button, _pause=False)
+        finally:
+            self._held = None
+    
+    def click(self, x: int, y: int, clicks: int = 1, button: str = 'left'):
+        self._configure()
+        pyautogui.click(int(x), int(y), clicks=clicks, button=button, _pause=False)
+    
+    def press(self, key: str):
+        self._configure()
+        pyautogui.press(key, _pause=False)
+    
+    def hotkey(self, *keys: str):
+        self._configure()
+        pyautogui.hotkey(*keys, _pause=False)
+
+
+class XTestInputBackend(InputBackend):
+    """X11 XTest后端：通过python-xlib直接注入事件，可在Xvfb下运行"""
+    
+    name = 'xtest'
+    
+    def __init__(self, move_rate: Optional[float] = None, display_name: Optional[str] = None):
+        """
+        Args:
+            move_rate: 带时长移动时每秒发送的移动事件数
+            display_name: X显示名称，None表示使用DISPLAY环境变量
+        """
+        super().__init__(move_rate)
+        self.display_name = display_name
+        self._display = None
+        self._keycodes = {}
+    
+    @property
+    def display(self):
+        """X服务器连接，首次访问时建立"""
+        if self._display is None:
+            self._display = xdisplay.Display(self.display_name)
+        return self._display
+    
+    def _keycode(self, key: str) -> int:
+        """把pyautogui风格的键名转换为X键码（带缓存）"""
+        keycode = self._keycodes.get(key)
+        if keycode is None:
+            keysym = XK.string_to_keysym(_X11_KEY_ALIASES.get(key, key))
+            keycode = self.display.keysym_to_keycode(keysym)
+            if not keycode:
+                raise ValueError(f"无法映射按键: {key}")
+            self._keycodes[key] = keycode
+        return keycode
+    
+    def _move_now(self, x: int, y: int, scheduled: Optional[float] = None):
+        xtest.fake_input(self.display, X.MotionNotify, x=int(x), y=int(y))
+        self.display.sync()
+    
+    def position(self) -> Tuple[int, int]:
+        pointer = self.display.screen().root.query_pointer()
+        return (pointer.root_x, pointer.root_y)
+    
+    def mouse_down(self, button: str = 'left'):
+        xtest.fake_input(self.display, X.ButtonPress, _X11_BUTTONS[button])
+        self.display.sync()
+    
+    def mouse_up(self, button: str = 'left'):
+        xtest.fake_input(self.display, X.ButtonRelease, _X11_BUTTONS[button])
+        self.display.sync()
+    
+    def press(self, key: str):
+        keycode = self._keycode(key)
+        xtest.fake_input(self.display, X.KeyPress, keycode)
+        xtest.fake_input(self.display, X.KeyRelease, keycode)
+        self.display.sync()
+    
+    def hotkey(self, *keys: str):
+        keycodes = [self._keycode(key) for key in keys]
+        for keycode in keycodes:
+            xtest.fake_input(self.display, X.KeyPress, keycode)
+        for keycode in reversed(keycodes):
+            xtest.fake_input(self.display, X.KeyRelease, keycode)
+        self.display.sync()
+    
+    def close(self):
+        if self._display is not None:
+            self._display.close()
+            self._display = None
+
+
+class RecordingInputBackend(InputBackend):
+    """记录后端：不发送真实事件，只为每个事件记录类型、参数和时间戳
+    
+    每个事件是一个字典：{'type', 'x', 'y', 'button', 'key', 'time', 'scheduled'}，
+    其中 scheduled 只有插值移动事件才有，time - scheduled 即调度抖动；
+    按住按键期间的移动记录为 'drag' 事件（button 为按住的按键）
+    """
+    
+    name = 'recording'
+    
+    def __init__(self, move_rate: Optional[float] = None):
+        super().__init__(move_rate)
+        self.events: List[dict] = []
+        self._position = (0, 0)
+        self._held: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def _record(self, event_type: str, scheduled: Optional[float] = None, **fields):
+        """追加一条事件记录"""
+        event = {'type': event_type, 'time': time.monotonic(), 'scheduled': scheduled}
+        event.update(fields)
+        with self._lock:
+            self.events.append(event)
+    
+    def _move_now(self, x: int, y: int, scheduled: Optional[float] = None):
+        self._position = (int(x), int(y))
+        if self._held is None:
+            self._record('move', scheduled, x=int(x), y=int(y))
+        else:
+            self._record('drag', scheduled, x=int(x), y=int(y), button=self._held)
+    
+    def position(self) -> Tuple[int, int]:
+        return self._position
+    
+    def mouse_down(self, button: str = 'left'):
+        self._held = button
+        self._record('mouse_down', button=button, x=self._position[0], y=self._position[1])
+    
+    def mouse_up(self, button: str = 'left'):
+        self._held = None
+        self._record('mouse_up', button=button, x=self._position[0], y=self._position[1])
+    
+    def press(self, key: str):
+        self._record('key', key=key)
+    
+    def hotkey(self, *keys: str):
+        self._record('hotkey', key='+'.join(keys))
+    
+    def clear(self):
+        """清空事件记录"""
+        with self._lock:
+            self.events = []
+    
+    def summary(self) -> dict:
+        """
+        统计事件吞吐量和插值移动的调度抖动
+        
+        Returns:
+            {'events', 'duration_s', 'events_per_second',
+             'jitter_p50_ms', 'jitter_p95_ms', 'jitter_max_ms'}
+        """
+        with self._lock:
+            events = list(self.events)
+        if not events:
+            return {'events': 0, 'duration_s': 0.0, 'events_per_second': 0.0,
+                    'jitter_p50_ms': 0.0, 'jitter_p95_ms': 0.0, 'jitter_max_ms': 0.0}
+        
+        duration = events[-1]['time'] - events[0]['time']
+        jitters = sorted((e['time'] - e['scheduled']) * 1000
+                         for e in events if e['scheduled'] is not None)
+        
+        def percentile(p: float) -> float:
+            if not jitters:
+                return 0.0
+            return round(jitters[min(len(jitters) - 1, int(p * len(jitters)))], 3)
+        
+        return {
+            'events': len(events),
+            'duration_s': round(duration, 4),
+            'events_per_second': round(len(events) / duration, 1) if duration > 0 else 0.0,
+            'jitter_p50_ms': percentile(0.5),
+            'jitter_p95_ms': percentile(0.95),
+            'jitter_max_ms': round(jitters[-1], 3) if jitters else 0.0
+        }
+
+
+def create_input_backend(name: str = 'auto', **kwargs) -> InputBackend:
+    """
+    根据名称创建输入后端
+    
+    Args:
+        name: 'auto'（等同于pyautogui）、'pyautogui'、'xtest' 或 'recording'
+        **kwargs: 传给后端构造函数的参数
+    
+    Returns:
+        输入后端实例
+    """
+    if name in ('auto', 'pyautogui'):
+        return PyAutoGUIInputBackend(**kwargs)
+    if name == 'xtest':
+        if not sys.platform.startswith('linux'):
+            raise ValueError("XTest输入后端只支持Linux/X11")
+        return XTestInputBackend(**kwargs)
+    if name == 'recording':
+        return RecordingInputBackend(**kwargs)
+    raise ValueError(f"未知的输入后端: {name}")
@@ -0,0 +1,172 @@
+"""
+点击到画面延迟跟踪器
+在输入操作发出前截取基准帧，操作发出后高频截图，找到受影响区域第一次出现变化的帧，
+把“输入发出 → 画面响应”的耗时按操作类型和界面分别统计，用于替代固定的等待时间
+"""
+
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+from ..utils.logger import get_logger
+from ..utils.latency import latency_distribution
+
+
+class LatencyTracker:
+    """点击到画面延迟跟踪器
+    
+    用法：
+        probe = tracker.begin(region)
+        future = executor.click(x, y)
+        sample = tracker.complete(probe, future, screen='main_menu')
+    """
+    
+    def __init__(self, screenshot_manager, max_samples: int = 500, register: bool = True):
+        """
+        初始化跟踪器
+        
+        Args:
+            screenshot_manager: 截图管理器，用于截取基准帧和等待变化
+            max_samples: 每个 (操作类型, 界面) 组合保留的最近样本数
+            register: 是否把统计结果注册到会话统计信息
+        """
+        self.screenshot_manager = screenshot_manager
+        self.logger = get_logger()
+        self.max_samples = max_samples
+        # 当前界面名称，由界面识别结果更新；complete未指定界面时使用
+        self.current_screen = 'unknown'
+        # (操作类型, 界面) -> 最近的延迟样本（秒）
+        self._samples = {}
+        self._timeouts = {}
+        self._lock = threading.Lock()
+        if register:
+            self.logger.register_statistics("点击到画面延迟", self.statistics)
+    
+    def set_screen(self, screen: str):
+        """更新当前界面名称"""
+        self.current_screen = screen
+    
+    def begin(self, region: Optional[Tuple[int, int, int, int]] = None) -> dict:
+        """
+        在提交输入操作之前截取基准帧
+        
+        Args:
+            region: 受操作影响的区域，None则使用当前窗口区域
+        
+        Returns:
+            探测上下文，传给 complete
+        """
+        return {
+            'region': region,
+            'baseline': self.screenshot_manager.grab(region)
+        }
+    
+    def complete(self, probe: dict, action_result, timeout: float = 2.0,
+                 screen: Optional[str] = None) -> dict:
+        """
+        等待受影响区域出现变化并记录延迟
+        
+        传入ActionExecutor返回的Future时，输入事件一发出就开始轮询，与执行器在操作后的
+        日志记录和点击间隔并行，低于 click_delay 的延迟也能测到
+        
+        Args:
+            probe: begin 返回的探测上下文
+            action_result: ActionExecutor返回的Future，或Future的结果字典（需要包含 issued_at）
+            timeout: 最长等待时间（秒）
+            screen: 操作所在的界面，None则使用 current_screen
+        
+        Returns:
+            wait_for_change 的结果字典加上 issued（输入事件是否发出），latency_s 从输入事件发出时开始计算；
+            超时内没有发出（操作失败、被合并或执行器阻塞）时不等待变化，
+            latency_s 为None，只计入超时次数
+        """
+        action = getattr(action_result, 'action', None)
+        if action is not None:
+            action.issued.wait(timeout)
+            kind, since = action.kind, action.issued_at
+        else:
+            kind, since = action_result.get('action', 'action'), action_result.get('issued_at')
+        if since is None:
+            self.record(kind, 0.0, screen, changed=False)
+            return {'changed': False, 'issued': False, 'latency_s': None, 'score': 0.0, 'frames': 0,
+                    'frame': probe['baseline']}
+        change = self.screenshot_manager.wait_for_change(
+            probe['region'], baseline=probe['baseline'], since=since, timeout=timeout
+        )
+        self.record(kind, change['latency_s'], screen, changed=change['changed'])
+        change['issued'] = True
+        return change
+    
+    def record(self, kind: str, latency_s: float, screen: Optional[str] = None, changed: bool = True):
+        """
+        记录一个延迟样本
+        
+        Args:
+            kind: 操作类型（click、drag、key等）
+            latency_s: 延迟（秒）
+            screen: 界面名称，None则使用 current_screen
+            changed: 是否检测到变化；未检测到的只计入超时次数
+        """
+        key = (kind, screen or self.current_screen)
+        with self._lock:
+            if not changed:
+                self._timeouts[key] = self._timeouts.get(key, 0) + 1
+                return
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.max_samples)
+                self._samples[key] = samples
+            samples.append(latency_s)
+    
+    def distribution(self, kind: Optional[str] = None, screen: Optional[str] = None) -> dict:
+        """
+        统计延迟分布
+        
+        Args:
+            kind: 只统计该操作类型，None表示全部
+            screen: 只统计该界面，None表示全部
+        
+        Returns:
+            {'count', 'timeouts', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'}
+        """
+        with self._lock:
+            values = sorted(value for key, samples in self._samples.items()
+                            if (kind is None or key[0] == kind) and (screen is None or key[1] == screen)
+                            for value in samples)
+            timeouts = sum(count for key, count in self._timeouts.items()
+                           if (kind is None or key[0] == kind) and (screen is None or key[1] == screen))
+        return dict(latency_distribution(values, scale=1000), timeouts=timeouts)
+    
+    def suggested_delay(self, kind: str, screen: Optional[str] = None,
+                        percentile: str = 'p90_ms', default: Optional[float] = None) -> Optional[float]:
+        """
+        根据实测分布给出等待时间（秒），样本不足时返回default
+        
+        Args:
+            kind: 操作类型
+            screen: 界面名称，None表示所有界面
+            percentile: 使用的分位数字段，如 'p50_ms'、'p90_ms'
+            default: 没有样本时的返回值
+        """
+        stats = self.distribution(kind, screen)
+        if stats['count'] == 0:
+            return default
+        return stats[percentile] / 1000
+    
+    def statistics(self) -> dict:
+        """
+        会话统计用的汇总：每个 (操作类型, 界面) 一行
+        
+        Returns:
+            {'click @ main_menu': 'n=12, p50=85.0ms, p90=120.3ms, max=160.2ms, 超时=0', ...}
+        """
+        with self._lock:
+            keys = sorted(set(self._samples) | set(self._timeouts))
+        lines = {}
+        for kind, screen in keys:
+            stats = self.distribution(kind, screen)
+            lines[f"{kind} @ {screen}"] = (
+                f"n={stats['count']}, p50={stats['p50_ms']}ms, p90={stats['p90_ms']}ms, "
+                f"max={stats['max_ms']}ms, 超时={stats['timeouts']}"
+            )
+        return lines
@@ -0,0 +1,311 @@
+"""
+游戏进程跟踪器
+只在首次或进程消失后解析一次游戏PID，之后用信号0或/proc廉价地检查存活状态，
+并在进程退出或重启时通知订阅者
+"""
+
+import os
+import sys
+import time
+import select
+import threading
+import subprocess
+from pathlib import Path
+from typing import Callable, Optional, List
+
+from ..utils.logger import get_logger
+
+
+class ProcessBackend:
+    """进程查询后端接口"""
+    
+    name = 'base'
+    
+    def find_pid(self, process_name: str) -> Optional[int]:
+        """
+        按名称查找进程（较慢，只在需要重新解析时调用）
+        
+        Args:
+            process_name: 进程名称或命令行子串
+        
+        Returns:
+            进程PID，未找到返回None
+        """
+        raise NotImplementedError
+    
+    def is_alive(self, pid: int) -> bool:
+        """廉价地检查进程是否存在"""
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # 进程存在但属于其他用户
+            return True
+        return True
+    
+    def identity(self, pid: int) -> Optional[object]:
+        """
+        返回能区分PID复用的进程标识（如启动时间），不支持时返回None
+        """
+        return None
+    
+    def exit_handle(self, pid: int) -> Optional[int]:
+        """
+        返回一个在进程退出时变为可读的文件描述符，不支持时返回None
+        """
+        return None
+
+
+class PosixProcessBackend(ProcessBackend):
+    """通用POSIX后端：pgrep/ps解析PID，信号0检查存活（macOS使用）"""
+    
+    name = 'posix'
+    
+    def find_pid(self, process_name: str) -> Optional[int]:
+        own_pid = os.getpid()
+        result = subprocess.run(['pgrep', '-f', process_name],
+                                capture_output=True, text=True)
+        if result.returncode == 0:
+            for field in result.stdout.split():
+                if field.isdigit() and int(field) != own_pid:
+                    return int(field)
+        
+        # 尝试另一种检查方式
+        result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
+        for line in result.stdout.splitlines():
+            if process_name in line:
+                # ps aux 的第二列是PID
+                fields = line.split()
+                if len(fields) > 1 and fields[1].isdigit() and int(fields[1]) != own_pid:
+                    return int(fields[1])
+        return None
+
+
+class LinuxProcessBackend(ProcessBackend):
+    """Linux后端：直接读取/proc，不启动子进程；支持pidfd退出通知"""
+    
+    name = 'linux'
+    
+    def __init__(self, proc_root: str = '/proc'):
+        self.proc_root = Path(proc_root)
+    
+    def find_pid(self, process_name: str) -> Optional[int]:
+        own_pid = os.getpid()
+        needle = process_name.encode('utf-8')
+        for entry in self.proc_root.iterdir():
+            if not entry.name.isdigit() or int(entry.name) == own_pid:
+                continue
+            try:
+                comm = (entry / 'comm').read_bytes().strip()
+                cmdline = (entry / 'cmdline').read_bytes().replace(b'\0', b' ')
+            except OSError:
+                # 进程在扫描过程中退出
+                continue
+            if needle in comm or needle in cmdline:
+                return int(entry.name)
+        return None
+    
+    def is_alive(self, pid: int) -> bool:
+        return (self.proc_root / str(pid)).exists()
+    
+    def identity(self, pid: int) -> Optional[object]:
+        try:
+            stat = (self.proc_root / str(pid) / 'stat').read_text()
+        except OSError:
+            return None
+        # 进程名可能包含空格和括号，从最后一个')'之后开始解析；第22个字段是启动时间
+        fields = stat[stat.rfind(')') + 2:].split()
+        return int(fields[19]) if len(fields) > 19 else None
+    
+    def exit_handle(self, pid: int) -> Optional[int]:
+        pidfd_open = getattr(os, 'pidfd_open', None)
+        if pidfd_open is None:
+            return None
+        try:
+            return pidfd_open(pid)
+        except OSError:
+            return None
+
+
+def create_process_backend(name: str = 'auto') -> ProcessBackend:
+    """
+    根据名称或当前平台创建进程后端
+    
+    Args:
+        name: 后端名称 'auto'、'linux' 或 'posix'
+    
+    Returns:
+        进程后端实例
+    """
+    if name == 'auto':
+        name = 'linux' if sys.platform.startswith('linux') else 'posix'
+    if name == 'linux':
+        return LinuxProcessBackend()
+    if name == 'posix':
+        return PosixProcessBackend()
+    raise ValueError(f"未知的进程后端: {name}")
+
+
+class ProcessTracker:
+    """游戏进程跟踪器
+    
+    事件以字典形式传给订阅者：
+    {'type': 'started' | 'exited' | 'restarted', 'pid': int, 'old_pid': int, 'time': float}
+    """
+    
+    def __init__(self, process_name: str = 'Mini Motorways',
+                 backend: Optional[ProcessBackend] = None,
+                 poll_interval: float = 0.5,
+                 rescan_interval: float = 2.0):
+        """
+        初始化进程跟踪器
+        
+        Args:
+            process_name: 进程名称或命令行子串
+            backend: 进程后端，None则按平台自动选择
+            poll_interval: 后台线程检查存活状态的间隔（秒）
+            rescan_interval: 进程消失后重新查找的间隔（秒）
+        """
+        self.process_name = process_name
+        self.backend = backend or create_process_backend()
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.logger = get_logger()
+        
+        self.pid = None
+        self._identity = None
+        # 最近一次退出的PID，用于区分首次启动和重启
+        self._last_pid = None
+        self._subscribers: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        # 进程退出时置位，主循环可以直接等待该事件
+        self.exited = threading.Event()
+    
+    def subscribe(self, callback: Callable[[dict], None]):
+        """订阅进程事件"""
+        self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[dict], None]):
+        """取消订阅"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _emit(self, event_type: str, pid: Optional[int], old_pid: Optional[int] = None):
+        """通知所有订阅者"""
+        event = {
+            'type': event_type,
+            'pid': pid,
+            'old_pid': old_pid,
+            'time': time.monotonic()
+        }
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception as e:
+                self.logger.add_error(f"进程事件回调失败: {str(e)}")
+    
+    def resolve(self) -> Optional[int]:
+        """
+        完整查找游戏进程并记录其PID（较慢）
+        
+        Returns:
+            进程PID，未找到返回None
+        """
+        try:
+            pid = self.backend.find_pid(self.process_name)
+        except Exception as e:
+            self.logger.add_error(f"查找游戏进程失败: {str(e)}")
+            pid = None
+        
+        with self._lock:
+            old_pid = self.pid
+            self.pid = pid
+            self._identity = self.backend.identity(pid) if pid is not None else None
+        
+        if pid is not None:
+            self.exited.clear()
+            previous = old_pid if old_pid is not None else self._last_pid
+            self._last_pid = pid
+            if previous is None:
+                self._emit('started', pid)
+            elif pid != old_pid:
+                self._emit('restarted', pid, previous)
+        return pid
+    
+    def is_alive(self) -> bool:
+        """
+        廉价地检查已解析的进程是否存活（不启动子进程）
+        
+        Returns:
+            进程是否存活；尚未解析PID时返回False
+        """
+        pid = self.pid
+        if pid is None:
+            return False
+        if not self.backend.is_alive(pid):
+            return False
+        # PID可能已被其他进程复用
+        identity = self._identity
+        return identity is None or self.backend.identity(pid) == identity
+    
+    def check(self) -> bool:
+        """
+        检查存活状态，发现退出时发出事件
+        
+        Returns:
+            进程是否存活
+        """
+        pid = self.pid
+        if self.is_alive():
+            return True
+        if pid is not None:
+            with self._lock:
+                if self.pid == pid:
+                    self.pid = None
+                    self._identity = None
+            self.exited.set()
+            self._emit('exited', None, pid)
+        return False
+    
+    def start(self):
+        """启动后台监视线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="ProcessTracker", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """停止后台监视线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+    
+    def _wait_for_exit(self, pid: int):
+        """等待进程退出：优先使用pidfd立即感知，否则按间隔轮询"""
+        handle = self.backend.exit_handle(pid)
+        if handle is None:
+            self._stop_event.wait(self.poll_interval)
+            return
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([handle], [], [], self.poll_interval)
+                if readable:
+                    return
+        finally:
+            os.close(handle)
+    
+    def _watch_loop(self):
+        """后台线程：进程存在时等待其退出，消失后定期重新查找"""
+        while not self._stop_event.is_set():
+            pid = self.pid
+            if pid is None:
+                if self.resolve() is None:
+                    self._stop_event.wait(self.rescan_interval)
+                continue
+            if self.check():
+                self._wait_for_exit(pid)
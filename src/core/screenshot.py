@@ -3,18 +3,26 @@
 负责游戏画面的截图、保存和管理
 """
 
+import itertools
 import os
 import time
+import threading
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
-import cv2
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont
-import mss
+from typing import List, Optional, Tuple
 
 from ..utils.logger import get_logger
 from ..utils.config import get_config
+from ..utils.lazy_import import lazy_import
+from .frame import Frame
+
+# 重量级依赖延迟到首次使用时导入
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+mss = lazy_import('mss')
+Image = lazy_import('PIL.Image')
+ImageDraw = lazy_import('PIL.ImageDraw')
+ImageFont = lazy_import('PIL.ImageFont')
 
 
 class ScreenshotManager:
@@ -28,11 +36,219 @@ class ScreenshotManager:
         self.current_session_dir = None
         self.screenshot_count = 0
         
+        # mss实例不能跨线程共享，每个线程各自创建
+        self._sct_local = threading.local()
+        
+        # 当前游戏窗口的截图区域，由窗口监视器推送更新
+        self.capture_region = None
+        self.region_generation = 0
+        # 命名的感兴趣区域，坐标相对于游戏窗口 (x, y, width, height)
+        self.rois = {}
+        self._frame_seq = itertools.count()
+        
         # 创建截图目录
         self._setup_directories()
+    
+    @property
+    def sct(self):
+        """当前线程的截图工具实例，首次使用时创建"""
+        sct = getattr(self._sct_local, 'sct', None)
+        if sct is None:
+            sct = mss.mss()
+            self._sct_local.sct = sct
+        return sct
+    
+    def _region_to_monitor(self, region: Optional[Tuple[int, int, int, int]]) -> dict:
+        """把 (left, top, width, height) 转换为mss的区域描述，None表示主显示器"""
+        if region:
+            return {
+                "left": int(region[0]),
+                "top": int(region[1]),
+                "width": int(region[2]),
+                "height": int(region[3])
+            }
+        return self.sct.monitors[1]
+    
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> 'np.ndarray':
+        """
+        截取区域并直接返回图像数组（不保存文件），用于高频分析
+        
+        Args:
+            region: 截图区域 (left, top, width, height)，None则使用当前窗口区域或主显示器
+            
+        Returns:
+            BGR格式的图像数组
+        """
+        if region is None:
+            region = self.capture_region
+        shot = self.sct.grab(self._region_to_monitor(region))
+        # mss返回BGRA，去掉alpha通道即为OpenCV使用的BGR
+        return np.asarray(shot)[:, :, :3]
+    
+    def grab_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> Frame:
+        """
+        截取区域并返回帧对象，灰度图、缩小图等派生视图由各使用者共享
+        
+        Args:
+            region: 截图区域 (left, top, width, height)，None则使用当前窗口区域或主显示器
+            
+        Returns:
+            带序号和截图时间的帧（原始缓冲区为BGRA）
+        """
+        if region is None:
+            region = self.capture_region
+        captured_at = time.monotonic()
+        shot = self.sct.grab(self._region_to_monitor(region))
+        return Frame(np.asarray(shot), region, next(self._frame_seq), captured_at)
+    
+    @staticmethod
+    def frame_difference(image_a: 'np.ndarray', image_b: 'np.ndarray', step: int = 2) -> float:
+        """
+        计算两帧的平均像素差异（0-255），按步长抽样以降低开销
+        
+        Args:
+            image_a: 第一帧
+            image_b: 第二帧
+            step: 抽样步长
+            
+        Returns:
+            平均绝对差
+        """
+        if image_a.shape != image_b.shape:
+            return 255.0
+        diff = cv2.absdiff(image_a[::step, ::step], image_b[::step, ::step])
+        return float(diff.mean())
+    
+    @staticmethod
+    def changed_regions(image_a: 'np.ndarray', image_b: 'np.ndarray', threshold: int = 12,
+                        block: int = 16) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        两帧之间发生变化的矩形区域，按块检测后合并相邻的变化块
+        
+        Args:
+            image_a: 前一帧（灰度或彩色）
+            image_b: 后一帧
+            threshold: 判定为变化的像素差异
+            block: 检测块的边长（像素）
+            
+        Returns:
+            变化区域 (x, y, w, h) 列表，没有变化时为空列表；两帧尺寸不同时返回None
+        """
+        if image_a.shape != image_b.shape:
+            return None
+        diff = cv2.absdiff(image_a, image_b)
+        if diff.ndim == 3:
+            diff = diff.max(axis=2)
+        height, width = diff.shape
+        rows, cols = -(-height // block), -(-width // block)
+        padded = np.zeros((rows * block, cols * block), dtype=diff.dtype)
+        padded[:height, :width] = diff
+        changed = padded.reshape(rows, block, cols, block).max(axis=(1, 3)) > threshold
+        if not changed.any():
+            return []
+        _, _, stats, _ = cv2.connectedComponentsWithStats(changed.astype(np.uint8), connectivity=8)
+        return [(int(x) * block, int(y) * block,
+                 min(int(w) * block, width - int(x) * block), min(int(h) * block, height - int(y) * block))
+                for x, y, w, h, _ in stats[1:]]
+    
+    def wait_for_change(self, region: Optional[Tuple[int, int, int, int]] = None,
+                        threshold: Optional[float] = None, timeout: float = 5.0,
+                        baseline: Optional['np.ndarray'] = None,
+                        since: Optional[float] = None,
+                        interval: Optional[float] = None) -> dict:
+        """
+        高频轮询目标区域，检测到明显变化立即返回
         
-        # 初始化截图工具
-        self.sct = mss.mss()
+        Args:
+            region: 监测区域 (left, top, width, height)，None则使用当前窗口区域
+            threshold: 判定为变化的平均像素差异，None则使用 automation.change_threshold
+            timeout: 最长等待时间（秒）
+            baseline: 对比基准帧，None则以调用时的第一帧为基准
+            since: 计算延迟的起点（time.monotonic()时间），如点击完成的时间；None则从调用时开始
+            interval: 两次截图的最小间隔（秒），None则使用 automation.change_poll_interval
+            
+        Returns:
+            结果字典：changed（是否变化）、latency_s（从起点到检测到变化的时间）、
+            score（最终差异）、frames（截取的帧数）、frame（最后一帧）
+        """
+        if threshold is None:
+            threshold = self.config.get('automation.change_threshold', 10.0)
+        if interval is None:
+            interval = self.config.get('automation.change_poll_interval', 0.01)
+        
+        start = time.monotonic()
+        if since is None:
+            since = start
+        if baseline is None:
+            baseline = self.grab(region)
+        
+        frames = 0
+        score = 0.0
+        frame = baseline
+        deadline = start + timeout
+        while True:
+            frame_time = time.monotonic()
+            frame = self.grab(region)
+            frames += 1
+            score = self.frame_difference(baseline, frame)
+            if score >= threshold:
+                return {
+                    'changed': True,
+                    'latency_s': frame_time - since,
+                    'score': score,
+                    'frames': frames,
+                    'frame': frame
+                }
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {
+                    'changed': False,
+                    'latency_s': time.monotonic() - since,
+                    'score': score,
+                    'frames': frames,
+                    'frame': frame
+                }
+            elapsed = time.monotonic() - frame_time
+            if elapsed < interval:
+                time.sleep(min(interval - elapsed, remaining))
+    
+    def wait_for_stable(self, region: Optional[Tuple[int, int, int, int]] = None,
+                        threshold: float = 2.0, stable_frames: int = 3,
+                        timeout: float = 3.0, interval: Optional[float] = None) -> dict:
+        """
+        等待画面稳定（连续若干帧差异低于阈值），用于界面切换动画结束后再截图分析
+        
+        Args:
+            region: 监测区域，None则使用当前窗口区域
+            threshold: 相邻帧平均差异低于该值视为静止
+            stable_frames: 需要连续静止的帧数
+            timeout: 最长等待时间（秒）
+            interval: 两次截图的最小间隔（秒），None则使用 automation.change_poll_interval
+            
+        Returns:
+            结果字典：stable（是否稳定）、elapsed_s（耗时）、frames（截取的帧数）、frame（最后一帧）
+        """
+        if interval is None:
+            interval = self.config.get('automation.change_poll_interval', 0.01)
+        
+        start = time.monotonic()
+        previous = self.grab(region)
+        frames = 1
+        still = 0
+        while still < stable_frames and time.monotonic() - start < timeout:
+            time.sleep(interval)
+            frame = self.grab(region)
+            frames += 1
+            still = still + 1 if self.frame_difference(previous, frame) < threshold else 0
+            previous = frame
+        
+        return {
+            'stable': still >= stable_frames,
+            'elapsed_s': time.monotonic() - start,
+            'frames': frames,
+            'frame': previous
+        }
     
     def _setup_directories(self):
         """设置截图目录结构"""
@@ -46,13 +262,51 @@ class ScreenshotManager:
         
         self.logger.add_info(f"截图保存目录: {self.current_session_dir}")
     
+    def on_window_region_changed(self, region: Tuple[int, int, int, int], generation: int):
+        """
+        窗口监视器回调：更新截图区域
+        
+        Args:
+            region: 新的窗口截图区域 (left, top, width, height)
+            generation: 几何代数
+        """
+        self.capture_region = tuple(region)
+        self.region_generation = generation
+    
+    def add_roi(self, name: str, rect: Tuple[int, int, int, int]):
+        """
+        注册感兴趣区域
+        
+        Args:
+            name: 区域名称
+            rect: 相对于游戏窗口的区域 (x, y, width, height)
+        """
+        self.rois[name] = tuple(rect)
+    
+    def get_roi_region(self, name: str) -> Optional[Tuple[int, int, int, int]]:
+        """
+        获取感兴趣区域在屏幕上的绝对位置（随窗口移动自动更新）
+        
+        Args:
+            name: 区域名称
+            
+        Returns:
+            屏幕区域 (left, top, width, height)，未知区域或窗口位置未知时返回None
+        """
+        rect = self.rois.get(name)
+        if rect is None or self.capture_region is None:
+            return None
+        left, top = self.capture_region[0], self.capture_region[1]
+        return (left + rect[0], top + rect[1], rect[2], rect[3])
+    
     def take_screenshot(self, region: Optional[Tuple[int, int, int, int]] = None, 
                        description: str = "游戏截图") -> Optional[str]:
         """
         截取屏幕或指定区域
         
         Args:
-            region: 截图区域 (left, top, width, height)
+            region: 截图区域 (left, top, width, height)，None则使用窗口监视器推送的区域，
+                    两者都没有时截取主显示器
             description: 截图描述
             
         Returns:
@@ -63,16 +317,9 @@ class ScreenshotManager:
             timestamp = datetime.now().strftime("%H-%M-%S-%f")[:-3]  # 精确到毫秒
             
             # 确定截图区域
-            if region:
-                monitor = {
-                    "left": region[0],
-                    "top": region[1], 
-                    "width": region[2],
-                    "height": region[3]
-                }
-            else:
-                # 使用主显示器
-                monitor = self.sct.monitors[1]
+            if region is None:
+                region = self.capture_region
+            monitor = self._region_to_monitor(region)
             
             # 截图
             screenshot = self.sct.grab(monitor)
@@ -187,7 +434,7 @@ class ScreenshotManager:
             self.logger.add_error(f"创建标记截图失败: {str(e)}")
             return None
     
-    def save_debug_image(self, image_array: np.ndarray, filename: str, 
+    def save_debug_image(self, image_array: 'np.ndarray', filename: str, 
                         description: str = "调试图片") -> Optional[str]:
         """
         保存调试用的图片数组
@@ -0,0 +1,296 @@
+"""
+窗口平台后端
+定义窗口查找、几何查询、激活等操作的统一接口，并提供macOS实现
+"""
+
+import sys
+import json
+import subprocess
+from typing import Optional, Tuple, List
+
+from ..utils.logger import get_logger
+from ..utils.lazy_import import lazy_import
+
+pyautogui = lazy_import('pyautogui')
+
+
+class WindowBackend:
+    """窗口平台后端接口
+    
+    窗口信息统一使用字典表示：
+    {'found': bool, 'title': str, 'x': int, 'y': int, 'width': int, 'height': int}
+    """
+    
+    name = 'base'
+    # 是否支持通过窗口系统事件感知移动/缩放（不支持的后端只能轮询）
+    supports_events = False
+    
+    def __init__(self, window_title: str = 'Mini Motorways'):
+        """
+        初始化后端
+        
+        Args:
+            window_title: 要查找的窗口标题
+        """
+        self.window_title = window_title
+        self.logger = get_logger()
+    
+    def get_window_info(self, activate: bool = True) -> Optional[dict]:
+        """
+        查找游戏窗口并返回其信息
+        
+        Args:
+            activate: 查找前是否先激活应用
+        
+        Returns:
+            窗口信息字典或None
+        """
+        raise NotImplementedError
+    
+    def get_window_geometry(self) -> Optional[dict]:
+        """
+        廉价地查询已找到窗口的当前几何信息，用于缓存重新验证
+        
+        Returns:
+            窗口信息字典或None
+        """
+        return self.get_window_info(activate=False)
+    
+    def activate(self) -> bool:
+        """激活游戏窗口（置于前台）"""
+        raise NotImplementedError
+    
+    def move_resize(self, x: int, y: int, width: int, height: int) -> bool:
+        """移动并调整游戏窗口大小"""
+        raise NotImplementedError
+    
+    def list_windows(self) -> List[str]:
+        """列出所有窗口标题（用于调试）"""
+        raise NotImplementedError
+    
+    def screen_size(self) -> Tuple[int, int]:
+        """获取主屏幕分辨率"""
+        return tuple(pyautogui.size())
+    
+    def wait_for_geometry_change(self, timeout: float) -> Optional[dict]:
+        """
+        等待窗口移动或缩放事件
+        
+        Args:
+            timeout: 最长等待时间（秒）
+        
+        Returns:
+            变化后的窗口信息，超时或后端不支持事件时返回None
+        """
+        return None
+    
+    def close(self):
+        """释放后端持有的资源"""
+        pass
+
+
+class MacOSWindowBackend(WindowBackend):
+    """基于AppleScript的macOS窗口后端"""
+    
+    name = 'macos'
+    
+    def get_window_info(self, activate: bool = True) -> Optional[dict]:
+        """
+        使用AppleScript获取Mini Motorways窗口的准确信息
+        
+        Args:
+            activate: 是否先激活应用；缓存重新验证时跳过激活以节省时间
+        
+        Returns:
+            窗口信息字典或None
+        """
+        try:
+            if activate:
+                # 首先尝试激活应用，确保窗口可见
+                activate_script = '''
+                tell application "Mini Motorways"
+                    try
+                        activate
+                        delay 0.5
+                    on error
+                        -- 应用可能没有运行或无法激活
+                    end try
+                end tell
+                '''
+                
+                subprocess.run(['osascript', '-e', activate_script],
+                              capture_output=True, text=True, timeout=5)
+            
+            # 使用更健壮的AppleScript获取Mini Motorways窗口信息
+            script = '''
+            tell application "System Events"
+                try
+                    -- 方法1: 直接查找Mini Motorways进程
+                    set miniMotorwaysProcess to first process whose name is "Mini Motorways"
+                    
+                    -- 检查是否有窗口
+                    if (count of windows of miniMotorwaysProcess) > 0 then
+                        set miniMotorwaysWindow to first window of miniMotorwaysProcess
+                        
+                        set windowPosition to position of miniMotorwaysWindow
+                        set windowSize to size of miniMotorwaysWindow
+                        set windowTitle to title of miniMotorwaysWindow
+                        
+                        set windowX to item 1 of windowPosition
+                        set windowY to item 2 of windowPosition
+                        set windowWidth to item 1 of windowSize
+                        set windowHeight to item 2 of windowSize
+                        
+                        return "{" & quote & "found" & quote & ":true," & quote & "title" & quote & ":" & quote & windowTitle & quote & "," & quote & "x" & quote & ":" & windowX & "," & quote & "y" & quote & ":" & windowY & "," & quote & "width" & quote & ":" & windowWidth & "," & quote & "height" & quote & ":" & windowHeight & "}"
+                    else
+                        return "{" & quote & "found" & quote & ":false," & quote & "error" & quote & ":" & quote & "Mini Motorways process has no windows" & quote & "}"
+                    end if
+                
+                on error errMsg
+                    -- 方法2: 尝试查找包含"Mini Motorways"的窗口
+                    try
+                        repeat with proc in (every process whose background only is false)
+                            repeat with win in (every window of proc)
+                                set winTitle to title of win
+                                if winTitle contains "Mini Motorways" or name of proc contains "Mini Motorways" then
+                                    set windowPosition to position of win
+                                    set windowSize to size of win
+                                    
+                                    set windowX to item 1 of windowPosition
+                                    set windowY to item 2 of windowPosition
+                                    set windowWidth to item 1 of windowSize
+                                    set windowHeight to item 2 of windowSize
+                                    
+                                    return "{" & quote & "found" & quote & ":true," & quote & "title" & quote & ":" & quote & winTitle & quote & "," & quote & "x" & quote & ":" & windowX & "," & quote & "y" & quote & ":" & windowY & "," & quote & "width" & quote & ":" & windowWidth & "," & quote & "height" & quote & ":" & windowHeight & "}"
+                                end if
+                            end repeat
+                        end repeat
+                        
+                        return "{" & quote & "found" & quote & ":false," & quote & "error" & quote & ":" & quote & "No Mini Motorways window found in any process" & quote & "}"
+                    
+                    on error errMsg2
+                        return "{" & quote & "found" & quote & ":false," & quote & "error" & quote & ":" & quote & errMsg2 & quote & "}"
+                    end try
+                end try
+            end tell
+            '''
+            
+            result = subprocess.run(['osascript', '-e', script],
+                                  capture_output=True, text=True, timeout=15)
+            
+            if result.returncode == 0:
+                output = result.stdout.strip()
+                if activate:
+                    self.logger.add_info(f"AppleScript输出: {output}")
+                
+                try:
+                    # 解析JSON格式的输出
+                    window_data = json.loads(output)
+                    return window_data
+                except json.JSONDecodeError:
+                    self.logger.add_warning(f"无法解析窗口信息: {output}")
+                    return None
+            else:
+                self.logger.add_warning(f"获取窗口信息失败: {result.stderr}")
+                return None
+        
+        except Exception as e:
+            self.logger.add_error(f"获取窗口信息异常: {str(e)}")
+            return None
+    
+    def activate(self) -> bool:
+        """使用osascript激活Mini Motorways应用"""
+        try:
+            script = 'tell application "Mini Motorways" to activate'
+            result = subprocess.run(['osascript', '-e', script],
+                                  capture_output=True, text=True, timeout=5)
+            
+            if result.returncode == 0:
+                return True
+            else:
+                self.logger.add_warning(f"激活应用失败: {result.stderr}")
+                return False
+        
+        except Exception as e:
+            self.logger.add_error(f"激活应用失败: {str(e)}")
+            return False
+    
+    def move_resize(self, x: int, y: int, width: int, height: int) -> bool:
+        """使用System Events设置窗口位置和大小"""
+        try:
+            script = f'''
+            tell application "System Events"
+                tell first window of (first process whose name is "Mini Motorways")
+                    set position to {{{x}, {y}}}
+                    set size to {{{width}, {height}}}
+                end tell
+            end tell
+            '''
+            result = subprocess.run(['osascript', '-e', script],
+                                  capture_output=True, text=True, timeout=5)
+            if result.returncode != 0:
+                self.logger.add_warning(f"调整窗口失败: {result.stderr}")
+            return result.returncode == 0
+        
+        except Exception as e:
+            self.logger.add_error(f"调整窗口失败: {str(e)}")
+            return False
+    
+    def list_windows(self) -> List[str]:
+        """使用AppleScript列出所有窗口标题"""
+        try:
+            # 使用AppleScript获取所有窗口信息
+            script = '''
+            tell application "System Events"
+                set windowList to {}
+                repeat with proc in (every process whose background only is false)
+                    try
+                        repeat with win in (every window of proc)
+                            set windowList to windowList & {name of proc as string & " - " & name of win as string}
+                        end repeat
+                    end try
+                end repeat
+                return windowList
+            end tell
+            '''
+            
+            result = subprocess.run(['osascript', '-e', script],
+                                  capture_output=True, text=True, timeout=10)
+            
+            if result.returncode == 0:
+                output = result.stdout.strip()
+                if output:
+                    # 解析窗口列表
+                    return output.split(', ')
+                else:
+                    return []
+            else:
+                self.logger.add_warning(f"获取窗口列表失败: {result.stderr}")
+                return []
+        
+        except Exception as e:
+            self.logger.add_error(f"获取窗口列表失败: {str(e)}")
+            return []
+
+
+def create_window_backend(name: str = 'auto', window_title: str = 'Mini Motorways') -> WindowBackend:
+    """
+    根据名称或当前平台创建窗口后端
+    
+    Args:
+        name: 后端名称 'auto'、'macos' 或 'x11'
+        window_title: 要查找的窗口标题
+    
+    Returns:
+        窗口后端实例
+    """
+    if name == 'auto':
+        name = 'x11' if sys.platform.startswith('linux') else 'macos'
+    
+    if name == 'x11':
+        from .x11_backend import X11WindowBackend
+        return X11WindowBackend(window_title)
+    if name == 'macos':
+        return MacOSWindowBackend(window_title)
+    
+    raise ValueError(f"未知的窗口后端: {name}")
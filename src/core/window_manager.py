@@ -4,12 +4,11 @@
 """
 
 import time
-import subprocess
-import pyautogui
-import json
 from typing import Optional, Tuple, List
 from ..utils.logger import get_logger
 from ..utils.config import get_config
+from .window_backend import create_window_backend
+from .process_tracker import ProcessTracker, create_process_backend
 
 
 class WindowManager:
@@ -23,143 +22,152 @@ class WindowManager:
         self.window_title = self.config.get('game.window_title', 'Mini Motorways')
         self.expected_resolution = self.config.get('game.expected_resolution', [1920, 1080])
         
-        # 禁用pyautogui的安全特性，允许程序控制鼠标
-        pyautogui.FAILSAFE = False
+        # 平台窗口后端（macOS使用AppleScript，Linux使用X11）
+        self.backend = create_window_backend(
+            self.config.get('game.window_backend', 'auto'),
+            self.window_title
+        )
         
-        # macOS窗口信息（当找到窗口时会更新）
+        # 窗口信息（当找到窗口时会更新）
         self.window_info = {
             'found': False,
             'app_name': None,
             'window_bounds': None
         }
+        
+        # 窗口几何与进程存活状态缓存，TTL内的查询直接返回缓存结果
+        self.cache_ttl = self.config.get('game.window_cache_ttl', 1.0)
+        self._process_alive = False
+        self._process_checked_at = 0.0
+        self._geometry_checked_at = 0.0
+        # 几何代数：窗口位置或大小每变化一次加一，以几何为键的缓存据此失效
+        self.geometry_generation = 0
+        self.cache_stats = {
+            'hits': 0,
+            'probes': 0,
+            'full_discoveries': 0
+        }
+        
+        # 游戏进程跟踪器：解析一次PID，之后廉价检查存活并推送退出/重启事件
+        self.process_tracker = ProcessTracker(
+            self.config.get('game.process_name', 'Mini Motorways'),
+            backend=create_process_backend(self.config.get('game.process_backend', 'auto')),
+            poll_interval=self.config.get('game.process_poll_interval', 0.5)
+        )
+        self.process_tracker.subscribe(self._on_process_event)
     
-    def _get_mini_motorways_window_info(self) -> Optional[dict]:
+    def _check_game_running(self) -> bool:
         """
-        使用AppleScript获取Mini Motorways窗口的准确信息
+        完整检查游戏进程是否运行，并重新解析其PID
         
         Returns:
-            窗口信息字典或None
+            游戏是否运行
         """
-        try:
-            # 首先尝试激活应用，确保窗口可见
-            activate_script = '''
-            tell application "Mini Motorways"
-                try
-                    activate
-                    delay 0.5
-                on error
-                    -- 应用可能没有运行或无法激活
-                end try
-            end tell
-            '''
-            
-            subprocess.run(['osascript', '-e', activate_script], 
-                          capture_output=True, text=True, timeout=5)
-            
-            # 使用更健壮的AppleScript获取Mini Motorways窗口信息
-            script = '''
-            tell application "System Events"
-                try
-                    -- 方法1: 直接查找Mini Motorways进程
-                    set miniMotorwaysProcess to first process whose name is "Mini Motorways"
-                    
-                    -- 检查是否有窗口
-                    if (count of windows of miniMotorwaysProcess) > 0 then
-                        set miniMotorwaysWindow to first window of miniMotorwaysProcess
-                        
-                        set windowPosition to position of miniMotorwaysWindow
-                        set windowSize to size of miniMotorwaysWindow
-                        set windowTitle to title of miniMotorwaysWindow
-                        
-                        set windowX to item 1 of windowPosition
-                        set windowY to item 2 of windowPosition
-                        set windowWidth to item 1 of windowSize
-                        set windowHeight to item 2 of windowSize
-                        
-                        return "{" & quote & "found" & quote & ":true," & quote & "title" & quote & ":" & quote & windowTitle & quote & "," & quote & "x" & quote & ":" & windowX & "," & quote & "y" & quote & ":" & windowY & "," & quote & "width" & quote & ":" & windowWidth & "," & quote & "height" & quote & ":" & windowHeight & "}"
-                    else
-                        return "{" & quote & "found" & quote & ":false," & quote & "error" & quote & ":" & quote & "Mini Motorways process has no windows" & quote & "}"
-                    end if
-                    
-                on error errMsg
-                    -- 方法2: 尝试查找包含"Mini Motorways"的窗口
-                    try
-                        repeat with proc in (every process whose background only is false)
-                            repeat with win in (every window of proc)
-                                set winTitle to title of win
-                                if winTitle contains "Mini Motorways" or name of proc contains "Mini Motorways" then
-                                    set windowPosition to position of win
-                                    set windowSize to size of win
-                                    
-                                    set windowX to item 1 of windowPosition
-                                    set windowY to item 2 of windowPosition
-                                    set windowWidth to item 1 of windowSize
-                                    set windowHeight to item 2 of windowSize
-                                    
-                                    return "{" & quote & "found" & quote & ":true," & quote & "title" & quote & ":" & quote & winTitle & quote & "," & quote & "x" & quote & ":" & windowX & "," & quote & "y" & quote & ":" & windowY & "," & quote & "width" & quote & ":" & windowWidth & "," & quote & "height" & quote & ":" & windowHeight & "}"
-                                end if
-                            end repeat
-                        end repeat
-                        
-                        return "{" & quote & "found" & quote & ":false," & quote & "error" & quote & ":" & quote & "No Mini Motorways window found in any process" & quote & "}"
-                        
-                    on error errMsg2
-                        return "{" & quote & "found" & quote & ":false," & quote & "error" & quote & ":" & quote & errMsg2 & quote & "}"
-                    end try
-                end try
-            end tell
-            '''
-            
-            result = subprocess.run(['osascript', '-e', script], 
-                                  capture_output=True, text=True, timeout=15)
-            
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                self.logger.add_info(f"AppleScript输出: {output}")
-                
-                try:
-                    # 解析JSON格式的输出
-                    window_data = json.loads(output)
-                    return window_data
-                except json.JSONDecodeError:
-                    self.logger.add_warning(f"无法解析窗口信息: {output}")
-                    return None
-            else:
-                self.logger.add_warning(f"获取窗口信息失败: {result.stderr}")
-                return None
-                
-        except Exception as e:
-            self.logger.add_error(f"获取窗口信息异常: {str(e)}")
-            return None
+        self._process_checked_at = time.monotonic()
+        self._process_alive = self.process_tracker.resolve() is not None
+        
+        if self._process_alive:
+            self.logger.add_success(f"检测到Mini Motorways进程正在运行 (PID {self.game_pid})")
+        else:
+            self.logger.add_warning("未检测到Mini Motorways进程")
+        return self._process_alive
     
-    def _check_game_running_macos(self) -> bool:
+    def _is_game_running(self) -> bool:
         """
-        检查游戏是否在macOS上运行
+        带缓存的游戏进程检查
+        
+        TTL内直接返回上次结果；过期后由进程跟踪器廉价地检查已知PID，
+        检查失败才回退到完整的进程查找
         
         Returns:
             游戏是否运行
         """
-        try:
-            # 检查Mini Motorways进程是否存在
-            result = subprocess.run(['pgrep', '-f', 'Mini Motorways'], 
-                                  capture_output=True, text=True)
+        now = time.monotonic()
+        if now - self._process_checked_at < self.cache_ttl:
+            self.cache_stats['hits'] += 1
+            return self._process_alive
+        
+        self.cache_stats['probes'] += 1
+        if self.process_tracker.is_alive():
+            self._process_alive = True
+            self._process_checked_at = now
+            return True
+        
+        self.cache_stats['full_discoveries'] += 1
+        return self._check_game_running()
+    
+    def _on_process_event(self, event: dict):
+        """
+        进程跟踪器事件回调（在跟踪线程中执行）
+        
+        Args:
+            event: 进程事件字典
+        """
+        if event['type'] == 'exited':
+            # 立即把缓存标记为进程已退出，主循环下一次查询即可感知
+            self._process_alive = False
+            self._process_checked_at = event['time']
+            self.logger.add_warning(f"Mini Motorways进程已退出 (PID {event['old_pid']})")
+        elif event['type'] == 'restarted':
+            # 新进程的窗口需要重新查询
+            self._process_alive = True
+            self._process_checked_at = event['time']
+            self._geometry_checked_at = 0.0
+            self.logger.add_info(f"Mini Motorways进程已重启 (PID {event['old_pid']} -> {event['pid']})")
+    
+    @property
+    def game_pid(self) -> Optional[int]:
+        """当前跟踪的游戏进程PID"""
+        return self.process_tracker.pid
+    
+    def _update_window_bounds(self, window_data: dict) -> bool:
+        """
+        根据窗口查询结果更新缓存的窗口几何信息
+        
+        Args:
+            window_data: 后端返回的窗口信息字典
             
-            if result.returncode == 0:
-                self.logger.add_success("检测到Mini Motorways进程正在运行")
-                return True
-            else:
-                # 尝试另一种检查方式
-                result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-                if 'Mini Motorways' in result.stdout:
-                    self.logger.add_success("通过ps命令检测到Mini Motorways")
-                    return True
-                else:
-                    self.logger.add_warning("未检测到Mini Motorways进程")
-                    return False
-                    
-        except Exception as e:
-            self.logger.add_error(f"检查游戏进程失败: {str(e)}")
-            return False
+        Returns:
+            窗口几何是否发生变化（变化时几何代数加一）
+        """
+        bounds = {
+            'left': window_data['x'],
+            'top': window_data['y'],
+            'width': window_data['width'],
+            'height': window_data['height']
+        }
+        changed = not self.window_info['found'] or self.window_info['window_bounds'] != bounds
+        self.window_info = {
+            'found': True,
+            'app_name': 'Mini Motorways',
+            'window_bounds': bounds
+        }
+        self._geometry_checked_at = time.monotonic()
+        if changed:
+            self.geometry_generation += 1
+        return changed
+    
+    def apply_window_geometry(self, window_data: dict) -> bool:
+        """
+        应用外部（如窗口监视线程）获得的窗口几何信息
+        
+        Args:
+            window_data: 后端返回的窗口信息字典
+            
+        Returns:
+            窗口几何是否发生变化
+        """
+        return self._update_window_bounds(window_data)
+    
+    def invalidate_cache(self):
+        """使窗口几何和进程状态缓存失效，下一次查询会重新验证"""
+        self._process_checked_at = 0.0
+        self._geometry_checked_at = 0.0
+    
+    def close(self):
+        """停止进程监视线程并释放平台后端资源"""
+        self.process_tracker.stop()
+        self.backend.close()
     
     def find_game_window(self, max_attempts: int = 10, wait_interval: float = 1.0) -> bool:
         """
@@ -175,8 +183,10 @@ class WindowManager:
         self.logger.add_section("窗口查找")
         self.logger.add_info(f"开始查找游戏窗口: {self.window_title}")
         
+        self.cache_stats['full_discoveries'] += 1
+        
         # 首先检查游戏是否在运行
-        if not self._check_game_running_macos():
+        if not self._check_game_running():
             self.logger.add_error("Mini Motorways游戏未运行，请先启动游戏")
             return False
         
@@ -184,20 +194,12 @@ class WindowManager:
         for attempt in range(max_attempts):
             self.logger.add_info(f"第 {attempt + 1} 次尝试获取窗口信息...")
             
-            window_data = self._get_mini_motorways_window_info()
+            # 只在第一次尝试时激活应用，避免每次都等待激活延迟
+            window_data = self.backend.get_window_info(activate=(attempt == 0))
             
             if window_data and window_data.get('found', False):
                 # 成功获取到窗口信息
-                self.window_info = {
-                    'found': True,
-                    'app_name': 'Mini Motorways',
-                    'window_bounds': {
-                        'left': window_data['x'],
-                        'top': window_data['y'],
-                        'width': window_data['width'],
-                        'height': window_data['height']
-                    }
-                }
+                self._update_window_bounds(window_data)
                 
                 self.logger.add_success("成功获取游戏窗口信息")
                 self.logger.add_info(f"窗口标题: {window_data.get('title', 'Unknown')}")
@@ -207,6 +209,9 @@ class WindowManager:
                 # 验证窗口大小
                 self._validate_window_size()
                 
+                # 后台监视游戏进程，退出或重启时立即通知
+                self.process_tracker.start()
+                
                 return True
             else:
                 self.logger.add_warning(f"第 {attempt + 1} 次尝试失败")
@@ -215,18 +220,19 @@ class WindowManager:
         
         # 如果所有尝试都失败，回退到全屏模式
         self.logger.add_warning("无法获取准确窗口信息，使用全屏模式作为备选")
-        screen_width, screen_height = pyautogui.size()
+        try:
+            screen_width, screen_height = self.backend.screen_size()
+        except Exception as e:
+            # 没有可用的显示连接（如未设置DISPLAY）时按预期分辨率处理
+            screen_width, screen_height = self.expected_resolution
+            self.logger.add_error(f"获取屏幕分辨率失败，使用预期分辨率: {str(e)}")
         
-        self.window_info = {
-            'found': True,
-            'app_name': 'Mini Motorways',
-            'window_bounds': {
-                'left': 0,
-                'top': 0,
-                'width': screen_width,
-                'height': screen_height
-            }
-        }
+        self._update_window_bounds({
+            'x': 0,
+            'y': 0,
+            'width': screen_width,
+            'height': screen_height
+        })
         
         self.logger.add_warning("使用全屏区域作为窗口边界")
         self.logger.add_info(f"屏幕分辨率: {screen_width}x{screen_height}")
@@ -252,23 +258,18 @@ class WindowManager:
     
     def restore_window(self) -> bool:
         """
-        恢复窗口（在macOS上尝试激活应用）
+        恢复窗口（通过平台后端激活应用）
         
         Returns:
             是否成功恢复
         """
         try:
-            # 使用osascript激活Mini Motorways应用
-            script = 'tell application "Mini Motorways" to activate'
-            result = subprocess.run(['osascript', '-e', script], 
-                                  capture_output=True, text=True, timeout=5)
-            
-            if result.returncode == 0:
+            if self.backend.activate():
                 self.logger.add_success("游戏应用已激活")
                 time.sleep(1)  # 等待应用激活
                 return True
             else:
-                self.logger.add_warning(f"激活应用失败: {result.stderr}")
+                self.logger.add_warning("激活应用失败")
                 return False
                 
         except Exception as e:
@@ -282,7 +283,7 @@ class WindowManager:
         Returns:
             是否成功激活
         """
-        return self.restore_window()  # 在macOS上两者相同
+        return self.restore_window()  # 两者在各平台后端上相同
     
     def get_window_region(self) -> Optional[Tuple[int, int, int, int]]:
         """
@@ -321,17 +322,20 @@ class WindowManager:
     
     def is_window_valid(self) -> bool:
         """
-        检查窗口是否仍然有效
+        检查窗口是否仍然有效（进程状态在TTL内使用缓存）
         
         Returns:
             窗口是否有效
         """
-        return self.window_info['found'] and self._check_game_running_macos()
+        return self.window_info['found'] and self._is_game_running()
     
     def refresh_window_info(self) -> bool:
         """
         刷新窗口信息
         
+        缓存未过期时直接返回；过期后不激活应用，只查询一次窗口几何，
+        查询失败才回退到完整的窗口查找
+        
         Returns:
             是否成功刷新
         """
@@ -339,7 +343,18 @@ class WindowManager:
             self.logger.add_warning("当前窗口无效，重新查找")
             return self.find_game_window()
         
-        return True
+        if time.monotonic() - self._geometry_checked_at < self.cache_ttl:
+            self.cache_stats['hits'] += 1
+            return True
+        
+        self.cache_stats['probes'] += 1
+        window_data = self.backend.get_window_geometry()
+        if window_data and window_data.get('found', False):
+            self._update_window_bounds(window_data)
+            return True
+        
+        self.logger.add_warning("窗口几何探测失败，重新查找")
+        return self.find_game_window()
     
     def get_window_screenshot_region(self) -> Optional[Tuple[int, int, int, int]]:
         """
@@ -366,41 +381,10 @@ class WindowManager:
         Returns:
             所有窗口标题列表
         """
-        try:
-            # 使用AppleScript获取所有窗口信息
-            script = '''
-            tell application "System Events"
-                set windowList to {}
-                repeat with proc in (every process whose background only is false)
-                    try
-                        repeat with win in (every window of proc)
-                            set windowList to windowList & {name of proc as string & " - " & name of win as string}
-                        end repeat
-                    end try
-                end repeat
-                return windowList
-            end tell
-            '''
-            
-            result = subprocess.run(['osascript', '-e', script], 
-                                  capture_output=True, text=True, timeout=10)
-            
-            if result.returncode == 0:
-                output = result.stdout.strip()
-                if output:
-                    # 解析窗口列表
-                    windows = output.split(', ')
-                    self.logger.add_info(f"检测到 {len(windows)} 个窗口")
-                    return windows
-                else:
-                    return []
-            else:
-                self.logger.add_warning(f"获取窗口列表失败: {result.stderr}")
-                return []
-                
-        except Exception as e:
-            self.logger.add_error(f"获取窗口列表失败: {str(e)}")
-            return []
+        windows = self.backend.list_windows()
+        if windows:
+            self.logger.add_info(f"检测到 {len(windows)} 个窗口")
+        return windows
     
     def debug_window_info(self):
         """调试：显示当前窗口信息"""
@@ -0,0 +1,186 @@
+"""
+窗口变化监视器
+在后台线程中跟踪游戏窗口的移动和缩放，把最新的截图区域推送给订阅者
+（截图管理器、坐标映射器等），并维护几何代数使依赖窗口几何的缓存自动失效
+"""
+
+import threading
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, Optional, Tuple, List
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+
+
+Region = Tuple[int, int, int, int]
+
+
+class GenerationCache(MutableMapping):
+    """以窗口几何为键的缓存：几何代数变化时自动清空
+    
+    所有读写和遍历操作（包括 len、items、pop、setdefault）都先检查几何代数，不会返回旧几何下的条目
+    """
+    
+    def __init__(self, generation_source: Callable[[], int]):
+        """
+        初始化缓存
+        
+        Args:
+            generation_source: 返回当前几何代数的函数，如 lambda: window_manager.geometry_generation
+        """
+        self._generation_source = generation_source
+        self._generation = generation_source()
+        self._data: Dict = {}
+        self.invalidations = 0
+    
+    def _entries(self) -> Dict:
+        """几何代数变化时清空缓存，返回当前有效的条目"""
+        generation = self._generation_source()
+        if generation != self._generation:
+            self._generation = generation
+            if self._data:
+                self._data.clear()
+                self.invalidations += 1
+        return self._data
+    
+    def __getitem__(self, key):
+        return self._entries()[key]
+    
+    def __setitem__(self, key, value):
+        self._entries()[key] = value
+    
+    def __delitem__(self, key):
+        del self._entries()[key]
+    
+    def __contains__(self, key) -> bool:
+        return key in self._entries()
+    
+    def __iter__(self) -> Iterator:
+        return iter(list(self._entries()))
+    
+    def __len__(self) -> int:
+        return len(self._entries())
+    
+    def clear(self):
+        self._entries().clear()
+    
+    def __repr__(self) -> str:
+        return f"GenerationCache({self._entries()!r})"
+
+
+class WindowWatcher:
+    """窗口变化监视器
+    
+    后端支持窗口系统事件时（如X11的ConfigureNotify）等待事件，否则按间隔廉价轮询。
+    订阅者回调参数为 (region, generation)，region 为 (left, top, width, height)
+    """
+    
+    def __init__(self, window_manager, poll_interval: Optional[float] = None):
+        """
+        初始化窗口监视器
+        
+        Args:
+            window_manager: 已找到游戏窗口的WindowManager
+            poll_interval: 轮询间隔（秒），None则使用配置文件设置
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.window_manager = window_manager
+        self.backend = window_manager.backend
+        if poll_interval is None:
+            poll_interval = self.config.get('game.window_watch_interval', 0.5)
+        self.poll_interval = poll_interval
+        
+        self._subscribers: List[Callable[[Region, int], None]] = []
+        self._thread = None
+        self._stop_event = threading.Event()
+        self.change_count = 0
+    
+    @property
+    def generation(self) -> int:
+        """当前几何代数"""
+        return self.window_manager.geometry_generation
+    
+    def subscribe(self, callback: Callable[[Region, int], None], notify_current: bool = True):
+        """
+        订阅窗口区域变化
+        
+        Args:
+            callback: 回调函数，参数为 (region, generation)
+            notify_current: 是否立即推送一次当前区域
+        """
+        self._subscribers.append(callback)
+        if notify_current:
+            region = self.window_manager.get_window_screenshot_region()
+            if region:
+                callback(region, self.generation)
+    
+    def unsubscribe(self, callback: Callable[[Region, int], None]):
+        """取消订阅"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _publish(self):
+        """把当前截图区域推送给所有订阅者"""
+        region = self.window_manager.get_window_screenshot_region()
+        if not region:
+            return
+        generation = self.generation
+        for callback in list(self._subscribers):
+            try:
+                callback(region, generation)
+            except Exception as e:
+                self.logger.add_error(f"窗口区域订阅回调失败: {str(e)}")
+    
+    def apply(self, window_data: Optional[dict]) -> bool:
+        """
+        应用一次几何查询结果，几何变化时通知订阅者
+        
+        Args:
+            window_data: 后端返回的窗口信息字典
+        
+        Returns:
+            窗口几何是否变化
+        """
+        if not window_data or not window_data.get('found', False):
+            return False
+        if not self.window_manager.apply_window_geometry(window_data):
+            return False
+        
+        self.change_count += 1
+        self.logger.add_info(
+            f"窗口几何变化: ({window_data['x']}, {window_data['y']}) "
+            f"{window_data['width']}x{window_data['height']}，几何代数 {self.generation}"
+        )
+        self._publish()
+        return True
+    
+    def start(self):
+        """启动后台监视线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="WindowWatcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """停止后台监视线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+    
+    def _watch_loop(self):
+        """后台线程：等待窗口事件或定期探测窗口几何"""
+        while not self._stop_event.is_set():
+            try:
+                if self.backend.supports_events:
+                    window_data = self.backend.wait_for_geometry_change(self.poll_interval)
+                else:
+                    if self._stop_event.wait(self.poll_interval):
+                        break
+                    window_data = self.backend.get_window_geometry()
+                self.apply(window_data)
+            except Exception as e:
+                self.logger.add_error(f"窗口监视异常: {str(e)}")
+                self._stop_event.wait(self.poll_interval)
@@ -0,0 +1,258 @@
+"""
+Linux X11窗口后端
+通过python-xlib在进程内直接与X服务器通信，按EWMH规范查找、查询、激活和移动窗口，
+不需要为每次查询启动子进程；可在Xvfb下运行测试
+"""
+
+import select
+import time
+from typing import Optional, Tuple, List
+
+from .window_backend import WindowBackend
+from ..utils.lazy_import import lazy_import
+
+X = lazy_import('Xlib.X')
+Xatom = lazy_import('Xlib.Xatom')
+xdisplay = lazy_import('Xlib.display')
+xevent = lazy_import('Xlib.protocol.event')
+
+
+class X11WindowBackend(WindowBackend):
+    """基于python-xlib的X11窗口后端"""
+    
+    name = 'x11'
+    supports_events = True
+    
+    def __init__(self, window_title: str = 'Mini Motorways', display_name: Optional[str] = None):
+        """
+        初始化X11后端（X连接在首次使用时建立）
+        
+        Args:
+            window_title: 要查找的窗口标题（子串匹配）
+            display_name: X显示名称，None表示使用DISPLAY环境变量
+        """
+        super().__init__(window_title)
+        self.display_name = display_name
+        self._display = None
+        self._window = None
+        self._atoms = {}
+    
+    @property
+    def display(self):
+        """X服务器连接，首次访问时建立"""
+        if self._display is None:
+            self._display = xdisplay.Display(self.display_name)
+        return self._display
+    
+    @property
+    def root(self):
+        """根窗口"""
+        return self.display.screen().root
+    
+    def _atom(self, name: str) -> int:
+        """获取并缓存X原子"""
+        atom = self._atoms.get(name)
+        if atom is None:
+            atom = self.display.intern_atom(name)
+            self._atoms[name] = atom
+        return atom
+    
+    def _get_window_title(self, window) -> str:
+        """读取窗口标题，优先使用EWMH的_NET_WM_NAME（UTF-8）"""
+        try:
+            prop = window.get_full_property(self._atom('_NET_WM_NAME'), self._atom('UTF8_STRING'))
+            if prop is not None and prop.value:
+                value = prop.value
+                return value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value)
+            name = window.get_wm_name()
+            if isinstance(name, bytes):
+                return name.decode('latin-1')
+            return name or ''
+        except Exception:
+            # 窗口可能在查询过程中被销毁
+            return ''
+    
+    def _client_windows(self) -> list:
+        """
+        列出顶层客户端窗口
+        
+        有EWMH窗口管理器时读取_NET_CLIENT_LIST，否则（如裸Xvfb）遍历根窗口的子窗口
+        """
+        prop = self.root.get_full_property(self._atom('_NET_CLIENT_LIST'), Xatom.WINDOW)
+        if prop is not None and len(prop.value) > 0:
+            return [self.display.create_resource_object('window', wid) for wid in prop.value]
+        return list(self.root.query_tree().children)
+    
+    def _find_window(self):
+        """按标题子串查找游戏窗口"""
+        for window in self._client_windows():
+            if self.window_title in self._get_window_title(window):
+                return window
+        return None
+    
+    def _read_geometry(self, window) -> Optional[dict]:
+        """读取窗口相对根窗口的绝对位置和大小"""
+        try:
+            geometry = window.get_geometry()
+            origin = window.translate_coords(self.root, 0, 0)
+            return {
+                'found': True,
+                'title': self._get_window_title(window),
+                # translate_coords返回根窗口原点在该窗口坐标系中的位置，取反即窗口的绝对位置
+                'x': -origin.x,
+                'y': -origin.y,
+                'width': geometry.width,
+                'height': geometry.height
+            }
+        except Exception:
+            return None
+    
+    def _send_client_message(self, window, message_type: str, data: list):
+        """按EWMH规范向根窗口发送客户端消息"""
+        event = xevent.ClientMessage(
+            window=window,
+            client_type=self._atom(message_type),
+            data=(32, (data + [0] * 5)[:5])
+        )
+        mask = X.SubstructureRedirectMask | X.SubstructureNotifyMask
+        self.root.send_event(event, event_mask=mask)
+        self.display.flush()
+    
+    def get_window_info(self, activate: bool = True) -> Optional[dict]:
+        """
+        通过EWMH客户端列表按标题查找窗口
+        
+        Args:
+            activate: 找到后是否激活窗口
+        
+        Returns:
+            窗口信息字典或None
+        """
+        try:
+            window = self._find_window()
+            if window is None:
+                self._window = None
+                return {'found': False, 'error': f"No window titled '{self.window_title}'"}
+            
+            if window != self._window:
+                # 订阅结构变化事件，用于感知窗口移动和缩放
+                window.change_attributes(event_mask=X.StructureNotifyMask)
+                self.display.flush()
+            self._window = window
+            
+            if activate:
+                self.activate()
+            
+            return self._read_geometry(window)
+        
+        except Exception as e:
+            self.logger.add_error(f"获取X11窗口信息异常: {str(e)}")
+            return None
+    
+    def get_window_geometry(self) -> Optional[dict]:
+        """直接查询已缓存窗口句柄的几何信息，窗口失效时回退到重新查找"""
+        if self._window is not None:
+            geometry = self._read_geometry(self._window)
+            if geometry is not None:
+                return geometry
+            self._window = None
+        return self.get_window_info(activate=False)
+    
+    def activate(self) -> bool:
+        """通过_NET_ACTIVE_WINDOW激活窗口，窗口管理器不支持时直接设置输入焦点"""
+        try:
+            window = self._window or self._find_window()
+            if window is None:
+                return False
+            
+            supported = self.root.get_full_property(self._atom('_NET_SUPPORTED'), Xatom.ATOM)
+            if supported is not None and self._atom('_NET_ACTIVE_WINDOW') in supported.value:
+                # 数据: 来源指示(2=分页器/工具)、时间戳、当前活动窗口
+                self._send_client_message(window, '_NET_ACTIVE_WINDOW', [2, X.CurrentTime, 0])
+            else:
+                window.map()
+                window.configure(stack_mode=X.Above)
+                window.set_input_focus(X.RevertToParent, X.CurrentTime)
+                self.display.flush()
+            return True
+        
+        except Exception as e:
+            self.logger.add_error(f"激活X11窗口失败: {str(e)}")
+            return False
+    
+    def move_resize(self, x: int, y: int, width: int, height: int) -> bool:
+        """通过_NET_MOVERESIZE_WINDOW移动并缩放窗口，窗口管理器不支持时直接配置窗口"""
+        try:
+            window = self._window or self._find_window()
+            if window is None:
+                return False
+            
+            supported = self.root.get_full_property(self._atom('_NET_SUPPORTED'), Xatom.ATOM)
+            if supported is not None and self._atom('_NET_MOVERESIZE_WINDOW') in supported.value:
+                # 标志位: bit 0-7为重力，bit 8-11表示x/y/width/height均有效，bit 12-15为来源指示(2=工具)
+                flags = X.NorthWestGravity | (0xF << 8) | (2 << 12)
+                self._send_client_message(window, '_NET_MOVERESIZE_WINDOW', [flags, x, y, width, height])
+            else:
+                window.configure(x=x, y=y, width=width, height=height)
+                self.display.flush()
+            return True
+        
+        except Exception as e:
+            self.logger.add_error(f"调整X11窗口失败: {str(e)}")
+            return False
+    
+    def list_windows(self) -> List[str]:
+        """列出所有顶层窗口标题"""
+        try:
+            titles = [self._get_window_title(window) for window in self._client_windows()]
+            return [title for title in titles if title]
+        except Exception as e:
+            self.logger.add_error(f"获取X11窗口列表失败: {str(e)}")
+            return []
+    
+    def screen_size(self) -> Tuple[int, int]:
+        """读取默认屏幕的分辨率"""
+        screen = self.display.screen()
+        return (screen.width_in_pixels, screen.height_in_pixels)
+    
+    def wait_for_geometry_change(self, timeout: float) -> Optional[dict]:
+        """
+        等待ConfigureNotify事件
+        
+        Args:
+            timeout: 最长等待时间（秒）
+        
+        Returns:
+            变化后的窗口信息，超时返回None
+        """
+        if self._window is None:
+            # 尚未找到窗口，没有可等待的事件
+            time.sleep(timeout)
+            return None
+        
+        deadline = time.monotonic() + timeout
+        changed = False
+        while True:
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if event.type == X.ConfigureNotify and event.window == self._window:
+                    changed = True
+                elif event.type == X.DestroyNotify and event.window == self._window:
+                    self._window = None
+                    return {'found': False, 'error': 'window destroyed'}
+            if changed:
+                # 读取最终几何信息，合并连续的多次配置事件
+                return self._read_geometry(self._window)
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            select.select([self.display.fileno()], [], [], remaining)
+    
+    def close(self):
+        """关闭X服务器连接"""
+        if self._display is not None:
+            self._display.close()
+            self._display = None
+            self._window = None
+            self._atoms = {}
@@ -0,0 +1,49 @@
+"""
+识别模块
+包含模板匹配、界面分类、OCR、网格地图提取等基于截图的游戏界面识别功能
+
+子模块在首次访问时才导入，避免只需读取日志或统计的工具也要加载cv2、numpy等依赖
+"""
+
+import importlib
+
+_LAZY_EXPORTS = {
+    'TemplateMatcher': '.template_matcher',
+    'ScreenClassifier': '.screen_classifier',
+    'UILayout': '.ui_layout',
+    'OCRService': '.ocr_service',
+    'PaletteProfile': '.palette',
+    'PaletteLibrary': '.palette',
+    'GridExtractor': '.grid_extractor',
+    'MapState': '.map_state',
+    'RoadNetwork': '.road_network',
+    'RecognitionPipeline': '.pipeline',
+    'Stage': '.pipeline',
+}
+
+__all__ = [
+    'TemplateMatcher',
+    'ScreenClassifier',
+    'UILayout',
+    'OCRService',
+    'PaletteProfile',
+    'PaletteLibrary',
+    'GridExtractor',
+    'MapState',
+    'RoadNetwork',
+    'RecognitionPipeline',
+    'Stage'
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
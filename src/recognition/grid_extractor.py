@@ -0,0 +1,251 @@
+"""
+网格地图提取器
+把地图视口转换为紧凑的格子类别数组（每格一个uint8），决策代码只需处理约40x25的数组
+而不是两百万像素的截图。网格校准（原点、格距、缩放）按窗口几何和缩放级别缓存，
+提取时只在每格内采样少量像素，经调色板查找表分类后做一次向量化的分块归约
+"""
+
+from typing import Callable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.config import get_config
+from ..core.frame import Frame, as_bgr
+from .palette import (PaletteProfile, PaletteLibrary, TERRAIN, ROAD, WATER, OBSTACLE,
+                      BRIDGE, TUNNEL, CAR, UNKNOWN, is_house)
+
+
+class GridCalibration:
+    """网格几何：截图像素坐标下的原点、格距和格子数，以及预先计算好的采样坐标"""
+    
+    __slots__ = ('origin', 'pitch', 'cols', 'rows', 'zoom', 'sample_ys', 'sample_xs', 'samples_per_tile')
+    
+    def __init__(self, origin: Tuple[float, float], pitch: float, cols: int, rows: int,
+                 zoom: float, samples_per_tile: int):
+        """
+        Args:
+            origin: 格子(0, 0)左上角的截图坐标
+            pitch: 格距（截图像素）
+            cols: 列数
+            rows: 行数
+            zoom: 相对参考格距的缩放
+            samples_per_tile: 每格每个方向的采样点数
+        """
+        self.origin = origin
+        self.pitch = pitch
+        self.cols = cols
+        self.rows = rows
+        self.zoom = zoom
+        self.samples_per_tile = samples_per_tile
+        # 采样点集中在格子中部，避开相邻格子的边缘和道路的抗锯齿
+        k = samples_per_tile
+        offsets = (np.arange(k) + 0.5) / k * 0.6 + 0.2
+        self.sample_xs = np.rint(origin[0] + (np.arange(cols)[:, None] + offsets) * pitch).astype(np.intp).ravel()
+        self.sample_ys = np.rint(origin[1] + (np.arange(rows)[:, None] + offsets) * pitch).astype(np.intp).ravel()
+    
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """网格形状 (rows, cols)"""
+        return (self.rows, self.cols)
+    
+    def tile_center(self, col: int, row: int) -> Tuple[float, float]:
+        """格子中心的截图坐标"""
+        return (self.origin[0] + (col + 0.5) * self.pitch, self.origin[1] + (row + 0.5) * self.pitch)
+    
+    def tile_at(self, x: float, y: float) -> Optional[Tuple[int, int]]:
+        """截图坐标所在的格子 (col, row)，在网格外返回None"""
+        col = int((x - self.origin[0]) // self.pitch)
+        row = int((y - self.origin[1]) // self.pitch)
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return (col, row)
+        return None
+    
+    def tiles_in_rect(self, rect: Sequence[int]) -> Tuple[slice, slice]:
+        """
+        与截图矩形 (x, y, w, h) 相交的格子范围
+        
+        Returns:
+            (行切片, 列切片)
+        """
+        x, y, w, h = rect
+        c0 = max(0, int((x - self.origin[0]) // self.pitch))
+        r0 = max(0, int((y - self.origin[1]) // self.pitch))
+        c1 = min(self.cols, int(np.ceil((x + w - self.origin[0]) / self.pitch)))
+        r1 = min(self.rows, int(np.ceil((y + h - self.origin[1]) / self.pitch)))
+        return slice(r0, max(r0, r1)), slice(c0, max(c0, c1))
+
+
+def estimate_pitch(classes: np.ndarray, min_area: int = 16) -> Optional[float]:
+    """
+    用房屋估计格距：每座房屋占一格，连通域尺寸的中位数即格距
+    
+    Args:
+        classes: 调色板分类后的类别图
+        min_area: 忽略面积小于该值的连通域（像素）
+    
+    Returns:
+        格距（像素），没有房屋时返回None
+    """
+    mask = is_house(classes).astype(np.uint8)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+    sizes = [max(stats[i, cv2.CC_STAT_WIDTH], stats[i, cv2.CC_STAT_HEIGHT])
+             for i in range(1, count) if stats[i, cv2.CC_STAT_AREA] >= min_area]
+    return float(np.median(sizes)) if sizes else None
+
+
+class GridExtractor:
+    """网格地图提取器"""
+    
+    def __init__(self, palette: Optional[PaletteProfile] = None,
+                 generation_source: Optional[Callable[[], int]] = None,
+                 reference_size: Optional[Sequence[int]] = None):
+        """
+        初始化提取器
+        
+        Args:
+            palette: 调色板，None则按 recognition.palette_map 加载
+            generation_source: 返回窗口几何代数的函数（如 lambda: window_manager.geometry_generation），
+                               几何变化时校准缓存自动失效；None表示只按截图尺寸缓存
+            reference_size: 参考布局分辨率，None则使用 game.expected_resolution
+        """
+        self.config = get_config()
+        self.palette = palette or PaletteLibrary().get()
+        self.reference_size = tuple(reference_size or self.config.get('game.expected_resolution', [1920, 1080]))
+        self.viewport = tuple(self.config.get('recognition.grid_viewport', [0, 0, 1920, 1080]))
+        self.reference_pitch = float(self.config.get('recognition.grid_tile_pitch', 48))
+        self.samples_per_tile = int(self.config.get('recognition.grid_samples_per_tile', 4))
+        self.min_fraction = float(self.config.get('recognition.grid_min_fraction', 0.25))
+        self.zoom = 1.0
+        
+        if generation_source is not None:
+            from ..core.window_watcher import GenerationCache
+            self._calibrations = GenerationCache(generation_source)
+        else:
+            self._calibrations = {}
+        self.stats = {
+            'calibrations': 0,
+            'extractions': 0
+        }
+    
+    def set_zoom(self, zoom: float):
+        """设置地图缩放（游戏随地图扩大逐渐缩小视野）"""
+        self.zoom = float(zoom)
+    
+    def calibration(self, frame_shape: Sequence[int]) -> GridCalibration:
+        """
+        获取截图尺寸和当前缩放下的网格校准（带缓存）
+        
+        Args:
+            frame_shape: 截图数组的shape
+        """
+        key = (int(frame_shape[0]), int(frame_shape[1]), round(self.zoom, 4))
+        calibration = self._calibrations.get(key)
+        if calibration is None:
+            calibration = self._calibrate(key[0], key[1])
+            self._calibrations[key] = calibration
+            self.stats['calibrations'] += 1
+        return calibration
+    
+    def _calibrate(self, height: int, width: int) -> GridCalibration:
+        """把参考布局下的视口和格距换算到截图像素，并让网格在视口内居中"""
+        scale_x = width / self.reference_size[0]
+        scale_y = height / self.reference_size[1]
+        vx, vy, vw, vh = self.viewport
+        vx, vw = vx * scale_x, vw * scale_x
+        vy, vh = vy * scale_y, vh * scale_y
+        pitch = self.reference_pitch * scale_x * self.zoom
+        cols = max(1, int(vw // pitch))
+        rows = max(1, int(vh // pitch))
+        origin = (vx + (vw - cols * pitch) / 2, vy + (vh - rows * pitch) / 2)
+        return GridCalibration(origin, pitch, cols, rows, self.zoom, self.samples_per_tile)
+    
+    def auto_zoom(self, frame: np.ndarray) -> Optional[float]:
+        """
+        根据房屋尺寸估计当前缩放并应用
+        
+        Returns:
+            估计的缩放，无法估计时返回None（保持原缩放）
+        """
+        frame = as_bgr(frame)
+        pitch = estimate_pitch(self.palette.classify(frame))
+        if pitch is None:
+            return None
+        scale_x = frame.shape[1] / self.reference_size[0]
+        zoom = round(pitch / (self.reference_pitch * scale_x), 2)
+        self.set_zoom(zoom)
+        return zoom
+    
+    def sample_classes(self, frame: np.ndarray, calibration: GridCalibration,
+                       rows: slice = slice(None), cols: slice = slice(None)) -> np.ndarray:
+        """
+        对指定格子范围内的采样点分类
+        
+        Returns:
+            (行数, 列数, k*k) 的类别数组
+        """
+        # 帧对象直接在原始缓冲区上采样（调色板分类会忽略alpha通道），不需要整幅BGR拷贝
+        if isinstance(frame, Frame):
+            frame = frame.image
+        k = calibration.samples_per_tile
+        ys = calibration.sample_ys.reshape(-1, k)[rows].ravel()
+        xs = calibration.sample_xs.reshape(-1, k)[cols].ravel()
+        ys = np.clip(ys, 0, frame.shape[0] - 1)
+        xs = np.clip(xs, 0, frame.shape[1] - 1)
+        pixels = frame[ys[:, None], xs[None, :]]
+        classes = self.palette.classify(pixels)
+        n_rows, n_cols = len(ys) // k, len(xs) // k
+        return classes.reshape(n_rows, k, n_cols, k).transpose(0, 2, 1, 3).reshape(n_rows, n_cols, k * k)
+    
+    def reduce(self, samples: np.ndarray) -> np.ndarray:
+        """
+        把每格的采样类别归约为一个格子类别
+        
+        - 车辆视为道路；地形和未知颜色视为背景
+        - 非背景类别中出现最多的一个，占比不低于 min_fraction 时作为格子类别，否则为地形
+        - 道路占比达到 min_fraction 且与水面同格为桥，与障碍（山体）同格为隧道
+        
+        Args:
+            samples: (rows, cols, n) 的采样类别
+        
+        Returns:
+            (rows, cols) 的uint8格子类别
+        """
+        samples = np.where(samples == CAR, ROAD, samples)
+        n = samples.shape[-1]
+        background = (samples == TERRAIN) | (samples == UNKNOWN)
+        # 两两比较得到每个采样值在本格内出现的次数（n很小，开销可以忽略）
+        counts = (samples[..., :, None] == samples[..., None, :]).sum(axis=-1)
+        counts[background] = 0
+        best = counts.argmax(axis=-1)
+        best_count = np.take_along_axis(counts, best[..., None], axis=-1)[..., 0]
+        grid = np.take_along_axis(samples, best[..., None], axis=-1)[..., 0].astype(np.uint8)
+        min_count = max(1, int(np.ceil(self.min_fraction * n)))
+        grid[best_count < min_count] = TERRAIN
+        
+        # 桥面/隧道口的道路通常窄于格子，按道路占比而不是多数类别判断
+        has_road = (samples == ROAD).sum(axis=-1) >= min_count
+        has_water = (samples == WATER).any(axis=-1)
+        has_obstacle = (samples == OBSTACLE).any(axis=-1)
+        grid[has_road & has_water & ((grid == ROAD) | (grid == WATER))] = BRIDGE
+        grid[has_road & has_obstacle & ((grid == ROAD) | (grid == OBSTACLE))] = TUNNEL
+        return grid
+    
+    def extract(self, frame: np.ndarray) -> np.ndarray:
+        """
+        提取整幅地图的格子类别
+        
+        Args:
+            frame: 窗口截图（BGR数组或帧对象）
+        
+        Returns:
+            (rows, cols) 的uint8数组
+        """
+        calibration = self.calibration(frame.shape)
+        self.stats['extractions'] += 1
+        return self.reduce(self.sample_classes(frame, calibration))
+    
+    def extract_region(self, frame: np.ndarray, rows: slice, cols: slice) -> np.ndarray:
+        """只提取指定格子范围（用于增量更新）"""
+        calibration = self.calibration(frame.shape)
+        return self.reduce(self.sample_classes(frame, calibration, rows, cols))
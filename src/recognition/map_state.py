@@ -0,0 +1,186 @@
+"""
+增量地图状态
+地图变化很慢（新出现一座房屋、多修一段道路），每帧只重新分类变化区域覆盖的格子，
+并维护带版本号和时间戳的实体出现/消失记录；订阅者按差异接收更新，
+每帧的识别开销与画面活动量成正比，而不是与地图大小成正比
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger
+from .grid_extractor import GridExtractor
+from .palette import TERRAIN, class_name
+
+# 实体事件类型
+APPEARED = 'appeared'
+DISAPPEARED = 'disappeared'
+
+
+class MapState:
+    """持久的地图状态
+    
+    每次更新产生一个差异 {'version', 'time', 'reset', 'changes'}，changes 中每个事件为
+    {'version', 'time', 'event': appeared/disappeared, 'tile': (col, row), 'class': 类别编号, 'name': 类别名称}。
+    一个格子从道路变为桥会依次产生道路的消失事件和桥的出现事件；地形不作为实体记录
+    """
+    
+    def __init__(self, extractor: Optional[GridExtractor] = None, history: int = 2000, register: bool = True):
+        """
+        初始化地图状态
+        
+        Args:
+            extractor: 网格提取器，None则按配置创建
+            history: 保留的事件条数
+            register: 是否把统计注册到日志系统的会话统计
+        """
+        self.logger = get_logger()
+        self.extractor = extractor or GridExtractor()
+        self.grid: Optional[np.ndarray] = None
+        self.calibration = None
+        self.version = 0
+        self.updated_at: Optional[float] = None
+        self._changes: deque = deque(maxlen=history)
+        self._subscribers: List[Callable[[dict], None]] = []
+        self._lock = threading.Lock()
+        self.stats = {
+            'frames': 0,
+            'full_extractions': 0,
+            'tiles_reclassified': 0,
+            'events': 0
+        }
+        if register:
+            self.logger.register_statistics("地图状态", self.statistics)
+    
+    def subscribe(self, callback: Callable[[dict], None]):
+        """订阅地图差异，回调参数为差异字典"""
+        self._subscribers.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[dict], None]):
+        """取消订阅"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def _publish(self, diff: dict):
+        """把差异推送给所有订阅者"""
+        for callback in list(self._subscribers):
+            try:
+                callback(diff)
+            except Exception as e:
+                self.logger.add_error(f"地图差异订阅回调失败: {str(e)}")
+    
+    def _events(self, before: np.ndarray, after: np.ndarray, rows: slice, cols: slice,
+                version: int, timestamp: float) -> List[dict]:
+        """对比一块格子的新旧类别，生成实体出现/消失事件"""
+        events = []
+        changed_rows, changed_cols = np.nonzero(before != after)
+        for r, c in zip(changed_rows.tolist(), changed_cols.tolist()):
+            tile = (c + (cols.start or 0), r + (rows.start or 0))
+            old, new = int(before[r, c]), int(after[r, c])
+            if old != TERRAIN:
+                events.append({'version': version, 'time': timestamp, 'event': DISAPPEARED,
+                               'tile': tile, 'class': old, 'name': class_name(old)})
+            if new != TERRAIN:
+                events.append({'version': version, 'time': timestamp, 'event': APPEARED,
+                               'tile': tile, 'class': new, 'name': class_name(new)})
+        return events
+    
+    def update(self, frame: np.ndarray, regions: Optional[Sequence[Sequence[int]]] = None,
+               timestamp: Optional[float] = None) -> dict:
+        """
+        用新的一帧更新地图状态
+        
+        Args:
+            frame: 窗口截图（BGR）
+            regions: 相对上一帧发生变化的截图矩形 (x, y, w, h) 列表；None表示未知，整幅重新提取
+            timestamp: 帧时间（time.monotonic），None则取当前时间
+        
+        Returns:
+            本次更新的差异；没有任何变化时 changes 为空且版本号不变
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._lock:
+            self.stats['frames'] += 1
+            calibration = self.extractor.calibration(frame.shape)
+            # 窗口几何或缩放变化后格子坐标不再对应，重新建立基线
+            reset = self.grid is None or calibration is not self.calibration
+            if reset:
+                regions = None
+            if regions is not None and not regions:
+                return {'version': self.version, 'time': timestamp, 'reset': False, 'changes': []}
+            
+            version = self.version + 1
+            changes = []
+            if regions is None:
+                grid = self.extractor.extract(frame)
+                self.stats['full_extractions'] += 1
+                self.stats['tiles_reclassified'] += grid.size
+                if not reset:
+                    full = slice(0, grid.shape[0]), slice(0, grid.shape[1])
+                    changes = self._events(self.grid, grid, *full, version, timestamp)
+                self.grid = grid
+                self.calibration = calibration
+            else:
+                for rect in regions:
+                    rows, cols = calibration.tiles_in_rect(rect)
+                    if rows.stop <= rows.start or cols.stop <= cols.start:
+                        continue
+                    block = self.extractor.extract_region(frame, rows, cols)
+                    self.stats['tiles_reclassified'] += block.size
+                    changes.extend(self._events(self.grid[rows, cols], block, rows, cols, version, timestamp))
+                    self.grid[rows, cols] = block
+            
+            if not reset and not changes:
+                return {'version': self.version, 'time': timestamp, 'reset': False, 'changes': []}
+            self.version = version
+            self.updated_at = timestamp
+            self._changes.extend(changes)
+            self.stats['events'] += len(changes)
+            diff = {'version': version, 'time': timestamp, 'reset': reset, 'changes': changes}
+        self._publish(diff)
+        return diff
+    
+    def changes_since(self, version: int) -> List[dict]:
+        """
+        获取某个版本之后的所有事件
+        
+        Args:
+            version: 调用方已处理到的版本号
+        
+        Returns:
+            事件列表（按版本排序）；历史已被截断时只返回仍保留的部分
+        """
+        with self._lock:
+            return [change for change in self._changes if change['version'] > version]
+    
+    def snapshot(self) -> Tuple[Optional[np.ndarray], int]:
+        """
+        当前地图的副本和对应的版本号（同一把锁下读取）
+        
+        update 原地修改 grid，交给其他线程（如决策编码）的地图必须用副本
+        """
+        with self._lock:
+            return (None if self.grid is None else self.grid.copy()), self.version
+    
+    def entities(self, cid: int) -> List[Tuple[int, int]]:
+        """当前地图中某一类别的所有格子 (col, row)"""
+        if self.grid is None:
+            return []
+        rows, cols = np.nonzero(self.grid == cid)
+        return list(zip(cols.tolist(), rows.tolist()))
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        frames = self.stats['frames']
+        per_frame = self.stats['tiles_reclassified'] / frames if frames else 0.0
+        return {
+            '当前版本': str(self.version),
+            '处理帧数': f"{frames}（整图提取 {self.stats['full_extractions']} 次）",
+            '平均每帧重分类格子数': f"{per_frame:.1f}",
+            '实体事件数': str(self.stats['events'])
+        }
@@ -0,0 +1,267 @@
+"""
+OCR服务
+在后台线程中只加载一次easyocr模型并保持常驻；文字区域跳过检测阶段直接送入识别网络，使用GPU时
+多个区域拼接成一张图、一次推理批量识别（CPU上批量推理没有收益，逐个区域识别）。
+识别结果按区域像素的哈希缓存（LRU），分数、周数等没有变化的HUD区域不会被重复识别
+"""
+
+import bisect
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from ..utils.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+easyocr = lazy_import('easyocr')
+
+# 批量识别时拼接区域之间的间隔（像素）
+STACK_GAP = 8
+
+
+def crop_hash(crop: np.ndarray, allowlist: Optional[str] = None) -> bytes:
+    """按区域像素、尺寸和字符白名单计算缓存键"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(crop.shape).encode())
+    digest.update((allowlist or '').encode())
+    digest.update(np.ascontiguousarray(crop).data)
+    return digest.digest()
+
+
+class OCRService:
+    """常驻的批量OCR服务
+    
+    每个识别结果为 {'text': 识别文字, 'confidence': 置信度, 'cached': 是否来自缓存}
+    """
+    
+    def __init__(self, languages: Optional[Sequence[str]] = None, gpu: Optional[bool] = None,
+                 cache_size: Optional[int] = None, preload: bool = True, reader=None):
+        """
+        初始化OCR服务
+        
+        Args:
+            languages: 识别语言，None则使用 recognition.ocr_languages
+            gpu: 是否使用GPU，None则使用 recognition.ocr_gpu
+            cache_size: 结果缓存容量，None则使用 recognition.ocr_cache_size
+            preload: 是否立即在后台线程加载模型
+            reader: 已创建的easyocr.Reader（或兼容对象），提供时不再加载模型
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.languages = list(languages or self.config.get('recognition.ocr_languages', ['en']))
+        self.gpu = gpu if gpu is not None else self.config.get('recognition.ocr_gpu', False)
+        self.cache_size = cache_size if cache_size is not None else \
+            self.config.get('recognition.ocr_cache_size', 512)
+        
+        self._reader = reader
+        self._ready = threading.Event()
+        self._load_error = None
+        self._loader = None
+        # easyocr的Reader不是线程安全的，推理串行执行
+        self._infer_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache: "OrderedDict[bytes, dict]" = OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'inferences': 0,
+            'batched_crops': 0,
+            'load_time_s': 0.0
+        }
+        
+        if reader is not None:
+            self._ready.set()
+        elif preload:
+            self.start()
+        self.logger.register_statistics("OCR服务", self.statistics)
+    
+    def start(self):
+        """在后台线程中加载模型（重复调用无副作用）"""
+        if self._ready.is_set() or (self._loader is not None and self._loader.is_alive()):
+            return
+        self._loader = threading.Thread(target=self._load_reader, name="OCRLoader", daemon=True)
+        self._loader.start()
+    
+    def _load_reader(self):
+        """后台线程：创建easyocr.Reader"""
+        start = time.monotonic()
+        try:
+            self._reader = easyocr.Reader(self.languages, gpu=self.gpu, verbose=False)
+            self.stats['load_time_s'] = round(time.monotonic() - start, 2)
+            self.logger.add_success(f"OCR模型加载完成 ({', '.join(self.languages)})，耗时 {self.stats['load_time_s']} 秒")
+        except Exception as e:
+            self._load_error = e
+            self.logger.add_error(f"OCR模型加载失败: {str(e)}")
+        finally:
+            self._ready.set()
+    
+    @property
+    def ready(self) -> bool:
+        """模型是否已可用"""
+        return self._ready.is_set() and self._reader is not None
+    
+    @property
+    def hit_rate(self) -> float:
+        """缓存命中率"""
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+    
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待模型加载完成
+        
+        Returns:
+            模型是否可用
+        """
+        self.start()
+        self._ready.wait(timeout)
+        return self.ready
+    
+    def _cache_get(self, key: bytes) -> Optional[dict]:
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+    
+    def _cache_put(self, key: bytes, result: dict):
+        with self._cache_lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def read(self, crop: np.ndarray, allowlist: Optional[str] = None, timeout: Optional[float] = None) -> dict:
+        """识别单个文字区域"""
+        return self.read_batch([crop], allowlist, timeout)[0]
+    
+    def read_batch(self, crops: Sequence[np.ndarray], allowlist: Optional[str] = None,
+                   timeout: Optional[float] = None) -> List[dict]:
+        """
+        批量识别单行文字区域（分数、周数、倒计时等HUD）
+        
+        未命中缓存的区域以整个区域为文本框送入识别网络，跳过文字检测阶段；
+        使用GPU时拼接成一张灰度图一次推理，CPU上逐个区域推理
+        
+        Args:
+            crops: 区域图像列表（BGR或灰度）
+            allowlist: 字符白名单，如 '0123456789'
+            timeout: 等待模型加载的最长时间（秒），None表示一直等待
+        
+        Returns:
+            与crops一一对应的识别结果
+        """
+        results: List[Optional[dict]] = [None] * len(crops)
+        pending = {}
+        for index, crop in enumerate(crops):
+            key = crop_hash(crop, allowlist)
+            cached = self._cache_get(key)
+            if cached is not None:
+                self.stats['hits'] += 1
+                results[index] = dict(cached, cached=True)
+            elif key in pending:
+                # 同一批中相同的区域只识别一次
+                self.stats['hits'] += 1
+                pending[key].append(index)
+            else:
+                self.stats['misses'] += 1
+                pending[key] = [index]
+        
+        if pending:
+            if not self.wait_ready(timeout):
+                error = str(self._load_error) if self._load_error else "OCR模型尚未加载完成"
+                for indices in pending.values():
+                    for index in indices:
+                        results[index] = {'text': '', 'confidence': 0.0, 'cached': False, 'error': error}
+                return results
+            
+            keys = list(pending)
+            recognized = self._recognize([crops[pending[key][0]] for key in keys], allowlist)
+            for key, result in zip(keys, recognized):
+                self._cache_put(key, result)
+                for index in pending[key]:
+                    results[index] = dict(result, cached=False)
+        return results
+    
+    @staticmethod
+    def _to_gray(crop: np.ndarray) -> np.ndarray:
+        if crop.ndim == 2:
+            return crop
+        if crop.shape[2] == 4:
+            return cv2.cvtColor(crop, cv2.COLOR_BGRA2GRAY)
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    
+    def _recognize(self, crops: List[np.ndarray], allowlist: Optional[str]) -> List[dict]:
+        """识别未命中缓存的区域：GPU上批量推理，CPU上easyocr按批计算没有收益，逐个区域推理"""
+        grays = [self._to_gray(crop) for crop in crops]
+        if self.gpu and len(grays) > 1:
+            return self._recognize_stacked(grays, allowlist)
+        results = []
+        for gray in grays:
+            h, w = gray.shape
+            with self._infer_lock:
+                raw = self._reader.recognize(gray, horizontal_list=[[0, w, 0, h]], free_list=[],
+                                             batch_size=1, allowlist=allowlist, detail=1)
+            self.stats['inferences'] += 1
+            self.stats['batched_crops'] += 1
+            results.append(self._merge([(text, float(confidence)) for _, text, confidence in raw]))
+        return results
+    
+    @staticmethod
+    def _merge(items: List[tuple]) -> dict:
+        """合并一个区域内的多段文字，置信度取最低值"""
+        return {
+            'text': ' '.join(text for text, _ in items),
+            'confidence': round(min((conf for _, conf in items), default=0.0), 4)
+        }
+    
+    def _recognize_stacked(self, grays: List[np.ndarray], allowlist: Optional[str]) -> List[dict]:
+        """把多个区域纵向拼接后一次推理，按文本框位置把结果分回各区域"""
+        width = max(gray.shape[1] for gray in grays)
+        height = sum(gray.shape[0] for gray in grays) + STACK_GAP * (len(grays) - 1)
+        # 用各区域边缘的中位灰度作为背景，避免拼接缝被当成文字
+        background = int(np.median(np.concatenate([gray[0] for gray in grays])))
+        canvas = np.full((height, width), background, dtype=np.uint8)
+        
+        boxes = []
+        offsets = []
+        y = 0
+        for gray in grays:
+            h, w = gray.shape
+            canvas[y:y + h, :w] = gray
+            boxes.append([0, w, y, y + h])
+            offsets.append(y)
+            y += h + STACK_GAP
+        
+        with self._infer_lock:
+            raw = self._reader.recognize(canvas, horizontal_list=boxes, free_list=[],
+                                         batch_size=len(boxes), allowlist=allowlist, detail=1)
+        self.stats['inferences'] += 1
+        self.stats['batched_crops'] += len(grays)
+        
+        texts = [[] for _ in grays]
+        for box, text, confidence in raw:
+            top = min(point[1] for point in box)
+            index = max(0, bisect.bisect_right(offsets, top) - 1)
+            texts[index].append((text, float(confidence)))
+        return [self._merge(items) for items in texts]
+    
+    def clear_cache(self):
+        """清空识别结果缓存"""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        total = self.stats['hits'] + self.stats['misses']
+        return {
+            '缓存命中率': f"{self.hit_rate * 100:.1f}% ({self.stats['hits']}/{total})",
+            '推理次数': f"{self.stats['inferences']}（共 {self.stats['batched_crops']} 个区域）",
+            '模型加载耗时': f"{self.stats['load_time_s']} 秒"
+        }
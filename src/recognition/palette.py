@@ -0,0 +1,263 @@
+"""
+调色板查找表
+Mini Motorways 的地图只使用少量纯色（道路、房屋、目的地、水面、地形、车辆），
+预先把量化后的 32x32x32 BGR 空间映射到类别编号，整幅截图或任意区域只需一次NumPy索引即可分类
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+
+
+# 类别编号（uint8）；房屋和目的地按颜色序号偏移
+TERRAIN = 0
+ROAD = 1
+WATER = 2
+OBSTACLE = 3
+BRIDGE = 4
+TUNNEL = 5
+CAR = 6
+HOUSE = 16
+DESTINATION = 32
+UNKNOWN = 255
+
+# 房屋/目的地颜色，序号即相对 HOUSE/DESTINATION 的偏移
+OBJECT_COLORS = ('red', 'blue', 'yellow', 'green', 'purple', 'orange', 'pink', 'cyan')
+
+_BASE_CLASSES = {
+    'terrain': TERRAIN,
+    'road': ROAD,
+    'water': WATER,
+    'obstacle': OBSTACLE,
+    'bridge': BRIDGE,
+    'tunnel': TUNNEL,
+    'car': CAR,
+    'unknown': UNKNOWN,
+}
+
+# 量化位数：每个通道保留高5位，即32级
+LUT_BITS = 5
+LUT_SIZE = 1 << LUT_BITS
+
+
+def class_id(name: str) -> int:
+    """
+    类别名称转编号，如 'road'、'house_red'、'destination_blue'
+    
+    Raises:
+        ValueError: 未知的类别名称
+    """
+    if name in _BASE_CLASSES:
+        return _BASE_CLASSES[name]
+    kind, _, color = name.partition('_')
+    if kind in ('house', 'destination') and color in OBJECT_COLORS:
+        base = HOUSE if kind == 'house' else DESTINATION
+        return base + OBJECT_COLORS.index(color)
+    raise ValueError(f"未知的类别: {name}")
+
+
+def class_name(cid: int) -> str:
+    """类别编号转名称"""
+    for name, value in _BASE_CLASSES.items():
+        if value == cid:
+            return name
+    if HOUSE <= cid < HOUSE + len(OBJECT_COLORS):
+        return f"house_{OBJECT_COLORS[cid - HOUSE]}"
+    if DESTINATION <= cid < DESTINATION + len(OBJECT_COLORS):
+        return f"destination_{OBJECT_COLORS[cid - DESTINATION]}"
+    return 'unknown'
+
+
+def is_house(cid) -> np.ndarray:
+    """是否为房屋类别（支持数组）"""
+    cid = np.asarray(cid)
+    return (cid >= HOUSE) & (cid < HOUSE + len(OBJECT_COLORS))
+
+
+def is_destination(cid) -> np.ndarray:
+    """是否为目的地类别（支持数组）"""
+    cid = np.asarray(cid)
+    return (cid >= DESTINATION) & (cid < DESTINATION + len(OBJECT_COLORS))
+
+
+# 默认调色板（BGR），取自1080p截图的近似值；不同地图的底色差别较大，应使用校准工具生成各地图的配置
+DEFAULT_ENTRIES = [
+    ('terrain', (200, 226, 236)),
+    ('terrain', (178, 210, 222)),
+    ('road', (250, 250, 250)),
+    ('road', (226, 226, 226)),
+    ('water', (214, 176, 120)),
+    ('obstacle', (120, 150, 160)),
+    ('house_red', (86, 92, 230)),
+    ('house_blue', (219, 146, 60)),
+    ('house_yellow', (64, 196, 246)),
+    ('house_green', (110, 184, 96)),
+    ('house_purple', (172, 104, 150)),
+    ('house_orange', (60, 140, 240)),
+    ('house_pink', (170, 140, 240)),
+    ('house_cyan', (200, 200, 90)),
+    ('destination_red', (60, 64, 200)),
+    ('destination_blue', (190, 112, 32)),
+    ('destination_yellow', (30, 170, 230)),
+    ('destination_green', (80, 156, 66)),
+    ('destination_purple', (142, 74, 120)),
+    ('destination_orange', (30, 110, 214)),
+    ('destination_pink', (140, 110, 214)),
+    ('destination_cyan', (170, 170, 60)),
+]
+
+
+class PaletteProfile:
+    """单个地图的调色板：若干 (类别, BGR颜色) 条目及其生成的查找表"""
+    
+    def __init__(self, name: str, entries: Iterable[Tuple[str, Sequence[int]]], max_distance: float = 40.0):
+        """
+        Args:
+            name: 配置名称（通常为地图名）
+            entries: (类别名称, (b, g, r)) 列表，同一类别可以有多种颜色
+            max_distance: 与最近调色板颜色的距离超过该值的量化格判为unknown
+        """
+        self.name = name
+        self.entries: List[Tuple[str, Tuple[int, int, int]]] = [
+            (cls, tuple(int(c) for c in color)) for cls, color in entries
+        ]
+        self.max_distance = max_distance
+        self._lut = None
+    
+    @property
+    def lut(self) -> np.ndarray:
+        """展平的查找表（长度 32**3 的uint8数组），首次访问时生成"""
+        if self._lut is None:
+            self._lut = self.build_lut()
+        return self._lut
+    
+    def build_lut(self) -> np.ndarray:
+        """对每个量化格的中心颜色求最近的调色板颜色"""
+        if not self.entries:
+            return np.full(LUT_SIZE ** 3, UNKNOWN, dtype=np.uint8)
+        step = 256 // LUT_SIZE
+        levels = np.arange(LUT_SIZE, dtype=np.float32) * step + step / 2
+        b, g, r = np.meshgrid(levels, levels, levels, indexing='ij')
+        centers = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1)
+        
+        colors = np.array([color for _, color in self.entries], dtype=np.float32)
+        ids = np.array([class_id(cls) for cls, _ in self.entries], dtype=np.uint8)
+        # (32768, K) 的平方距离，K很小，一次计算完成
+        distances = ((centers[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2)
+        nearest = distances.argmin(axis=1)
+        lut = ids[nearest]
+        lut[distances[np.arange(len(centers)), nearest] > self.max_distance ** 2] = UNKNOWN
+        return lut
+    
+    def classify(self, image: np.ndarray) -> np.ndarray:
+        """
+        把BGR图像的每个像素分类
+        
+        Args:
+            image: (H, W, 3) 或 (H, W, 4) 的uint8图像（可以是截图的切片视图）
+        
+        Returns:
+            (H, W) 的uint8类别图
+        """
+        quantized = image[..., :3] >> (8 - LUT_BITS)
+        # 15位索引放在uint16中原地拼接，避免生成intp临时数组
+        index = quantized[..., 0].astype(np.uint16)
+        index <<= LUT_BITS
+        index |= quantized[..., 1]
+        index <<= LUT_BITS
+        index |= quantized[..., 2]
+        return self.lut.take(index)
+    
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'max_distance': self.max_distance,
+            'entries': [{'class': cls, 'color': list(color)} for cls, color in self.entries]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PaletteProfile':
+        return cls(data['name'],
+                   [(entry['class'], entry['color']) for entry in data['entries']],
+                   data.get('max_distance', 40.0))
+    
+    @classmethod
+    def from_samples(cls, name: str, samples: Iterable[Tuple[np.ndarray, Dict[str, List[Sequence[int]]]]],
+                     max_distance: float = 40.0) -> 'PaletteProfile':
+        """
+        从标注的样本帧生成调色板
+        
+        Args:
+            name: 配置名称
+            samples: (帧, {类别名称: [(x, y, w, h), ...]}) 列表，矩形内应只包含该类别的纯色
+            max_distance: 最大颜色距离
+        
+        Returns:
+            调色板配置，每个类别一个条目（所有矩形像素的中位颜色）
+        """
+        pixels: Dict[str, List[np.ndarray]] = {}
+        for frame, regions in samples:
+            for cls_name, rects in regions.items():
+                class_id(cls_name)
+                for x, y, w, h in rects:
+                    patch = frame[int(y):int(y) + int(h), int(x):int(x) + int(w), :3]
+                    pixels.setdefault(cls_name, []).append(patch.reshape(-1, 3))
+        entries = [(cls_name, np.median(np.concatenate(parts), axis=0).round().astype(int).tolist())
+                   for cls_name, parts in pixels.items()]
+        return cls(name, entries, max_distance)
+
+
+class PaletteLibrary:
+    """按地图管理调色板配置（JSON文件），查找表在内存中缓存"""
+    
+    def __init__(self, palette_dir: Optional[str] = None):
+        """
+        Args:
+            palette_dir: 配置目录，每个地图一个 <name>.json；None则使用 recognition.palette_dir
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.palette_dir = Path(palette_dir or self.config.get('recognition.palette_dir', 'templates/palettes'))
+        self._profiles: Dict[str, PaletteProfile] = {}
+    
+    def get(self, name: Optional[str] = None) -> PaletteProfile:
+        """
+        获取地图的调色板，没有配置文件时使用默认调色板
+        
+        Args:
+            name: 地图名，None则使用 recognition.palette_map
+        """
+        if name is None:
+            name = self.config.get('recognition.palette_map', 'default')
+        profile = self._profiles.get(name)
+        if profile is None:
+            path = self.palette_dir / f"{name}.json"
+            if path.is_file():
+                with open(path, 'r', encoding='utf-8') as f:
+                    profile = PaletteProfile.from_dict(json.load(f))
+            else:
+                if name != 'default':
+                    self.logger.add_warning(f"没有地图 {name} 的调色板配置，使用默认调色板")
+                profile = PaletteProfile(name, DEFAULT_ENTRIES)
+            self._profiles[name] = profile
+        return profile
+    
+    def save(self, profile: PaletteProfile) -> Path:
+        """保存调色板配置"""
+        self.palette_dir.mkdir(parents=True, exist_ok=True)
+        path = self.palette_dir / f"{profile.name}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profile.to_dict(), f, ensure_ascii=False, indent=2)
+        self._profiles[profile.name] = profile
+        return path
+    
+    def names(self) -> List[str]:
+        """已保存的地图配置名称"""
+        if not self.palette_dir.is_dir():
+            return []
+        return sorted(path.stem for path in self.palette_dir.glob('*.json'))
@@ -0,0 +1,459 @@
+"""
+多进程识别流水线
+模板匹配、界面分类、调色板分类、网格提取等CPU密集的识别阶段分发到工作进程池并行执行。
+阶段按依赖关系组成有向无环图，每个阶段有独立的并发上限；帧通过共享内存传给工作进程，
+结果按帧序号顺序重组，比最新完成帧更旧的未完成帧直接丢弃
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..utils.logger import get_logger, reset_logger
+from ..utils.config import get_config
+
+
+class Stage:
+    """识别阶段
+    
+    func 的签名为 func(frame, deps) -> 结果，deps 为 {依赖阶段名: 结果}。
+    使用进程池时 func 必须是模块级函数（可pickle），且返回值不能是帧的视图
+    """
+    
+    def __init__(self, name: str, func: Callable[[np.ndarray, dict], object],
+                 deps: Sequence[str] = (), max_concurrency: Optional[int] = None):
+        """
+        Args:
+            name: 阶段名称
+            func: 阶段函数
+            deps: 依赖的阶段名称
+            max_concurrency: 同时执行的最大任务数，None或0表示不单独限制（只受工作进程数限制）
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.max_concurrency = max(1, int(max_concurrency)) if max_concurrency else None
+
+
+def _init_worker():
+    """工作进程初始化：不写会话日志（避免以spawn方式启动时截断主进程的日志文件），异常随结果返回主进程记录"""
+    reset_logger(os.devnull)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """附加到主进程创建的共享内存，不向资源跟踪器登记（由主进程负责释放）"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 之前没有track参数；以fork方式启动的工作进程与主进程共用资源跟踪器，
+        # 登记后会在主进程释放时重复注销
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _run_stage(func, payload, deps: dict):
+    """
+    在工作进程中执行一个阶段
+    
+    Args:
+        payload: 帧数组（线程执行器）或共享内存描述 (name, shape, dtype)
+    
+    Returns:
+        (结果, 耗时秒)
+    """
+    shm = None
+    if isinstance(payload, tuple):
+        name, shape, dtype = payload
+        shm = _attach_shared_memory(name)
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    else:
+        frame = payload
+    try:
+        start = time.perf_counter()
+        result = func(frame, deps)
+        return result, time.perf_counter() - start
+    finally:
+        if shm is not None:
+            del frame
+            shm.close()
+
+
+# 工作进程内的识别对象（每个进程创建一次）
+_worker_objects: Dict[str, object] = {}
+
+
+def worker_object(key: str, factory: Callable[[], object]):
+    """获取当前进程内缓存的识别对象，首次调用时创建"""
+    obj = _worker_objects.get(key)
+    if obj is None:
+        obj = _worker_objects[key] = factory()
+    return obj
+
+
+def classify_screen(frame: np.ndarray, deps: dict) -> dict:
+    """默认阶段：界面分类"""
+    from .screen_classifier import ScreenClassifier
+    return worker_object('screen', ScreenClassifier).classify(frame)
+
+
+def extract_grid(frame: np.ndarray, deps: dict) -> Optional[np.ndarray]:
+    """默认阶段：网格地图提取（只在游戏中或无法判断界面时执行）"""
+    from .grid_extractor import GridExtractor
+    from .screen_classifier import IN_GAME, UNKNOWN
+    screen = (deps.get('screen') or {}).get('screen', UNKNOWN)
+    if screen not in (IN_GAME, UNKNOWN):
+        return None
+    return worker_object('grid', GridExtractor).extract(frame)
+
+
+def default_stages() -> List[Stage]:
+    """默认的阶段图：界面分类 -> 网格提取（并发上限默认为0，即可以占满所有工作进程）"""
+    config = get_config()
+    return [
+        Stage('screen', classify_screen, max_concurrency=config.get('recognition.pipeline_screen_concurrency', 0)),
+        Stage('grid', extract_grid, deps=('screen',),
+              max_concurrency=config.get('recognition.pipeline_grid_concurrency', 0)),
+    ]
+
+
+class _FrameJob:
+    """流水线中一帧的状态"""
+    
+    __slots__ = ('seq', 'timestamp', 'submitted_at', 'payload', 'shm', 'results', 'errors',
+                 'done_stages', 'running', 'finished', 'stale')
+    
+    def __init__(self, seq: int, timestamp: float, payload, shm):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.submitted_at = time.monotonic()
+        self.payload = payload
+        self.shm = shm
+        self.results: Dict[str, object] = {}
+        self.errors: Dict[str, str] = {}
+        self.done_stages = set()
+        self.running = 0
+        self.finished = False
+        self.stale = False
+
+
+class RecognitionPipeline:
+    """多进程识别流水线
+    
+    submit() 提交帧后立即返回；每帧所有阶段完成后，结果
+    {'seq', 'timestamp', 'results': {阶段名: 结果}, 'errors': {阶段名: 错误}, 'latency_s'}
+    按帧序号顺序放入结果队列（next_result 获取），并调用 on_result 回调
+    """
+    
+    def __init__(self, stages: Optional[Sequence[Stage]] = None, workers: Optional[int] = None,
+                 max_frames: Optional[int] = None, drop_stale: Optional[bool] = None,
+                 executor: Optional[Executor] = None, on_result: Optional[Callable[[dict], None]] = None):
+        """
+        初始化流水线
+        
+        Args:
+            stages: 阶段列表，None则使用 default_stages()
+            workers: 工作进程数，None则使用 recognition.pipeline_workers（0表示CPU核数）
+            max_frames: 同时在处理中的最大帧数，超过时新帧被拒绝，None则使用 recognition.pipeline_max_frames
+            drop_stale: 是否丢弃比最新完成帧更旧的帧，None则使用 recognition.pipeline_drop_stale
+            executor: 外部提供的执行器（如测试用的线程池），提供时帧直接传递而不经过共享内存
+            on_result: 结果回调（在执行器的回调线程中调用）
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.stages = {stage.name: stage for stage in (stages or default_stages())}
+        self._order = self._topological_order()
+        self._successors: Dict[str, List[str]] = {name: [] for name in self.stages}
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                self._successors[dep].append(stage.name)
+        
+        if workers is None:
+            workers = self.config.get('recognition.pipeline_workers', 0)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_frames = max_frames or self.config.get('recognition.pipeline_max_frames', 2 * self.workers)
+        self.drop_stale = drop_stale if drop_stale is not None else \
+            self.config.get('recognition.pipeline_drop_stale', True)
+        self.on_result = on_result
+        
+        self._owns_executor = executor is None
+        self._use_shm = executor is None
+        self._executor = executor or ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._lock = threading.Lock()
+        # 交付顺序锁：保证不同回调线程按帧序号依次交付（加锁顺序为先交付锁后状态锁）
+        self._deliver_lock = threading.Lock()
+        self._jobs: Dict[int, _FrameJob] = {}
+        self._ready: deque = deque()
+        self._running = {name: 0 for name in self.stages}
+        self._completed: Dict[int, dict] = {}
+        self._results: "queue.Queue[dict]" = queue.Queue()
+        self._next_seq = 0
+        self._closed = False
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'dropped_stale': 0,
+            'rejected': 0,
+            'stage_time_s': {name: 0.0 for name in self.stages},
+            'stage_runs': {name: 0 for name in self.stages},
+            'latency_sum_s': 0.0
+        }
+        self.logger.register_statistics("识别流水线", self.statistics)
+    
+    def _topological_order(self) -> List[str]:
+        """检查依赖关系并给出拓扑顺序
+        
+        Raises:
+            ValueError: 依赖不存在或存在环
+        """
+        order, visiting, visited = [], set(), set()
+        
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"识别阶段存在循环依赖: {name}")
+            if name not in self.stages:
+                raise ValueError(f"未知的依赖阶段: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+        
+        for name in self.stages:
+            visit(name)
+        return order
+    
+    def submit(self, frame: np.ndarray, timestamp: Optional[float] = None) -> Optional[int]:
+        """
+        提交一帧
+        
+        Args:
+            frame: 截图数组
+            timestamp: 帧时间（time.monotonic），None则取当前时间
+        
+        Returns:
+            帧序号；在处理中的帧已达上限时返回None（该帧被丢弃）
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("识别流水线已关闭")
+            if len(self._jobs) >= self.max_frames:
+                self.stats['rejected'] += 1
+                return None
+            seq = self._next_seq
+            self._next_seq += 1
+            self.stats['submitted'] += 1
+        
+        shm = None
+        if self._use_shm:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, frame.nbytes))
+            np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[...] = frame
+            payload = (shm.name, frame.shape, frame.dtype.str)
+        else:
+            payload = frame
+        job = _FrameJob(seq, timestamp if timestamp is not None else time.monotonic(), payload, shm)
+        
+        with self._lock:
+            self._jobs[seq] = job
+            for name in self._order:
+                if not self.stages[name].deps:
+                    self._ready.append((seq, name))
+            submitted = self._dispatch()
+        self._watch(submitted)
+        return seq
+    
+    def _dispatch(self) -> list:
+        """
+        在并发上限内提交就绪的阶段任务（调用方持有锁）
+        
+        Returns:
+            [(future, 帧序号, 阶段名)]，由调用方在释放锁之后注册完成回调
+            （已完成的future会在注册时同步调用回调）
+        """
+        submitted = []
+        waiting = deque()
+        while self._ready:
+            seq, name = self._ready.popleft()
+            job = self._jobs.get(seq)
+            if job is None or job.stale:
+                continue
+            limit = self.stages[name].max_concurrency
+            if limit is not None and self._running[name] >= limit:
+                waiting.append((seq, name))
+                continue
+            deps = {dep: job.results.get(dep) for dep in self.stages[name].deps}
+            self._running[name] += 1
+            job.running += 1
+            future = self._executor.submit(_run_stage, self.stages[name].func, job.payload, deps)
+            submitted.append((future, seq, name))
+        self._ready = waiting
+        return submitted
+    
+    def _watch(self, submitted: list):
+        """为已提交的任务注册完成回调"""
+        for future, seq, name in submitted:
+            future.add_done_callback(lambda f, seq=seq, name=name: self._on_stage_done(seq, name, f))
+    
+    def _on_stage_done(self, seq: int, name: str, future):
+        """阶段任务完成回调"""
+        finished = False
+        submitted = []
+        # 执行器关闭时取消了排队的任务（close 或外部执行器的 shutdown(cancel_futures=True)）
+        cancelled = future.cancelled()
+        with self._lock:
+            self._running[name] -= 1
+            job = self._jobs.get(seq)
+            if job is not None:
+                job.running -= 1
+                try:
+                    if cancelled:
+                        # 这一帧无法完成，按丢弃处理
+                        job.stale = True
+                        job.errors[name] = "任务被取消"
+                    elif not job.stale:
+                        try:
+                            result, elapsed = future.result()
+                            job.results[name] = result
+                            self.stats['stage_time_s'][name] += elapsed
+                            self.stats['stage_runs'][name] += 1
+                        except Exception as e:
+                            job.results[name] = None
+                            job.errors[name] = str(e)
+                            self.logger.add_error(f"识别阶段 {name} 失败（帧 {seq}）: {str(e)}")
+                        job.done_stages.add(name)
+                        for successor in self._successors[name]:
+                            if all(dep in job.done_stages for dep in self.stages[successor].deps):
+                                self._ready.append((seq, successor))
+                        if len(job.done_stages) == len(self.stages):
+                            self._finish(job)
+                            finished = True
+                finally:
+                    self._release(job)
+            if not self._closed and not cancelled:
+                submitted = self._dispatch()
+        self._watch(submitted)
+        if finished:
+            self._flush()
+    
+    def _finish(self, job: _FrameJob):
+        """一帧的所有阶段完成（调用方持有锁）"""
+        job.finished = True
+        latency = time.monotonic() - job.submitted_at
+        self.stats['completed'] += 1
+        self.stats['latency_sum_s'] += latency
+        self._completed[job.seq] = {
+            'seq': job.seq,
+            'timestamp': job.timestamp,
+            'results': job.results,
+            'errors': job.errors,
+            'latency_s': round(latency, 4)
+        }
+        if self.drop_stale:
+            for other in list(self._jobs.values()):
+                if other.seq < job.seq and not other.finished and not other.stale:
+                    other.stale = True
+                    self.stats['dropped_stale'] += 1
+                    self._release(other)
+    
+    def _release(self, job: _FrameJob):
+        """帧完成或被丢弃且没有执行中的任务时，释放共享内存并移除（调用方持有锁）"""
+        if job.running > 0 or not (job.finished or job.stale):
+            return
+        if job.shm is not None:
+            job.shm.close()
+            job.shm.unlink()
+            job.shm = None
+        if job.stale or job.seq not in self._completed:
+            self._jobs.pop(job.seq, None)
+    
+    def _collect_deliveries(self) -> List[dict]:
+        """按帧序号取出可以交付的结果：比它更早的帧都已交付或被丢弃（调用方持有锁）"""
+        deliveries = []
+        for seq in sorted(self._completed):
+            if any(other.seq < seq and not other.finished and not other.stale for other in self._jobs.values()):
+                break
+            deliveries.append(self._completed.pop(seq))
+            job = self._jobs.get(seq)
+            if job is not None and job.running == 0:
+                self._jobs.pop(seq, None)
+        return deliveries
+    
+    def _flush(self):
+        """交付所有可以交付的结果"""
+        with self._deliver_lock:
+            with self._lock:
+                deliveries = self._collect_deliveries()
+            for output in deliveries:
+                self._results.put(output)
+                if self.on_result is not None:
+                    try:
+                        self.on_result(output)
+                    except Exception as e:
+                        self.logger.add_error(f"识别结果回调失败: {str(e)}")
+    
+    def next_result(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        按帧序号顺序获取下一个结果
+        
+        Returns:
+            结果字典，超时返回None
+        """
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    @property
+    def in_flight(self) -> int:
+        """处理中的帧数"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished and not job.stale)
+    
+    def close(self, wait: bool = True):
+        """关闭流水线，释放共享内存；只关闭由流水线自己创建的进程池"""
+        with self._lock:
+            self._closed = True
+            self._ready.clear()
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            # 仍在执行的任务（wait=False）完成回调时再释放
+            for job in list(self._jobs.values()):
+                job.stale = True
+                self._release(job)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        completed = self.stats['completed']
+        mean_latency = self.stats['latency_sum_s'] / completed * 1000 if completed else 0.0
+        summary = {
+            '工作进程数': str(self.workers),
+            '帧数': f"提交 {self.stats['submitted']}，完成 {completed}，"
+                    f"过期丢弃 {self.stats['dropped_stale']}，拒绝 {self.stats['rejected']}",
+            '平均端到端耗时': f"{mean_latency:.1f} ms"
+        }
+        for name in self._order:
+            runs = self.stats['stage_runs'][name]
+            if runs:
+                summary[f"阶段 {name}"] = f"{self.stats['stage_time_s'][name] / runs * 1000:.2f} ms × {runs}"
+        return summary
@@ -0,0 +1,500 @@
+"""
+道路网络图
+从格子类别数组建立道路网络：邻接关系存放在定长数组中（可导出CSR），连通性由并查集维护，
+距离查询使用按连通分量失效的BFS缓存和A*。格子变化时只更新变化格子及其邻居，
+只有受影响连通分量的缓存会失效，候选操作评估可以每秒进行数千次查询
+"""
+
+import heapq
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logger import get_logger
+from .palette import TERRAIN, ROAD, BRIDGE, TUNNEL, HOUSE, DESTINATION, is_house, is_destination
+
+# 四邻域方向 (drow, dcol)：上、下、左、右；槽位 i 的反方向为 i ^ 1
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+UNREACHABLE = -1
+
+Tile = Tuple[int, int]
+
+
+def is_roadlike(cid) -> np.ndarray:
+    """是否为可通行的道路类格子（道路、桥、隧道），支持数组"""
+    cid = np.asarray(cid)
+    return (cid == ROAD) | (cid == BRIDGE) | (cid == TUNNEL)
+
+
+def is_endpoint(cid) -> np.ndarray:
+    """是否为道路网络的端点（房屋、目的地），支持数组"""
+    return is_house(cid) | is_destination(cid)
+
+
+class RoadNetwork:
+    """道路网络
+    
+    节点编号为 row * cols + col，对外接口使用格子坐标 (col, row)。道路类格子之间相互连通；
+    房屋和目的地是叶子节点，只与相邻的道路类格子相连，车辆不能穿过它们，
+    因此并查集只包含道路类格子，端点的连通性由其相邻道路所在的连通分量决定。
+    每个连通分量有一个戳记，分量发生变化时更换戳记，缓存的距离随之失效
+    """
+    
+    def __init__(self, grid: Optional[np.ndarray] = None, register: bool = True):
+        """
+        初始化道路网络
+        
+        Args:
+            grid: 格子类别数组，None则在 rebuild/attach 时提供
+            register: 是否把统计注册到日志系统的会话统计
+        """
+        self.logger = get_logger()
+        self.grid: Optional[np.ndarray] = None
+        self.rows = 0
+        self.cols = 0
+        self.neighbors = np.zeros((0, 4), dtype=np.int32)
+        self.version = 0
+        self._parent: List[int] = []
+        self._stamp: Dict[int, int] = {}
+        self._stamp_counter = 0
+        self._bfs_cache: Dict[int, tuple] = {}
+        self._pair_cache: Dict[Tuple[int, int], tuple] = {}
+        self._version_cache: Dict[tuple, object] = {}
+        self.stats = {
+            'queries': 0,
+            'bfs_runs': 0,
+            'cache_hits': 0,
+            'astar_runs': 0,
+            'tile_updates': 0,
+            'component_rebuilds': 0
+        }
+        if grid is not None:
+            self.rebuild(grid)
+        if register:
+            self.logger.register_statistics("道路网络", self.statistics)
+    
+    def node(self, tile: Tile) -> int:
+        """格子 (col, row) 转节点编号"""
+        return tile[1] * self.cols + tile[0]
+    
+    def tile(self, node: int) -> Tile:
+        """节点编号转格子 (col, row)"""
+        return (node % self.cols, node // self.cols)
+    
+    # ---------- 并查集 ----------
+    
+    def _find(self, a: int) -> int:
+        parent = self._parent
+        root = a
+        while parent[root] != root:
+            root = parent[root]
+        while parent[a] != root:
+            parent[a], a = root, parent[a]
+        return root
+    
+    def _union(self, a: int, b: int) -> int:
+        ra, rb = self._find(a), self._find(b)
+        if ra != rb:
+            self._parent[rb] = ra
+            self._stamp.pop(rb, None)
+        return ra
+    
+    def _new_stamp(self, root: int):
+        self._stamp_counter += 1
+        self._stamp[root] = self._stamp_counter
+    
+    def _adjacent_roots(self, node: int) -> List[int]:
+        """与节点相邻的道路类格子所在的连通分量"""
+        r, c = divmod(node, self.cols)
+        roots = []
+        for dr, dc in DIRECTIONS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < self.rows and 0 <= nc < self.cols and is_roadlike(self.grid[nr, nc]):
+                root = self._find(nr * self.cols + nc)
+                if root not in roots:
+                    roots.append(root)
+        return roots
+    
+    def _roots_of(self, node: int) -> List[int]:
+        """节点所属的连通分量：道路类格子为自身分量，端点为相邻道路的分量"""
+        cid = self.grid.flat[node]
+        if is_roadlike(cid):
+            return [self._find(node)]
+        if is_endpoint(cid):
+            return self._adjacent_roots(node)
+        return []
+    
+    def _component_key(self, node: int) -> tuple:
+        """缓存有效性的键：节点所属各连通分量的 (根, 戳记)"""
+        return tuple(sorted((root, self._stamp.get(root, 0)) for root in self._roots_of(node)))
+    
+    # ---------- 构建与增量更新 ----------
+    
+    def rebuild(self, grid: np.ndarray):
+        """从完整的格子数组重建邻接数组、并查集和全部缓存"""
+        self.grid = np.array(grid, dtype=np.uint8, copy=True)
+        self.rows, self.cols = self.grid.shape
+        count = self.grid.size
+        flat = self.grid.ravel()
+        roadlike = is_roadlike(flat)
+        linkable = roadlike | is_endpoint(flat)
+        
+        # 邻接数组：每个节点4个槽位，没有边的槽位为-1；一条边至少一端是道路类格子
+        self.neighbors = np.full((count, 4), -1, dtype=np.int32)
+        rows, cols = np.divmod(np.arange(count), self.cols)
+        for slot, (dr, dc) in enumerate(DIRECTIONS):
+            nr, nc = rows + dr, cols + dc
+            inside = (nr >= 0) & (nr < self.rows) & (nc >= 0) & (nc < self.cols)
+            other = np.where(inside, nr * self.cols + nc, 0)
+            edge = inside & linkable & linkable[other] & (roadlike | roadlike[other])
+            self.neighbors[edge, slot] = other[edge]
+        
+        self._parent = list(range(count))
+        self._stamp = {}
+        road_nodes = np.flatnonzero(roadlike).tolist()
+        for a in road_nodes:
+            for b in self.neighbors[a].tolist():
+                if b > a and roadlike[b]:
+                    self._union(a, b)
+        for a in road_nodes:
+            root = self._find(a)
+            if root not in self._stamp:
+                self._new_stamp(root)
+        self._bfs_cache.clear()
+        self._pair_cache.clear()
+        self._version_cache.clear()
+        self.version += 1
+    
+    def _link_slots(self, node: int):
+        """重新计算一个节点与四个邻居之间的邻接槽位"""
+        r, c = divmod(node, self.cols)
+        cid = self.grid[r, c]
+        road = bool(is_roadlike(cid))
+        linkable = road or bool(is_endpoint(cid))
+        for slot, (dr, dc) in enumerate(DIRECTIONS):
+            nr, nc = r + dr, c + dc
+            if not (0 <= nr < self.rows and 0 <= nc < self.cols):
+                continue
+            other = nr * self.cols + nc
+            other_cid = self.grid[nr, nc]
+            other_road = bool(is_roadlike(other_cid))
+            edge = linkable and (other_road or bool(is_endpoint(other_cid))) and (road or other_road)
+            self.neighbors[node, slot] = other if edge else -1
+            self.neighbors[other, slot ^ 1] = node if edge else -1
+    
+    def apply_changes(self, changes: Dict[Tile, int]):
+        """
+        增量应用一批格子变化
+        
+        - 新增道路：与相邻道路合并分量
+        - 删除道路：只重建原分量的并查集（并查集不支持删除）
+        - 端点（房屋/目的地）变化：只使相邻分量的缓存失效
+        
+        Args:
+            changes: {(col, row): 新类别}
+        """
+        if self.grid is None:
+            raise RuntimeError("道路网络尚未建立，请先调用 rebuild")
+        flat = self.grid.ravel()
+        updates = []
+        split_roots = set()
+        for tile, cid in changes.items():
+            node = self.node(tile)
+            old = int(flat[node])
+            cid = int(cid)
+            if old == cid:
+                continue
+            updates.append((node, old, cid))
+            if is_roadlike(old) and not is_roadlike(cid):
+                split_roots.add(self._find(node))
+        if not updates:
+            return
+        
+        touched = set()
+        for node, old, cid in updates:
+            if is_endpoint(old):
+                touched.update(self._adjacent_roots(node))
+            flat[node] = cid
+            self._link_slots(node)
+        self.stats['tile_updates'] += len(updates)
+        
+        if split_roots:
+            self._split(split_roots)
+        for node, old, cid in updates:
+            if is_roadlike(cid) and not is_roadlike(old):
+                self._parent[node] = node
+                for other in self.neighbors[node].tolist():
+                    if other >= 0 and is_roadlike(flat[other]):
+                        self._union(node, other)
+                touched.add(self._find(node))
+            elif is_endpoint(cid):
+                touched.update(self._adjacent_roots(node))
+        for root in touched:
+            self._new_stamp(self._find(root))
+        self.version += 1
+    
+    def _split(self, roots: set):
+        """删除道路后重建受影响分量的并查集，分量可能一分为多"""
+        members = [n for n in range(len(self._parent)) if self._find(n) in roots]
+        for n in members:
+            self._parent[n] = n
+        for root in roots:
+            self._stamp.pop(root, None)
+        flat = self.grid.ravel()
+        road_members = [n for n in members if is_roadlike(flat[n])]
+        for a in road_members:
+            for b in self.neighbors[a].tolist():
+                if b > a and is_roadlike(flat[b]):
+                    self._union(a, b)
+        for a in road_members:
+            root = self._find(a)
+            if root not in self._stamp:
+                self._new_stamp(root)
+        self.stats['component_rebuilds'] += len(roots)
+    
+    def attach(self, map_state):
+        """
+        订阅 MapState 的差异，地图变化时自动更新
+        
+        Args:
+            map_state: 增量地图状态（src.recognition.map_state.MapState）
+        """
+        if map_state.grid is not None:
+            self.rebuild(map_state.grid)
+        
+        def on_diff(diff: dict):
+            if diff['reset'] or self.grid is None or self.grid.shape != map_state.grid.shape:
+                self.rebuild(map_state.grid)
+                return
+            tiles = {change['tile'] for change in diff['changes']}
+            self.apply_changes({tile: map_state.grid[tile[1], tile[0]] for tile in tiles})
+        
+        map_state.subscribe(on_diff)
+        return on_diff
+    
+    def csr(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        导出压缩稀疏行（CSR）形式的邻接关系
+        
+        Returns:
+            (indptr, indices)，节点 i 的邻居为 indices[indptr[i]:indptr[i + 1]]
+        """
+        valid = self.neighbors >= 0
+        indptr = np.zeros(len(self.neighbors) + 1, dtype=np.int32)
+        np.cumsum(valid.sum(axis=1), out=indptr[1:])
+        return indptr, self.neighbors[valid]
+    
+    # ---------- 查询 ----------
+    
+    def connected(self, a: Tile, b: Tile) -> bool:
+        """两个格子之间是否有道路相通"""
+        self.stats['queries'] += 1
+        na, nb = self.node(a), self.node(b)
+        if na == nb:
+            return True
+        return not set(self._roots_of(na)).isdisjoint(self._roots_of(nb))
+    
+    def _bfs(self, source: int) -> np.ndarray:
+        """从源节点出发的BFS步数（端点只作为终点，不经过）"""
+        self.stats['bfs_runs'] += 1
+        adjacency = self.neighbors.tolist()
+        flat = self.grid.ravel()
+        dist = [UNREACHABLE] * len(adjacency)
+        dist[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            if u != source and not is_roadlike(flat[u]):
+                continue
+            step = dist[u] + 1
+            for v in adjacency[u]:
+                if v >= 0 and dist[v] == UNREACHABLE:
+                    dist[v] = step
+                    queue.append(v)
+        return np.array(dist, dtype=np.int32)
+    
+    def _cached_bfs(self, node: int) -> Optional[np.ndarray]:
+        entry = self._bfs_cache.get(node)
+        if entry is not None and entry[0] == self._component_key(node):
+            return entry[1]
+        return None
+    
+    def distances_from(self, tile: Tile) -> np.ndarray:
+        """
+        从一个格子出发到所有格子的道路步数（带缓存）
+        
+        Returns:
+            (rows, cols) 的int32数组，不可达为-1
+        """
+        self.stats['queries'] += 1
+        node = self.node(tile)
+        dist = self._cached_bfs(node)
+        if dist is None:
+            dist = self._bfs(node)
+            self._bfs_cache[node] = (self._component_key(node), dist)
+        else:
+            self.stats['cache_hits'] += 1
+        return dist.reshape(self.rows, self.cols)
+    
+    def _astar(self, source: int, target: int, want_path: bool = False):
+        """A*搜索（曼哈顿距离启发），返回 (步数, 路径节点列表或None)"""
+        self.stats['astar_runs'] += 1
+        flat = self.grid.ravel()
+        tr, tc = divmod(target, self.cols)
+        best = {source: 0}
+        came_from = {source: -1}
+        heap = [(0, 0, source)]
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u == target:
+                path = None
+                if want_path:
+                    path = []
+                    while u >= 0:
+                        path.append(u)
+                        u = came_from[u]
+                    path.reverse()
+                return g, path
+            if g > best[u] or (u != source and not is_roadlike(flat[u])):
+                continue
+            for v in self.neighbors[u].tolist():
+                if v < 0 or best.get(v, g + 2) <= g + 1:
+                    continue
+                best[v] = g + 1
+                came_from[v] = u
+                vr, vc = divmod(v, self.cols)
+                heapq.heappush(heap, (g + 1 + abs(vr - tr) + abs(vc - tc), g + 1, v))
+        return UNREACHABLE, None
+    
+    def distance(self, a: Tile, b: Tile) -> int:
+        """
+        两个格子之间的道路步数
+        
+        先用并查集排除不连通的情况，再查BFS缓存（无向图，两端任一有缓存即可），
+        最后用A*计算并按连通分量戳记缓存
+        
+        Returns:
+            步数，不可达为-1
+        """
+        if not self.connected(a, b):
+            return UNREACHABLE
+        na, nb = self.node(a), self.node(b)
+        if na == nb:
+            return 0
+        for source, target in ((na, nb), (nb, na)):
+            dist = self._cached_bfs(source)
+            if dist is not None:
+                self.stats['cache_hits'] += 1
+                return int(dist[target])
+        key = (min(na, nb), max(na, nb))
+        component = self._component_key(na)
+        entry = self._pair_cache.get(key)
+        if entry is not None and entry[0] == component:
+            self.stats['cache_hits'] += 1
+            return entry[1]
+        steps, _ = self._astar(na, nb)
+        self._pair_cache[key] = (component, steps)
+        return steps
+    
+    def path(self, a: Tile, b: Tile) -> Optional[List[Tile]]:
+        """两个格子之间的最短道路路径（含两端），不可达返回None"""
+        if not self.connected(a, b):
+            return None
+        _, nodes = self._astar(self.node(a), self.node(b), want_path=True)
+        return [self.tile(n) for n in nodes] if nodes else None
+    
+    def _cached_by_version(self, key: tuple, compute):
+        """按网络版本缓存的整体查询"""
+        entry = self._version_cache.get(key)
+        if entry is not None and entry[0] == self.version:
+            self.stats['cache_hits'] += 1
+            return entry[1]
+        value = compute()
+        self._version_cache[key] = (self.version, value)
+        return value
+    
+    def unreachable_houses(self) -> List[Tile]:
+        """无法通过道路到达同色目的地的房屋格子"""
+        self.stats['queries'] += 1
+        return self._cached_by_version(('unreachable',), self._compute_unreachable)
+    
+    def _compute_unreachable(self) -> List[Tile]:
+        flat = self.grid.ravel()
+        served: Dict[int, set] = {}
+        for node in np.flatnonzero(is_destination(flat)).tolist():
+            served.setdefault(int(flat[node]) - DESTINATION, set()).update(self._adjacent_roots(node))
+        unreachable = []
+        for node in np.flatnonzero(is_house(flat)).tolist():
+            color = int(flat[node]) - HOUSE
+            if served.get(color, set()).isdisjoint(self._adjacent_roots(node)):
+                unreachable.append(self.tile(node))
+        return unreachable
+    
+    def extension_cost(self, house: Tile) -> Optional[dict]:
+        """
+        把房屋连接到同色目的地最少需要新修的道路
+        
+        0-1 BFS：经过已有道路不计费，经过空地每格计1，水面、障碍和其他建筑不可通过
+        （跨水/穿山需要桥或隧道，不在此估算）
+        
+        Returns:
+            {'cost': 新修格子数, 'tiles': 新修格子列表}，无法连接时返回None
+        """
+        self.stats['queries'] += 1
+        return self._cached_by_version(('extension', house), lambda: self._compute_extension(house))
+    
+    def _compute_extension(self, house: Tile) -> Optional[dict]:
+        flat = self.grid.ravel()
+        source = self.node(house)
+        if not is_house(flat[source]):
+            return None
+        target_cid = int(flat[source]) - HOUSE + DESTINATION
+        cost = {source: 0}
+        came_from = {source: -1}
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            if flat[u] == target_cid:
+                total = cost[u]
+                tiles = []
+                while u >= 0:
+                    if flat[u] == TERRAIN:
+                        tiles.append(self.tile(u))
+                    u = came_from[u]
+                tiles.reverse()
+                return {'cost': total, 'tiles': tiles}
+            if u != source and not (flat[u] == TERRAIN or is_roadlike(flat[u])):
+                continue
+            r, c = divmod(u, self.cols)
+            for dr, dc in DIRECTIONS:
+                nr, nc = r + dr, c + dc
+                if not (0 <= nr < self.rows and 0 <= nc < self.cols):
+                    continue
+                v = nr * self.cols + nc
+                cid = flat[v]
+                if cid == TERRAIN:
+                    step = 1
+                elif is_roadlike(cid) or cid == target_cid:
+                    step = 0
+                else:
+                    continue
+                new_cost = cost[u] + step
+                if new_cost < cost.get(v, new_cost + 1):
+                    cost[v] = new_cost
+                    came_from[v] = u
+                    if step:
+                        queue.append(v)
+                    else:
+                        queue.appendleft(v)
+        return None
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        queries = self.stats['queries']
+        hit_rate = self.stats['cache_hits'] / queries * 100 if queries else 0.0
+        return {
+            '查询次数': f"{queries}（缓存命中率 {hit_rate:.1f}%）",
+            '搜索次数': f"BFS {self.stats['bfs_runs']}，A* {self.stats['astar_runs']}",
+            '增量更新': f"{self.stats['tile_updates']} 个格子，重建 {self.stats['component_rebuilds']} 个分量"
+        }
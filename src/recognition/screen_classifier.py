@@ -0,0 +1,241 @@
+"""
+游戏界面分类器
+用降采样颜色直方图和少量区域指纹识别当前界面（主菜单、地图选择、游戏中、暂停、
+升级选择、游戏结束），分类结果按帧的感知哈希缓存；稳定游玩时几乎每帧都命中缓存
+"""
+
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from ..core.frame import Frame
+
+
+# 界面名称
+MAIN_MENU = 'main_menu'
+MAP_SELECT = 'map_select'
+IN_GAME = 'in_game'
+PAUSED = 'paused'
+UPGRADE_CHOICE = 'upgrade_choice'
+GAME_OVER = 'game_over'
+UNKNOWN = 'unknown'
+
+SCREENS = (MAIN_MENU, MAP_SELECT, IN_GAME, PAUSED, UPGRADE_CHOICE, GAME_OVER)
+
+# 区域指纹的位置（相对窗口的比例 x, y, w, h）：顶部HUD、中央标题/对话框、底部按钮/卡片、右下角时钟
+DEFAULT_ROIS = (
+    (0.0, 0.0, 1.0, 0.12),
+    (0.25, 0.25, 0.5, 0.5),
+    (0.15, 0.7, 0.7, 0.25),
+    (0.85, 0.8, 0.15, 0.2),
+)
+
+# 缩略图大小：直方图和感知哈希都从缩略图计算，避免处理整幅截图
+THUMB_SIZE = (64, 36)
+ROI_SIZE = (8, 8)
+HIST_BINS = (8, 4, 4)
+HASH_TOLERANCE = 2
+
+
+def thumbnail(frame: np.ndarray, size: Tuple[int, int] = THUMB_SIZE) -> np.ndarray:
+    """先按步长抽样再缩放，得到小尺寸BGR缩略图（比直接缩放整幅截图快一个数量级）"""
+    h, w = frame.shape[:2]
+    step_y = max(1, h // size[1])
+    step_x = max(1, w // size[0])
+    sampled = frame[::step_y, ::step_x]
+    if sampled.ndim == 3 and sampled.shape[2] == 4:
+        sampled = sampled[:, :, :3]
+    return cv2.resize(sampled, size, interpolation=cv2.INTER_AREA)
+
+
+def perceptual_hash(thumb: np.ndarray) -> Tuple[int, int]:
+    """
+    感知哈希：9x8灰度图的差异哈希（dHash）加上量化的平均颜色
+    
+    纯色或大面积平坦的画面dHash都接近0，附加平均颜色避免不同底色的界面互相冲突
+    """
+    small = cv2.resize(thumb, (9, 8), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    # 相邻像素差异超过容差才置位，平坦区域的细小变化（如移动的车辆）不会翻转哈希位
+    bits = (gray[:, 1:].astype(np.int16) - gray[:, :-1] > HASH_TOLERANCE).ravel()
+    dhash = int(np.packbits(bits).view('>u8')[0])
+    mean = small.reshape(-1, small.shape[-1] if small.ndim == 3 else 1).mean(axis=0).astype(np.int32) >> 4
+    color = 0
+    for channel in mean:
+        color = (color << 4) | int(channel)
+    return dhash, color
+
+
+class ScreenClassifier:
+    """游戏界面分类器
+    
+    每个界面由若干参考截图的特征表示（add_reference 添加，save_profiles/load_profiles 持久化），
+    分类时取与所有参考特征距离最小的界面
+    """
+    
+    def __init__(self, profile_path: Optional[str] = None, cache_size: int = 256,
+                 max_distance: Optional[float] = None, rois: Sequence[Tuple[float, float, float, float]] = DEFAULT_ROIS,
+                 hist_weight: float = 0.5):
+        """
+        初始化分类器
+        
+        Args:
+            profile_path: 参考特征文件（.npz），None则使用 recognition.screen_profiles
+            cache_size: 感知哈希缓存容量
+            max_distance: 超过该距离判为unknown，None则使用 recognition.screen_max_distance
+            rois: 区域指纹位置（相对比例）
+            hist_weight: 直方图距离在总距离中的权重，其余为区域指纹距离
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.rois = tuple(rois)
+        self.hist_weight = hist_weight
+        self.max_distance = max_distance if max_distance is not None else \
+            self.config.get('recognition.screen_max_distance', 0.35)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[int, int], dict]" = OrderedDict()
+        self._labels: List[str] = []
+        self._hists = np.zeros((0, int(np.prod(HIST_BINS))), dtype=np.float32)
+        self._fingerprints = np.zeros((0, len(self.rois) * ROI_SIZE[0] * ROI_SIZE[1]), dtype=np.float32)
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'last_classify_us': 0.0
+        }
+        
+        if profile_path is None:
+            profile_path = self.config.get('recognition.screen_profiles', 'templates/screens.npz')
+        self.profile_path = profile_path
+        if profile_path and Path(profile_path).is_file():
+            self.load_profiles(profile_path)
+    
+    @property
+    def ready(self) -> bool:
+        """是否已有参考特征"""
+        return len(self._labels) > 0
+    
+    @property
+    def hit_rate(self) -> float:
+        """缓存命中率"""
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+    
+    def features(self, frame: np.ndarray, thumb: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        计算一帧的特征
+        
+        Args:
+            frame: 窗口截图（BGR）
+            thumb: 已计算的缩略图，None则重新计算
+        
+        Returns:
+            (归一化HSV直方图, 区域指纹向量)
+        """
+        if isinstance(frame, Frame):
+            frame = frame.image
+        if thumb is None:
+            thumb = thumbnail(frame)
+        hsv = cv2.cvtColor(thumb, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1, 2], None, list(HIST_BINS), [0, 180, 0, 256, 0, 256]).ravel()
+        hist /= max(float(hist.sum()), 1.0)
+        
+        h, w = frame.shape[:2]
+        parts = []
+        for rx, ry, rw, rh in self.rois:
+            x, y = int(rx * w), int(ry * h)
+            roi = frame[y:y + max(1, int(rh * h)), x:x + max(1, int(rw * w))]
+            parts.append(cv2.cvtColor(thumbnail(roi, ROI_SIZE), cv2.COLOR_BGR2GRAY).ravel())
+        fingerprint = np.concatenate(parts).astype(np.float32) / 255.0
+        return hist.astype(np.float32), fingerprint
+    
+    def add_reference(self, screen: str, frame: np.ndarray):
+        """
+        添加一张已知界面的参考截图
+        
+        Args:
+            screen: 界面名称（SCREENS之一）
+            frame: 该界面的窗口截图
+        """
+        if screen not in SCREENS:
+            raise ValueError(f"未知的界面: {screen}")
+        hist, fingerprint = self.features(frame)
+        self._labels.append(screen)
+        self._hists = np.vstack([self._hists, hist])
+        self._fingerprints = np.vstack([self._fingerprints, fingerprint])
+        self._cache.clear()
+    
+    def save_profiles(self, path: Optional[str] = None):
+        """把参考特征保存为 .npz 文件"""
+        path = Path(path or self.profile_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, labels=np.array(self._labels), hists=self._hists,
+                            fingerprints=self._fingerprints)
+        self.logger.add_info(f"已保存 {len(self._labels)} 个界面参考特征: {path}")
+    
+    def load_profiles(self, path: str):
+        """从 .npz 文件加载参考特征"""
+        data = np.load(path)
+        self._labels = [str(label) for label in data['labels']]
+        self._hists = data['hists'].astype(np.float32)
+        self._fingerprints = data['fingerprints'].astype(np.float32)
+        self._cache.clear()
+        self.logger.add_info(f"已加载 {len(self._labels)} 个界面参考特征: {path}")
+    
+    def _distances(self, hist: np.ndarray, fingerprint: np.ndarray) -> np.ndarray:
+        """与所有参考特征的距离（0~1），一次向量化计算"""
+        # Bhattacharyya距离：1 - sum(sqrt(p * q))
+        hist_dist = 1.0 - np.sqrt(self._hists * hist).sum(axis=1)
+        roi_dist = np.abs(self._fingerprints - fingerprint).mean(axis=1)
+        return self.hist_weight * hist_dist + (1.0 - self.hist_weight) * roi_dist
+    
+    def classify(self, frame: np.ndarray) -> dict:
+        """
+        识别当前界面
+        
+        Args:
+            frame: 窗口截图（BGR数组或帧对象）
+        
+        Returns:
+            {'screen': 界面名称, 'distance': 与最近参考的距离, 'hash': 感知哈希, 'cached': 是否命中缓存}
+        """
+        start = time.perf_counter()
+        # 缩略图和区域指纹都按步长抽样且会去掉alpha通道，帧对象直接使用原始缓冲区
+        if isinstance(frame, Frame):
+            frame = frame.image
+        thumb = thumbnail(frame)
+        key = perceptual_hash(thumb)
+        
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            self.stats['hits'] += 1
+            result = dict(result, cached=True)
+        else:
+            self.stats['misses'] += 1
+            screen, distance = UNKNOWN, 1.0
+            if self.ready:
+                distances = self._distances(*self.features(frame, thumb))
+                best = int(np.argmin(distances))
+                distance = float(distances[best])
+                if distance <= self.max_distance:
+                    screen = self._labels[best]
+            result = {'screen': screen, 'distance': round(distance, 4), 'hash': key, 'cached': False}
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        
+        self.stats['last_classify_us'] = round((time.perf_counter() - start) * 1e6, 1)
+        return result
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        return {
+            '缓存命中率': f"{self.hit_rate * 100:.1f}% ({self.stats['hits']}/{self.stats['hits'] + self.stats['misses']})",
+            '参考特征数': str(len(self._labels))
+        }
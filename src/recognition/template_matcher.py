@@ -0,0 +1,352 @@
+"""
+模板匹配引擎
+模板只加载一次，预处理为灰度图和边缘图并按多个缩放比例缓存；匹配时先在图像金字塔的
+低分辨率层上粗搜索，再只在候选点附近用原分辨率精确匹配，最后做非极大值抑制
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from ..core.frame import Frame
+
+
+Region = Tuple[int, int, int, int]
+
+# 粗搜索层上模板的最小边长（像素），再小的话相关系数不可靠
+MIN_COARSE_SIZE = 8
+
+
+def to_gray(image: np.ndarray) -> np.ndarray:
+    """BGR/BGRA/灰度图统一转为灰度图（帧对象使用其共享的灰度视图）"""
+    if isinstance(image, Frame):
+        return image.gray
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def edge_map(gray: np.ndarray) -> np.ndarray:
+    """计算边缘图（用于填充颜色会变化、但轮廓固定的按钮）"""
+    return cv2.Canny(gray, 50, 150)
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.3) -> List[int]:
+    """
+    贪心非极大值抑制
+    
+    Args:
+        boxes: (N, 4) 的矩形框 (x1, y1, x2, y2)
+        scores: (N,) 的得分
+        iou_threshold: 重叠度超过该值的低分框被抑制
+    
+    Returns:
+        保留的框的下标，按得分从高到低
+    """
+    if len(boxes) == 0:
+        return []
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(scores)[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        w = np.maximum(0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+
+class Template:
+    """预处理后的模板：各缩放比例、各金字塔层的灰度图和边缘图"""
+    
+    def __init__(self, name: str, image: np.ndarray, scales: Sequence[float],
+                 levels: int, use_edges: bool = False, roi: Optional[Region] = None):
+        """
+        Args:
+            name: 模板名称
+            image: 模板图像（BGR或灰度）
+            scales: 需要匹配的缩放比例
+            levels: 金字塔层数（0表示只在原分辨率匹配）
+            use_edges: 是否用边缘图匹配
+            roi: 默认搜索区域 (x, y, w, h)，截图像素坐标
+        """
+        self.name = name
+        self.use_edges = use_edges
+        self.roi = roi
+        gray = to_gray(image)
+        self.size = (gray.shape[1], gray.shape[0])
+        # (scale, level) -> 预处理后的模板
+        self.variants: Dict[Tuple[float, int], np.ndarray] = {}
+        for scale in scales:
+            for level in range(levels + 1):
+                factor = scale / (2 ** level)
+                w = int(round(gray.shape[1] * factor))
+                h = int(round(gray.shape[0] * factor))
+                if level > 0 and min(w, h) < MIN_COARSE_SIZE:
+                    break
+                if w < 2 or h < 2:
+                    break
+                interpolation = cv2.INTER_AREA if factor < 1 else cv2.INTER_LINEAR
+                resized = cv2.resize(gray, (w, h), interpolation=interpolation)
+                self.variants[(scale, level)] = edge_map(resized) if use_edges else resized
+    
+    def coarsest_level(self, scale: float) -> int:
+        """该缩放比例可用的最低分辨率层"""
+        levels = [level for s, level in self.variants if s == scale]
+        return max(levels) if levels else 0
+
+
+class _FramePyramid:
+    """一次匹配调用内共享的截图金字塔（灰度图/边缘图按需计算）
+    
+    搜索整幅帧对象时直接使用帧的灰度金字塔视图，与其他使用者共享
+    """
+    
+    def __init__(self, gray: np.ndarray, frame: Optional[Frame] = None):
+        self._gray = [gray]
+        self._frame = frame
+        self._edges = {}
+    
+    def gray(self, level: int) -> np.ndarray:
+        if self._frame is not None:
+            return self._frame.gray_level(level)
+        while len(self._gray) <= level:
+            self._gray.append(cv2.pyrDown(self._gray[-1]))
+        return self._gray[level]
+    
+    def get(self, level: int, use_edges: bool) -> np.ndarray:
+        if not use_edges:
+            return self.gray(level)
+        edges = self._edges.get(level)
+        if edges is None:
+            edges = edge_map(self.gray(level))
+            self._edges[level] = edges
+        return edges
+
+
+class TemplateMatcher:
+    """模板匹配引擎"""
+    
+    def __init__(self, template_dir: Optional[str] = None, threshold: Optional[float] = None,
+                 scales: Optional[Sequence[float]] = None, pyramid_levels: Optional[int] = None,
+                 max_candidates: int = 8, nms_iou: float = 0.3):
+        """
+        初始化匹配引擎
+        
+        Args:
+            template_dir: 模板目录，其中的png文件按文件名注册为模板；None则使用 recognition.template_dir
+            threshold: 匹配阈值，None则使用 recognition.template_matching_threshold
+            scales: 匹配的缩放比例，None则使用 recognition.template_scales
+            pyramid_levels: 粗搜索使用的金字塔层数，None则使用 recognition.pyramid_levels
+            max_candidates: 每个模板每个比例在粗搜索层保留的候选点数
+            nms_iou: 非极大值抑制的重叠度阈值
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.threshold = threshold if threshold is not None else \
+            self.config.get('recognition.template_matching_threshold', 0.7)
+        self.scales = tuple(scales if scales is not None else
+                            self.config.get('recognition.template_scales', [0.9, 1.0, 1.1]))
+        self.pyramid_levels = pyramid_levels if pyramid_levels is not None else \
+            self.config.get('recognition.pyramid_levels', 3)
+        self.max_candidates = max_candidates
+        self.nms_iou = nms_iou
+        self.templates: Dict[str, Template] = {}
+        self.stats = {
+            'matches': 0,
+            'coarse_searches': 0,
+            'full_searches': 0,
+            'refinements': 0,
+            'last_match_ms': 0.0
+        }
+        
+        if template_dir is None:
+            template_dir = self.config.get('recognition.template_dir', 'templates')
+        if template_dir and Path(template_dir).is_dir():
+            self.load_directory(template_dir)
+    
+    def load_directory(self, template_dir: str) -> int:
+        """
+        加载目录中的所有png模板（文件名即模板名）
+        
+        Returns:
+            加载的模板数量
+        """
+        count = 0
+        for path in sorted(Path(template_dir).glob('*.png')):
+            image = cv2.imread(str(path), cv2.IMREAD_UNCHANGED)
+            if image is None:
+                self.logger.add_warning(f"无法读取模板: {path}")
+                continue
+            self.add_template(path.stem, image)
+            count += 1
+        if count:
+            self.logger.add_info(f"已加载 {count} 个模板: {template_dir}")
+        return count
+    
+    def add_template(self, name: str, image: np.ndarray, use_edges: bool = False,
+                     roi: Optional[Region] = None) -> Template:
+        """
+        注册模板并预处理所有缩放比例
+        
+        Args:
+            name: 模板名称
+            image: 模板图像
+            use_edges: 是否按边缘图匹配
+            roi: 默认搜索区域 (x, y, w, h)
+        
+        Returns:
+            预处理后的模板
+        """
+        template = Template(name, image, self.scales, self.pyramid_levels, use_edges, roi)
+        self.templates[name] = template
+        return template
+    
+    @staticmethod
+    def _crop(gray: np.ndarray, roi: Optional[Region]) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """裁剪搜索区域，返回子图和偏移"""
+        if roi is None:
+            return gray, (0, 0)
+        x, y, w, h = roi
+        x, y = max(0, int(x)), max(0, int(y))
+        return gray[y:y + int(h), x:x + int(w)], (x, y)
+    
+    def _peaks(self, result: np.ndarray, threshold: float, limit: int) -> np.ndarray:
+        """取相关系数图中超过阈值的局部最大值，返回 (K, 2) 的 (x, y)"""
+        local_max = cv2.dilate(result, np.ones((3, 3), np.uint8))
+        ys, xs = np.nonzero((result >= threshold) & (result >= local_max))
+        if len(xs) > limit:
+            top = np.argpartition(result[ys, xs], -limit)[-limit:]
+            xs, ys = xs[top], ys[top]
+        return np.stack([xs, ys], axis=1)
+    
+    def _match_template(self, pyramid: _FramePyramid, template: Template, scale: float,
+                        threshold: float) -> List[Tuple[int, int, int, int, float]]:
+        """对单个模板、单个比例做粗到精匹配，返回 (x, y, w, h, score) 列表（子图坐标）"""
+        full = template.variants.get((scale, 0))
+        if full is None:
+            return []
+        th, tw = full.shape
+        image = pyramid.get(0, template.use_edges)
+        if image.shape[0] < th or image.shape[1] < tw:
+            return []
+        
+        level = template.coarsest_level(scale)
+        hits = []
+        if level == 0:
+            # 模板太小无法在低分辨率层可靠匹配，直接在原分辨率搜索
+            self.stats['full_searches'] += 1
+            result = cv2.matchTemplate(image, full, cv2.TM_CCOEFF_NORMED)
+            for x, y in self._peaks(result, threshold, self.max_candidates * 4):
+                hits.append((int(x), int(y), tw, th, float(result[y, x])))
+            return hits
+        
+        coarse_template = template.variants[(scale, level)]
+        coarse_image = pyramid.get(level, template.use_edges)
+        if coarse_image.shape[0] < coarse_template.shape[0] or coarse_image.shape[1] < coarse_template.shape[1]:
+            return []
+        self.stats['coarse_searches'] += 1
+        coarse = cv2.matchTemplate(coarse_image, coarse_template, cv2.TM_CCOEFF_NORMED)
+        # 低分辨率下相关系数偏低，放宽粗搜索阈值
+        candidates = self._peaks(coarse, threshold - 0.15, self.max_candidates)
+        
+        factor = 2 ** level
+        margin = factor + 2
+        for cx, cy in candidates:
+            x0 = max(0, int(cx) * factor - margin)
+            y0 = max(0, int(cy) * factor - margin)
+            x1 = min(image.shape[1], int(cx) * factor + margin + tw)
+            y1 = min(image.shape[0], int(cy) * factor + margin + th)
+            window = image[y0:y1, x0:x1]
+            if window.shape[0] < th or window.shape[1] < tw:
+                continue
+            self.stats['refinements'] += 1
+            result = cv2.matchTemplate(window, full, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (bx, by) = cv2.minMaxLoc(result)
+            if score >= threshold:
+                hits.append((x0 + bx, y0 + by, tw, th, float(score)))
+        return hits
+    
+    def match(self, frame: np.ndarray, names: Optional[Sequence[str]] = None,
+              roi: Optional[Region] = None, threshold: Optional[float] = None) -> List[dict]:
+        """
+        在截图中查找模板
+        
+        Args:
+            frame: 截图（BGR或灰度）
+            names: 只匹配这些模板，None表示全部
+            roi: 搜索区域 (x, y, w, h)，None则使用各模板的默认区域或整幅截图
+            threshold: 匹配阈值，None则使用默认阈值
+        
+        Returns:
+            匹配结果列表，按得分从高到低；每项为
+            {'name', 'x', 'y', 'width', 'height', 'center', 'score', 'scale'}
+        """
+        start = time.perf_counter()
+        if threshold is None:
+            threshold = self.threshold
+        gray = to_gray(frame)
+        names = list(names) if names is not None else list(self.templates)
+        
+        # 同一搜索区域的金字塔在模板之间共享
+        pyramids = {}
+        results = []
+        for name in names:
+            template = self.templates.get(name)
+            if template is None:
+                self.logger.add_warning(f"未注册的模板: {name}")
+                continue
+            search_roi = roi if roi is not None else template.roi
+            entry = pyramids.get(search_roi)
+            if entry is None:
+                sub, offset = self._crop(gray, search_roi)
+                shared = frame if isinstance(frame, Frame) and search_roi is None else None
+                entry = (_FramePyramid(sub, shared), offset)
+                pyramids[search_roi] = entry
+            pyramid, (ox, oy) = entry
+            
+            raw = []
+            for scale in self.scales:
+                raw.extend((x, y, w, h, score, scale)
+                           for x, y, w, h, score in self._match_template(pyramid, template, scale, threshold))
+            if not raw:
+                continue
+            
+            data = np.array([r[:5] for r in raw], dtype=np.float64)
+            boxes = np.stack([data[:, 0], data[:, 1], data[:, 0] + data[:, 2], data[:, 1] + data[:, 3]], axis=1)
+            for i in non_max_suppression(boxes, data[:, 4], self.nms_iou):
+                x, y, w, h, score, scale = raw[i]
+                x, y = int(x) + ox, int(y) + oy
+                results.append({
+                    'name': name,
+                    'x': x,
+                    'y': y,
+                    'width': int(w),
+                    'height': int(h),
+                    'center': (x + int(w) // 2, y + int(h) // 2),
+                    'score': round(score, 4),
+                    'scale': scale
+                })
+        
+        results.sort(key=lambda hit: hit['score'], reverse=True)
+        self.stats['matches'] += 1
+        self.stats['last_match_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        return results
+    
+    def find(self, frame: np.ndarray, name: str, roi: Optional[Region] = None,
+             threshold: Optional[float] = None) -> Optional[dict]:
+        """查找单个模板的最佳匹配，未找到返回None"""
+        hits = self.match(frame, [name], roi, threshold)
+        return hits[0] if hits else None
@@ -0,0 +1,254 @@
+"""
+界面布局索引
+每个界面登记少量锚点（模板图像）以及按钮、HUD字段相对锚点的位置。锚点在每个窗口几何下
+只匹配一次，之后定位任何元素都只是一次字典查找和一次乘加，不再为每个按钮搜索整幅截图；
+窗口大小、缩放或界面语言变化时只需更新锚点模板或重新锚定
+"""
+
+import copy
+import json
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from ..core.frame import as_bgr
+from .screen_classifier import MAIN_MENU
+
+# 默认布局（参考分辨率坐标）：主菜单的游玩按钮。
+# 锚点模板 main_menu_play.png 放入 recognition.template_dir 后按匹配位置定位，
+# 没有模板或匹配失败时使用锚点的名义位置（原先人工确认的坐标）按窗口比例换算
+DEFAULT_LAYOUT = {
+    MAIN_MENU: {
+        'anchors': {
+            'play': {'templates': ['main_menu_play'], 'at': [564, 497]}
+        },
+        'elements': {
+            'play_button': {'anchor': 'play', 'offset': [0, 0], 'size': [120, 48]}
+        }
+    }
+}
+
+
+class UILayout:
+    """界面布局索引
+    
+    布局格式（JSON，参考分辨率坐标）::
+        
+        {"界面名": {
+            "anchors": {"锚点名": {"templates": [模板名, ...], "at": [x, y], "roi": [x, y, w, h]}},
+            "elements": {"元素名": {"anchor": 锚点名, "offset": [dx, dy], "size": [w, h]}}
+        }}
+    
+    templates 可以列出多个候选（如不同语言的标题），取得分最高者；at 为锚点中心的名义位置；
+    offset 为元素中心相对锚点中心的偏移，按锚点匹配到的缩放比例伸缩。没有 anchor 的元素用 at 指定固定位置
+    """
+    
+    def __init__(self, layout_path: Optional[str] = None, matcher=None,
+                 generation_source: Optional[Callable[[], int]] = None,
+                 reference_size: Optional[Sequence[int]] = None):
+        """
+        初始化布局索引
+        
+        Args:
+            layout_path: 布局文件，None则使用 recognition.ui_layout；文件不存在时使用默认布局
+            matcher: 模板匹配引擎（TemplateMatcher），None则在首次锚定时创建
+            generation_source: 返回窗口几何代数的函数，几何变化后自动重新锚定
+            reference_size: 参考布局分辨率，None则使用 game.expected_resolution
+        """
+        self.config = get_config()
+        self.logger = get_logger()
+        self.reference_size = tuple(reference_size or self.config.get('game.expected_resolution', [1920, 1080]))
+        self.layout_path = Path(layout_path or self.config.get('recognition.ui_layout', 'templates/layout.json'))
+        self._matcher = matcher
+        if generation_source is not None:
+            from ..core.window_watcher import GenerationCache
+            self._anchors = GenerationCache(generation_source)
+        else:
+            self._anchors = {}
+        self.stats = {
+            'lookups': 0,
+            'anchorings': 0,
+            'fallbacks': 0
+        }
+        
+        if self.layout_path.is_file():
+            with open(self.layout_path, 'r', encoding='utf-8') as f:
+                self.layout = json.load(f)
+        else:
+            self.layout = copy.deepcopy(DEFAULT_LAYOUT)
+    
+    @property
+    def matcher(self):
+        """模板匹配引擎（延迟创建）"""
+        if self._matcher is None:
+            from .template_matcher import TemplateMatcher
+            self._matcher = TemplateMatcher()
+        return self._matcher
+    
+    def screens(self) -> List[str]:
+        """已登记布局的界面"""
+        return list(self.layout)
+    
+    def elements(self, screen: str) -> List[str]:
+        """界面上已登记的元素"""
+        return list(self.layout.get(screen, {}).get('elements', {}))
+    
+    def save(self, path: Optional[str] = None) -> Path:
+        """保存布局文件"""
+        path = Path(path or self.layout_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.layout, f, ensure_ascii=False, indent=2)
+        return path
+    
+    def invalidate(self, screen: Optional[str] = None):
+        """丢弃已锚定的结果（界面内容变化时强制重新锚定）"""
+        if screen is None:
+            self._anchors.clear()
+        else:
+            self._anchors.pop(screen, None)
+    
+    def _normalize(self, frame: np.ndarray) -> Tuple[np.ndarray, float, float]:
+        """把截图缩放到参考分辨率，返回 (图像, x比例, y比例)；比例为截图像素/参考像素"""
+        height, width = frame.shape[:2]
+        sx = width / self.reference_size[0]
+        sy = height / self.reference_size[1]
+        if abs(sx - 1.0) < 1e-3 and abs(sy - 1.0) < 1e-3:
+            return frame, 1.0, 1.0
+        resized = cv2.resize(frame, (int(self.reference_size[0]), int(self.reference_size[1])),
+                             interpolation=cv2.INTER_AREA)
+        return resized, sx, sy
+    
+    def anchor(self, screen: str, frame: np.ndarray, force: bool = False) -> dict:
+        """
+        锚定界面：匹配该界面的所有锚点（同一几何和截图尺寸下只执行一次）
+        
+        Args:
+            screen: 界面名称
+            frame: 该界面的截图
+            force: 是否忽略缓存重新匹配
+        
+        Returns:
+            {'shape', 'scale': (sx, sy), 'anchors': {锚点名: {'center': 参考坐标, 'scale', 'matched'}}}
+        
+        Raises:
+            KeyError: 界面没有登记布局
+        """
+        frame = as_bgr(frame)
+        entry = self._anchors.get(screen)
+        if entry is not None and not force and entry['shape'] == frame.shape[:2]:
+            return entry
+        spec = self.layout[screen]
+        normalized, sx, sy = self._normalize(frame)
+        anchors = {}
+        for name, anchor in spec.get('anchors', {}).items():
+            best = None
+            roi = tuple(anchor['roi']) if anchor.get('roi') else None
+            for template in anchor.get('templates', []):
+                if template not in self.matcher.templates:
+                    continue
+                hit = self.matcher.find(normalized, template, roi=roi)
+                if hit is not None and (best is None or hit['score'] > best['score']):
+                    best = hit
+            if best is not None:
+                anchors[name] = {'center': best['center'], 'scale': best['scale'], 'matched': True}
+            elif anchor.get('at') is not None:
+                self.stats['fallbacks'] += 1
+                self.logger.add_warning(f"界面 {screen} 的锚点 {name} 未匹配，使用名义位置")
+                anchors[name] = {'center': tuple(anchor['at']), 'scale': 1.0, 'matched': False}
+            else:
+                self.logger.add_warning(f"界面 {screen} 的锚点 {name} 未匹配")
+        entry = {'shape': frame.shape[:2], 'scale': (sx, sy), 'anchors': anchors}
+        self._anchors[screen] = entry
+        self.stats['anchorings'] += 1
+        return entry
+    
+    def locate(self, screen: str, element: str, frame: Optional[np.ndarray] = None) -> Optional[dict]:
+        """
+        定位界面元素
+        
+        已锚定时为O(1)查找；提供截图且尚未锚定（或几何、截图尺寸变化）时先锚定
+        
+        Args:
+            screen: 界面名称
+            element: 元素名称
+            frame: 当前截图，None则只使用已有的锚定结果
+        
+        Returns:
+            {'name', 'center': 截图像素坐标, 'rect': (x, y, w, h) 或None, 'anchored': 锚点是否实际匹配}；
+            无法定位时返回None
+        """
+        self.stats['lookups'] += 1
+        spec = self.layout.get(screen, {}).get('elements', {}).get(element)
+        if spec is None:
+            self.logger.add_warning(f"界面 {screen} 没有登记元素 {element}")
+            return None
+        entry = self._anchors.get(screen)
+        if frame is not None and (entry is None or entry['shape'] != frame.shape[:2]):
+            entry = self.anchor(screen, frame)
+        if entry is None:
+            return None
+        
+        sx, sy = entry['scale']
+        anchor_name = spec.get('anchor')
+        if anchor_name is None:
+            (x, y), scale, anchored = spec['at'], 1.0, True
+        else:
+            anchor = entry['anchors'].get(anchor_name)
+            if anchor is None:
+                return None
+            scale = anchor['scale']
+            dx, dy = spec.get('offset', (0, 0))
+            x = anchor['center'][0] + dx * scale
+            y = anchor['center'][1] + dy * scale
+            anchored = anchor['matched']
+        
+        center = (int(round(x * sx)), int(round(y * sy)))
+        rect = None
+        if spec.get('size'):
+            w, h = spec['size'][0] * scale * sx, spec['size'][1] * scale * sy
+            rect = (int(round(center[0] - w / 2)), int(round(center[1] - h / 2)), int(round(w)), int(round(h)))
+        return {'name': element, 'center': center, 'rect': rect, 'anchored': anchored}
+    
+    def record_element(self, screen: str, element: str, frame: np.ndarray, center: Sequence[float],
+                       size: Optional[Sequence[float]] = None, anchor: Optional[str] = None):
+        """
+        从截图登记元素位置（换算为相对锚点的偏移），用于编写布局
+        
+        Args:
+            screen: 界面名称
+            element: 元素名称
+            frame: 该界面的截图
+            center: 元素中心的截图像素坐标
+            size: 元素大小（截图像素）
+            anchor: 相对的锚点，None则使用第一个已匹配的锚点
+        """
+        entry = self.anchor(screen, frame)
+        sx, sy = entry['scale']
+        anchors = entry['anchors']
+        if anchor is None:
+            anchor = next((name for name, a in anchors.items() if a['matched']), next(iter(anchors), None))
+        spec = {}
+        if anchor is None:
+            spec['at'] = [round(center[0] / sx, 1), round(center[1] / sy, 1)]
+            scale = 1.0
+        else:
+            a = anchors[anchor]
+            scale = a['scale']
+            spec['anchor'] = anchor
+            spec['offset'] = [round((center[0] / sx - a['center'][0]) / scale, 1),
+                              round((center[1] / sy - a['center'][1]) / scale, 1)]
+        if size is not None:
+            spec['size'] = [round(size[0] / sx / scale, 1), round(size[1] / sy / scale, 1)]
+        self.layout.setdefault(screen, {}).setdefault('elements', {})[element] = spec
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        return {
+            '元素定位次数': str(self.stats['lookups']),
+            '锚定次数': f"{self.stats['anchorings']}（使用名义位置 {self.stats['fallbacks']} 次）"
+        }
@@ -0,0 +1,37 @@
+"""
+远程通信模块
+包含与远程决策服务器通信的客户端和决策载荷编码
+
+子模块在首次访问时才导入，避免只需读取日志或统计的工具也要加载aiohttp、msgpack等依赖
+"""
+
+import importlib
+
+_LAZY_EXPORTS = {
+    'DecisionClient': '.decision_client',
+    'DecisionError': '.decision_client',
+    'DecisionStream': '.decision_stream',
+    'PayloadEncoder': '.payload',
+    'PayloadDecoder': '.payload',
+}
+
+__all__ = [
+    'DecisionClient',
+    'DecisionError',
+    'DecisionStream',
+    'PayloadEncoder',
+    'PayloadDecoder'
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
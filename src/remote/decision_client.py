@@ -0,0 +1,265 @@
+"""
+远程决策客户端
+基于asyncio的HTTP客户端：整个会话复用一个带keep-alive连接池的 aiohttp.ClientSession，
+每回合的决策请求不再重新建立TCP/TLS连接；按配置的超时和重试次数请求，重试之间使用带随机抖动的
+指数退避，并限制同时在途的请求数，记录请求/响应大小和往返延迟
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Union
+
+import aiohttp
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from ..utils.latency import latency_distribution
+from .payload import PAYLOAD_CONTENT_TYPE
+
+# 可以重试的HTTP状态码（服务器过载或暂时不可用）
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+JSON_CONTENT_TYPE = 'application/json'
+
+
+class DecisionError(Exception):
+    """决策请求失败（重试次数用尽或服务器返回不可重试的错误）"""
+
+
+class DecisionClient:
+    """远程决策客户端
+    
+    用法::
+        
+        async with DecisionClient() as client:
+            decision = await client.decide({'screen': 'game', 'grid': ...})
+    
+    decide 发送字典时编码为JSON；也可以直接发送已编码的字节（配合 content_type）。
+    同一客户端只能在创建会话的事件循环中使用
+    """
+    
+    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None,
+                 retry_times: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 keepalive_timeout: Optional[float] = None, max_samples: int = 500,
+                 log_requests: bool = True, register: bool = True):
+        """
+        初始化客户端（会话在第一次请求时创建）
+        
+        Args:
+            url: 决策接口地址，None则使用 remote_server.url
+            timeout: 单次请求超时（秒），None则使用 remote_server.timeout
+            retry_times: 失败后的重试次数，None则使用 remote_server.retry_times
+            max_in_flight: 同时在途的最大请求数（也是连接池大小），None则使用 remote_server.max_in_flight
+            backoff_base: 第一次重试的退避上限（秒），之后每次翻倍
+            backoff_max: 退避时间的最大值（秒）
+            keepalive_timeout: 空闲连接保留时间（秒）
+            max_samples: 保留的最近延迟样本数
+            log_requests: 是否把每次通信写入日志
+            register: 是否把统计注册到日志系统的会话统计
+        """
+        config = get_config()
+        self.logger = get_logger()
+        self.url = url or config.get('remote_server.url', 'http://localhost:8000/api/decision')
+        self.timeout = float(timeout if timeout is not None else config.get('remote_server.timeout', 5))
+        self.retry_times = int(retry_times if retry_times is not None else config.get('remote_server.retry_times', 3))
+        self.max_in_flight = int(max_in_flight or config.get('remote_server.max_in_flight', 4))
+        self.backoff_base = float(backoff_base if backoff_base is not None
+                                  else config.get('remote_server.backoff_base', 0.1))
+        self.backoff_max = float(backoff_max if backoff_max is not None
+                                 else config.get('remote_server.backoff_max', 2.0))
+        self.keepalive_timeout = float(keepalive_timeout if keepalive_timeout is not None
+                                       else config.get('remote_server.keepalive_timeout', 30))
+        self.log_requests = log_requests
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._latencies: deque = deque(maxlen=max_samples)
+        self.stats = {
+            'requests': 0,
+            'failures': 0,
+            'attempts': 0,
+            'retries': 0,
+            'connections': 0,
+            'bytes_sent': 0,
+            'bytes_received': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0
+        }
+        if register:
+            self.logger.register_statistics("远程决策", self.statistics)
+    
+    async def _on_connection_created(self, session, context, params):
+        self.stats['connections'] += 1
+    
+    async def start(self) -> aiohttp.ClientSession:
+        """创建连接池会话（已创建时直接返回）"""
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._on_connection_created)
+            connector = aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=self.keepalive_timeout,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[trace],
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        return self._session
+    
+    async def close(self):
+        """关闭会话和连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    def backoff(self, attempt: int) -> float:
+        """第attempt次重试前的等待时间（秒）：0到指数上限之间均匀随机，避免多个客户端同时重试"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    async def _post(self, body: bytes, content_type: str) -> Dict[str, Any]:
+        """发送一次请求，返回 {'status', 'data', 'size'}"""
+        async with self._session.post(self.url, data=body, headers={'Content-Type': content_type}) as response:
+            raw = await response.read()
+            if response.status in RETRY_STATUSES:
+                raise aiohttp.ClientResponseError(response.request_info, response.history,
+                                                  status=response.status, message=response.reason or '')
+            if response.status >= 400:
+                raise DecisionError(f"服务器返回 {response.status}: {raw[:200].decode('utf-8', 'replace')}")
+            if response.content_type == JSON_CONTENT_TYPE:
+                data = json.loads(raw) if raw else {}
+            else:
+                data = raw
+            return {'status': response.status, 'data': data, 'size': len(raw)}
+    
+    async def decide(self, request: Union[dict, bytes], content_type: str = JSON_CONTENT_TYPE,
+                     encode_ms: Optional[float] = None) -> Any:
+        """
+        发送决策请求并等待响应
+        
+        Args:
+            request: 请求内容（字典编码为JSON，字节原样发送）
+            content_type: 发送字节时的内容类型
+            encode_ms: 请求载荷的编码耗时（毫秒），写入通信日志
+        
+        Returns:
+            JSON响应解码后的对象；其他类型的响应返回原始字节
+        
+        Raises:
+            DecisionError: 重试次数用尽或服务器返回不可重试的错误
+        """
+        if isinstance(request, (bytes, bytearray, memoryview)):
+            body = bytes(request)
+        else:
+            body = json.dumps(request, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            content_type = JSON_CONTENT_TYPE
+        await self.start()
+        
+        self.stats['requests'] += 1
+        started = time.perf_counter()
+        result: Optional[Dict[str, Any]] = None
+        error: Optional[BaseException] = None
+        async with self._slots:
+            self.stats['in_flight'] += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+            try:
+                for attempt in range(self.retry_times + 1):
+                    if attempt:
+                        self.stats['retries'] += 1
+                        await asyncio.sleep(self.backoff(attempt - 1))
+                    self.stats['attempts'] += 1
+                    self.stats['bytes_sent'] += len(body)
+                    try:
+                        result = await self._post(body, content_type)
+                        break
+                    except DecisionError as e:
+                        error = e
+                        break
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        error = e
+            finally:
+                self.stats['in_flight'] -= 1
+        
+        latency_ms = (time.perf_counter() - started) * 1000
+        if result is None:
+            self.stats['failures'] += 1
+            message = str(error) or type(error).__name__
+            if self.log_requests:
+                self.logger.add_server_communication({'url': self.url}, {'error': message}, False,
+                                                     request_size=len(body), latency_ms=latency_ms,
+                                                     encode_ms=encode_ms)
+            raise error if isinstance(error, DecisionError) else DecisionError(f"决策请求失败: {message}")
+        
+        self._latencies.append(latency_ms)
+        self.stats['bytes_received'] += result['size']
+        if self.log_requests:
+            self.logger.add_server_communication({'url': self.url}, {'status': result['status']}, True,
+                                                 request_size=len(body), response_size=result['size'],
+                                                 latency_ms=latency_ms, encode_ms=encode_ms)
+        return result['data']
+    
+    def stream(self, encoder=None, **kwargs):
+        """
+        创建复用本客户端连接池会话的决策流（WebSocket长连接模式）
+        
+        Args:
+            encoder: 载荷编码器，None则新建
+            **kwargs: 传给 DecisionStream 的其他参数
+        
+        Returns:
+            未启动的 DecisionStream，用 async with 或 start() 建立连接
+        """
+        from .decision_stream import DecisionStream
+        return DecisionStream(encoder=encoder, client=self, **kwargs)
+    
+    async def decide_state(self, state: dict, encoder, screenshot=None) -> Any:
+        """
+        编码游戏状态并请求决策
+        
+        请求成功后以该状态（或响应中 ack 指定的序号）作为之后增量编码的基线；
+        响应中 resync 为真（服务器没有对应的基线）时丢弃基线，下一次发送完整状态
+        
+        Args:
+            state: 识别出的游戏状态
+            encoder: 载荷编码器（PayloadEncoder）
+            screenshot: 作为后备附带的截图，None则不附带
+        
+        Returns:
+            决策响应
+        
+        Raises:
+            DecisionError: 请求失败
+        """
+        data = encoder.encode(state, screenshot=screenshot)
+        report = encoder.last_report
+        response = await self.decide(data, PAYLOAD_CONTENT_TYPE, encode_ms=report['encode_ms'])
+        if isinstance(response, dict) and response.get('resync'):
+            encoder.reset()
+        else:
+            ack = response.get('ack', report['seq']) if isinstance(response, dict) else report['seq']
+            encoder.acknowledge(ack)
+        return response
+    
+    def latency(self) -> Dict[str, float]:
+        """最近成功请求的往返延迟分布，见 latency_distribution"""
+        return latency_distribution(self._latencies)
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        stats = self.stats
+        latency = self.latency()
+        requests = stats['requests']
+        return {
+            '请求数': f"{requests}（失败 {stats['failures']}，重试 {stats['retries']}）",
+            '新建连接数': str(stats['connections']),
+            '平均请求/响应大小': (f"{stats['bytes_sent'] / max(stats['attempts'], 1):.0f} / "
+                            f"{stats['bytes_received'] / max(latency['count'], 1):.0f} 字节"),
+            '往返延迟': f"p50={latency['p50_ms']}ms, p90={latency['p90_ms']}ms, max={latency['max_ms']}ms",
+            '最大在途请求数': str(stats['peak_in_flight'])
+        }
@@ -0,0 +1,301 @@
+"""
+决策流
+与决策服务器保持一条WebSocket长连接：状态载荷（增量编码）以二进制帧连续发出，决策按状态序号
+从同一连接流回，不再为每次决策付出HTTP请求头和排队等待的开销。连接使用心跳检测断线，
+断开后按带抖动的指数退避自动重连，重连后发送完整状态重新同步
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+from ..utils.latency import latency_distribution
+from .decision_client import DecisionError
+from .payload import PayloadEncoder, unpackb
+
+
+class DecisionStream:
+    """决策流
+    
+    服务器消息为msgpack（二进制帧）或JSON（文本帧）映射::
+        
+        {'seq': 状态序号, 'decision': 决策, 'ack': 确认的状态序号（默认为seq）}
+        {'seq': 状态序号, 'resync': True}    # 服务器没有增量基线，客户端立即重发完整状态
+    
+    用法::
+        
+        async with client.stream() as stream:
+            decision = await stream.decide_state(state)
+    """
+    
+    def __init__(self, url: Optional[str] = None, encoder: Optional[PayloadEncoder] = None,
+                 client=None, heartbeat: Optional[float] = None,
+                 timeout: Optional[float] = None, backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None, max_samples: int = 500, register: bool = True):
+        """
+        初始化决策流（连接在 start 时建立）
+        
+        Args:
+            url: WebSocket地址，None则使用 remote_server.stream_url
+            encoder: 载荷编码器，None则新建
+            client: 复用其连接池会话的 DecisionClient，None则自行创建会话
+            heartbeat: 心跳间隔（秒），超过该时间没有收到pong视为断线，None则使用 remote_server.heartbeat
+            timeout: 等待单个决策的超时（秒），None则使用 remote_server.timeout
+            backoff_base: 第一次重连的退避上限（秒），之后每次翻倍
+            backoff_max: 重连退避的最大值（秒）
+            max_samples: 保留的最近延迟样本数
+            register: 是否把统计注册到日志系统的会话统计
+        """
+        config = get_config()
+        self.logger = get_logger()
+        self.url = url or config.get('remote_server.stream_url', 'ws://localhost:8000/api/stream')
+        self.encoder = encoder or PayloadEncoder(register=register)
+        self.heartbeat = float(heartbeat if heartbeat is not None else config.get('remote_server.heartbeat', 5))
+        self.timeout = float(timeout if timeout is not None else config.get('remote_server.timeout', 5))
+        self.backoff_base = float(backoff_base if backoff_base is not None
+                                  else config.get('remote_server.backoff_base', 0.1))
+        self.backoff_max = float(backoff_max if backoff_max is not None
+                                 else config.get('remote_server.backoff_max', 2.0))
+        self._client = client
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._closing = False
+        # 状态序号 -> {'future', 'sent_at', 'state': 状态快照, 'screenshot', 'base': 增量基线序号或None}
+        self._waiters: Dict[int, dict] = {}
+        self._latencies: deque = deque(maxlen=max_samples)
+        self.stats = {
+            'connects': 0,
+            'disconnects': 0,
+            'sent': 0,
+            'decisions': 0,
+            'resyncs': 0,
+            'timeouts': 0,
+            'bytes_sent': 0,
+            'bytes_received': 0
+        }
+        if register:
+            self.logger.register_statistics("决策流", self.statistics)
+    
+    @property
+    def connected(self) -> bool:
+        """当前是否已连接"""
+        return self._connected is not None and self._connected.is_set()
+    
+    async def start(self):
+        """启动连接任务（断线后自动重连）"""
+        if self._runner is not None:
+            return
+        if self._client is not None:
+            self._session = await self._client.start()
+        elif self._session is None:
+            self._session = aiohttp.ClientSession()
+        self._closing = False
+        self._connected = asyncio.Event()
+        self._runner = asyncio.create_task(self._run())
+    
+    async def close(self):
+        """关闭连接，未完成的决策等待以 DecisionError 结束"""
+        self._closing = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        self._fail_waiters("决策流已关闭")
+        if self._client is None and self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def __aenter__(self):
+        await self.start()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """等待连接建立，超时返回False"""
+        await self.start()
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout if timeout is not None else self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    def _fail_waiters(self, message: str):
+        for waiter in self._waiters.values():
+            if not waiter['future'].done():
+                waiter['future'].set_exception(DecisionError(message))
+        self._waiters.clear()
+    
+    async def _run(self):
+        """连接、接收、断线重连的循环"""
+        attempt = 0
+        while not self._closing:
+            try:
+                self._ws = await self._session.ws_connect(self.url, heartbeat=self.heartbeat, max_msg_size=0)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                delay = self.backoff(attempt)
+                attempt += 1
+                if attempt == 1:
+                    self.logger.add_warning(f"决策流连接失败，{delay:.2f}秒后重试: {str(e)}")
+                await asyncio.sleep(delay)
+                continue
+            
+            attempt = 0
+            self.stats['connects'] += 1
+            # 新连接上服务器没有增量基线，第一条状态发送完整内容
+            self.encoder.reset()
+            self._connected.set()
+            try:
+                await self._receive(self._ws)
+            except Exception as e:
+                self.logger.add_error(f"决策流接收失败: {str(e)}")
+            finally:
+                self._connected.clear()
+                if not self._ws.closed:
+                    await self._ws.close()
+                self._ws = None
+                if not self._closing:
+                    self.stats['disconnects'] += 1
+                    self.logger.add_warning("决策流连接断开，正在重连")
+                    self._fail_waiters("决策流连接断开")
+    
+    def backoff(self, attempt: int) -> float:
+        """第attempt次重连前的等待时间（秒），0到指数上限之间均匀随机"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    async def _receive(self, ws: aiohttp.ClientWebSocketResponse):
+        """处理服务器消息直到连接关闭"""
+        async for message in ws:
+            if message.type == aiohttp.WSMsgType.BINARY:
+                self.stats['bytes_received'] += len(message.data)
+                data = unpackb(message.data)
+            elif message.type == aiohttp.WSMsgType.TEXT:
+                self.stats['bytes_received'] += len(message.data)
+                data = json.loads(message.data)
+            else:
+                break
+            if not isinstance(data, dict) or 'seq' not in data:
+                self.logger.add_warning("决策流收到无法识别的消息")
+                continue
+            await self._dispatch(data)
+    
+    async def _dispatch(self, data: dict):
+        """把服务器消息交给对应序号的等待者"""
+        seq = data['seq']
+        waiter = self._waiters.pop(seq, None)
+        if data.get('resync'):
+            # 服务器没有该状态的增量基线：重发该序号自己的状态，等待者转到新序号。
+            # 基于同一个旧基线的其他在途状态也会各自收到resync，只有旧基线仍是当前基线时才重置，
+            # 避免把之后已确认的新基线也丢掉
+            self.stats['resyncs'] += 1
+            if waiter is None:
+                return
+            if waiter['base'] is None or waiter['base'] == self.encoder.baseline_seq:
+                self.encoder.reset()
+            try:
+                await self._send(waiter['state'], waiter['screenshot'], waiter)
+            except DecisionError as e:
+                if not waiter['future'].done():
+                    waiter['future'].set_exception(e)
+            return
+        self.encoder.acknowledge(data.get('ack', seq))
+        if waiter is None:
+            return
+        self._latencies.append((time.perf_counter() - waiter['sent_at']) * 1000)
+        self.stats['decisions'] += 1
+        if not waiter['future'].done():
+            waiter['future'].set_result(data.get('decision'))
+    
+    async def _send(self, state: dict, screenshot, waiter: dict) -> int:
+        """编码并发送状态，返回状态序号；等待者在发送前登记，避免决策先于登记到达"""
+        if self._ws is None or self._ws.closed:
+            raise DecisionError("决策流未连接")
+        base = self.encoder.baseline_seq
+        data = self.encoder.encode(state, screenshot=screenshot)
+        seq = self.encoder.last_report['seq']
+        waiter['seq'] = seq
+        # 保存编码器的快照，调用方之后原地修改状态不影响重发
+        waiter['state'] = self.encoder.pending_state(seq) or state
+        waiter['screenshot'] = screenshot
+        waiter['base'] = base if self.encoder.last_report['delta'] else None
+        self._waiters[seq] = waiter
+        try:
+            await self._ws.send_bytes(data)
+        except (aiohttp.ClientError, ConnectionError) as e:
+            self._waiters.pop(seq, None)
+            raise DecisionError(f"决策流发送失败: {str(e)}")
+        self.stats['sent'] += 1
+        self.stats['bytes_sent'] += len(data)
+        return seq
+    
+    async def _submit(self, state: dict, screenshot) -> dict:
+        """等待连接可用后发送状态，返回登记的等待者（重新同步后其中的seq为重发的序号）"""
+        if not self.connected and not await self.wait_connected():
+            raise DecisionError("决策流连接超时")
+        waiter = {'future': asyncio.get_running_loop().create_future(), 'sent_at': time.perf_counter()}
+        await self._send(state, screenshot, waiter)
+        return waiter
+    
+    async def send_state(self, state: dict, screenshot=None) -> 'asyncio.Future':
+        """
+        发送状态，不等待决策
+        
+        Args:
+            state: 识别出的游戏状态
+            screenshot: 作为后备附带的截图，None则不附带
+        
+        Returns:
+            以该状态的决策为结果的Future（连接断开时以 DecisionError 结束）
+        
+        Raises:
+            DecisionError: 在超时时间内没有可用的连接
+        """
+        waiter = await self._submit(state, screenshot)
+        return waiter['future']
+    
+    async def decide_state(self, state: dict, screenshot=None, timeout: Optional[float] = None) -> Any:
+        """
+        发送状态并等待对应的决策
+        
+        Raises:
+            DecisionError: 连接不可用、连接断开或等待超时
+        """
+        waiter = await self._submit(state, screenshot)
+        try:
+            return await asyncio.wait_for(waiter['future'], timeout if timeout is not None else self.timeout)
+        except asyncio.TimeoutError:
+            # 不再等待的决策：注销等待者，之后迟到的决策直接丢弃
+            if self._waiters.get(waiter['seq']) is waiter:
+                del self._waiters[waiter['seq']]
+            self.stats['timeouts'] += 1
+            raise DecisionError("等待决策超时")
+    
+    def latency(self) -> Dict[str, float]:
+        """最近决策的往返延迟分布（状态发出 → 决策收到），见 latency_distribution"""
+        return latency_distribution(self._latencies)
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        stats = self.stats
+        latency = self.latency()
+        return {
+            '连接次数': f"{stats['connects']}（断开 {stats['disconnects']}，重新同步 {stats['resyncs']}）",
+            '状态/决策数': f"{stats['sent']} / {stats['decisions']}（超时 {stats['timeouts']}）",
+            '收发字节数': f"{stats['bytes_sent']} / {stats['bytes_received']}",
+            '决策延迟': f"p50={latency['p50_ms']}ms, p90={latency['p90_ms']}ms, max={latency['max_ms']}ms"
+        }
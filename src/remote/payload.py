@@ -0,0 +1,284 @@
+"""
+决策请求载荷编码
+把识别出的游戏状态（格子地图、实体列表、HUD数值、时间戳等）编码为msgpack二进制，NumPy数组按
+dtype/形状/原始字节紧凑打包；相对服务器最近确认的状态只发送变化的字段和格子（增量编码），
+截图只在调用方明确要求时作为后备附带。每次编码记录载荷大小和编码耗时
+"""
+
+import copy
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+import msgpack
+import numpy as np
+
+from ..utils.logger import get_logger
+from ..utils.config import get_config
+
+PAYLOAD_CONTENT_TYPE = 'application/msgpack'
+PAYLOAD_VERSION = 1
+
+# msgpack扩展类型：NumPy数组
+ARRAY_EXT = 1
+
+
+def _pack_default(value):
+    """msgpack无法直接编码的对象：NumPy数组打包为扩展类型，NumPy标量转为Python标量"""
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        header = msgpack.packb([array.dtype.str, list(array.shape)])
+        return msgpack.ExtType(ARRAY_EXT, header + array.tobytes())
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法编码的类型: {type(value).__name__}")
+
+
+def _unpack_ext(code: int, data: bytes):
+    if code == ARRAY_EXT:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(data)
+        dtype, shape = unpacker.unpack()
+        offset = unpacker.tell()
+        return np.frombuffer(data, dtype=np.dtype(dtype), offset=offset).reshape(shape)
+    return msgpack.ExtType(code, data)
+
+
+def packb(value) -> bytes:
+    """编码为msgpack（支持NumPy数组）"""
+    return msgpack.packb(value, default=_pack_default, use_bin_type=True)
+
+
+def unpackb(data: bytes):
+    """解码msgpack（NumPy数组还原为只读数组）"""
+    return msgpack.unpackb(data, ext_hook=_unpack_ext, raw=False, strict_map_key=False)
+
+
+def _same(a, b) -> bool:
+    """两个字段值是否相同（数组按形状、类型和内容比较，逐层比较嵌套的列表、元组和字典）"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.dtype == b.dtype
+                and np.array_equal(a, b))
+    if isinstance(a, (list, tuple)) or isinstance(b, (list, tuple)):
+        return (type(a) is type(b) and len(a) == len(b)
+                and all(_same(x, y) for x, y in zip(a, b)))
+    if isinstance(a, dict) or isinstance(b, dict):
+        return (isinstance(a, dict) and isinstance(b, dict) and a.keys() == b.keys()
+                and all(_same(a[key], b[key]) for key in a))
+    return a == b
+
+
+def _snapshot(state: dict) -> dict:
+    """保存状态的深拷贝（包括嵌套的列表、字典和数组），调用方之后原地修改不影响基线"""
+    return copy.deepcopy(state)
+
+
+class PayloadEncoder:
+    """状态载荷编码器
+    
+    载荷格式（msgpack映射）::
+        
+        {'v': 版本, 'seq': 序号, 'time': 编码时间, 'base': 基线序号或None,
+         'fields': {变化的字段: 值}, 'patches': {数组字段: {'index': 展平下标, 'value': 新值}},
+         'removed': [删除的字段], 'screenshot': JPEG字节（可选）}
+    
+    base 为None时 fields 包含完整状态。服务器确认某个序号后（acknowledge），之后的载荷以该状态为基线；
+    数组字段形状和类型不变且变化的元素不超过 patch_ratio 时只发送变化的元素
+    """
+    
+    def __init__(self, patch_ratio: float = 0.25, max_pending: int = 32,
+                 screenshot_quality: Optional[int] = None, register: bool = True):
+        """
+        初始化编码器
+        
+        Args:
+            patch_ratio: 数组变化元素超过该比例时发送整个数组
+            max_pending: 等待确认的已发送状态最多保留数
+            screenshot_quality: 附带截图的JPEG质量，None则使用 remote_server.screenshot_quality
+            register: 是否把统计注册到日志系统的会话统计
+        """
+        self.logger = get_logger()
+        self.patch_ratio = patch_ratio
+        self.max_pending = max_pending
+        self.screenshot_quality = int(screenshot_quality or get_config().get('remote_server.screenshot_quality', 70))
+        self.seq = 0
+        self.baseline: Optional[dict] = None
+        self.baseline_seq: Optional[int] = None
+        self._pending: 'OrderedDict[int, dict]' = OrderedDict()
+        self._reports: deque = deque(maxlen=500)
+        self.last_report: Optional[dict] = None
+        self.stats = {
+            'payloads': 0,
+            'full': 0,
+            'delta': 0,
+            'screenshots': 0,
+            'bytes': 0,
+            'encode_ms': 0.0
+        }
+        if register:
+            self.logger.register_statistics("决策载荷", self.statistics)
+    
+    def reset(self):
+        """丢弃基线（服务器丢失状态时），下一次编码发送完整状态"""
+        self.baseline = None
+        self.baseline_seq = None
+        self._pending.clear()
+    
+    def acknowledge(self, seq: int) -> bool:
+        """
+        服务器确认收到某个序号的状态，之后以它为增量基线
+        
+        Returns:
+            是否找到该序号（过早或已被丢弃的序号返回False）
+        """
+        state = self._pending.get(seq)
+        if state is None:
+            return False
+        self.baseline = state
+        self.baseline_seq = seq
+        # 更早发送的状态不会再成为基线
+        for pending in list(self._pending):
+            if pending <= seq:
+                del self._pending[pending]
+        return True
+    
+    def pending_state(self, seq: int) -> Optional[dict]:
+        """已发送但尚未确认的状态快照，不存在（已确认、已丢弃或已重置）时返回None"""
+        return self._pending.get(seq)
+    
+    def _encode_screenshot(self, screenshot) -> Optional[bytes]:
+        from ..core.frame import as_bgr
+        import cv2
+        ok, encoded = cv2.imencode('.jpg', as_bgr(screenshot), [cv2.IMWRITE_JPEG_QUALITY, self.screenshot_quality])
+        if not ok:
+            self.logger.add_warning("截图JPEG编码失败，载荷不附带截图")
+            return None
+        return encoded.tobytes()
+    
+    def encode(self, state: Dict[str, Any], screenshot=None, full: bool = False) -> bytes:
+        """
+        编码一次决策请求的状态
+        
+        Args:
+            state: 识别出的游戏状态（字段名 -> 值，值可以是NumPy数组、列表、字典和标量）
+            screenshot: 作为后备附带的截图（BGR数组或帧对象），None则不附带
+            full: 是否忽略基线发送完整状态
+        
+        Returns:
+            msgpack载荷；本次的大小和编码耗时见 last_report
+        """
+        started = time.perf_counter()
+        self.seq += 1
+        baseline = None if full else self.baseline
+        fields, patches, removed = {}, {}, []
+        changed_elements = 0
+        if baseline is None:
+            fields = dict(state)
+        else:
+            for key, value in state.items():
+                old = baseline.get(key)
+                if key in baseline and _same(old, value):
+                    continue
+                if (isinstance(value, np.ndarray) and isinstance(old, np.ndarray)
+                        and old.shape == value.shape and old.dtype == value.dtype):
+                    index = np.flatnonzero(old != value)
+                    if index.size <= self.patch_ratio * value.size:
+                        patches[key] = {'index': index.astype(np.uint32), 'value': value.reshape(-1)[index]}
+                        changed_elements += int(index.size)
+                        continue
+                fields[key] = value
+            removed = [key for key in baseline if key not in state]
+        
+        payload = {
+            'v': PAYLOAD_VERSION,
+            'seq': self.seq,
+            'time': time.time(),
+            'base': self.baseline_seq if baseline is not None else None,
+            'fields': fields,
+            'patches': patches,
+            'removed': removed
+        }
+        if screenshot is not None:
+            encoded = self._encode_screenshot(screenshot)
+            if encoded is not None:
+                payload['screenshot'] = encoded
+                self.stats['screenshots'] += 1
+        data = packb(payload)
+        
+        self._pending[self.seq] = _snapshot(state)
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+        
+        encode_ms = (time.perf_counter() - started) * 1000
+        self.last_report = {
+            'seq': self.seq,
+            'size': len(data),
+            'encode_ms': round(encode_ms, 3),
+            'delta': baseline is not None,
+            'fields': len(fields),
+            'patched_elements': changed_elements,
+            'screenshot': 'screenshot' in payload
+        }
+        self._reports.append(self.last_report)
+        self.stats['payloads'] += 1
+        self.stats['delta' if baseline is not None else 'full'] += 1
+        self.stats['bytes'] += len(data)
+        self.stats['encode_ms'] += encode_ms
+        return data
+    
+    def statistics(self) -> Dict[str, str]:
+        """会话统计用的汇总"""
+        count = self.stats['payloads']
+        if not count:
+            return {'载荷数': '0'}
+        delta_sizes = [r['size'] for r in self._reports if r['delta']]
+        full_sizes = [r['size'] for r in self._reports if not r['delta']]
+        return {
+            '载荷数': f"{count}（增量 {self.stats['delta']}，完整 {self.stats['full']}，附带截图 {self.stats['screenshots']}）",
+            '平均大小': (f"增量 {sum(delta_sizes) / max(len(delta_sizes), 1):.0f} 字节，"
+                      f"完整 {sum(full_sizes) / max(len(full_sizes), 1):.0f} 字节"),
+            '平均编码耗时': f"{self.stats['encode_ms'] / count:.2f} ms"
+        }
+
+
+class PayloadDecoder:
+    """载荷解码器（服务器端或测试替身使用）
+    
+    按序号保存已解码的完整状态，增量载荷在对应的基线上还原
+    """
+    
+    def __init__(self, max_states: int = 32):
+        self.max_states = max_states
+        self._states: 'OrderedDict[int, dict]' = OrderedDict()
+    
+    def decode(self, data: bytes) -> dict:
+        """
+        解码载荷
+        
+        Returns:
+            {'seq', 'time', 'state': 完整状态, 'screenshot': JPEG字节或None}
+        
+        Raises:
+            KeyError: 增量载荷的基线状态不存在（需要客户端重新发送完整状态）
+            ValueError: 载荷版本不支持
+        """
+        payload = unpackb(data)
+        if payload.get('v') != PAYLOAD_VERSION:
+            raise ValueError(f"不支持的载荷版本: {payload.get('v')}")
+        base = payload['base']
+        if base is None:
+            state = {}
+        else:
+            state = dict(self._states[base])
+        for key in payload['removed']:
+            state.pop(key, None)
+        state.update(payload['fields'])
+        for key, patch in payload['patches'].items():
+            array = state[key].copy()
+            array.reshape(-1)[patch['index']] = patch['value']
+            state[key] = array
+        self._states[payload['seq']] = state
+        while len(self._states) > self.max_states:
+            self._states.popitem(last=False)
+        return {'seq': payload['seq'], 'time': payload['time'], 'state': state,
+                'screenshot': payload.get('screenshot')}
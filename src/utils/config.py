@@ -42,7 +42,15 @@ class ConfigManager:
             'game': {
                 'window_title': 'Mini Motorways',
                 'expected_resolution': [1920, 1080],
-                'screenshot_region': None
+                'keep_aspect': False,
+                'pixel_ratio': None,
+                'screenshot_region': None,
+                'window_cache_ttl': 1.0,
+                'window_backend': 'auto',
+                'process_name': 'Mini Motorways',
+                'process_backend': 'auto',
+                'process_poll_interval': 0.5,
+                'window_watch_interval': 0.5
             },
             'screenshot': {
                 'save_raw': True,
@@ -60,18 +68,58 @@ class ConfigManager:
                 'enabled': False,
                 'url': 'http://localhost:8000/api/decision',
                 'timeout': 5,
-                'retry_times': 3
+                'retry_times': 3,
+                'max_in_flight': 4,
+                'backoff_base': 0.1,
+                'backoff_max': 2.0,
+                'keepalive_timeout': 30,
+                'screenshot_quality': 70,
+                'streaming': False,
+                'stream_url': 'ws://localhost:8000/api/stream',
+                'heartbeat': 5
             },
             'recognition': {
                 'confidence_threshold': 0.8,
                 'template_matching_threshold': 0.7,
-                'ocr_languages': ['en', 'ch_sim']
+                'template_dir': 'templates',
+                'template_scales': [0.9, 1.0, 1.1],
+                'pyramid_levels': 3,
+                'screen_profiles': 'templates/screens.npz',
+                'screen_max_distance': 0.35,
+                'ui_layout': 'templates/layout.json',
+                'palette_dir': 'templates/palettes',
+                'palette_map': 'default',
+                'grid_viewport': [0, 0, 1920, 1080],
+                'grid_tile_pitch': 48,
+                'grid_samples_per_tile': 4,
+                'grid_min_fraction': 0.25,
+                'pipeline_workers': 0,
+                'pipeline_max_frames': 16,
+                'pipeline_drop_stale': True,
+                'pipeline_screen_concurrency': 0,
+                'pipeline_grid_concurrency': 0,
+                'ocr_languages': ['en', 'ch_sim'],
+                'ocr_gpu': False,
+                'ocr_cache_size': 512
             },
             'automation': {
                 'click_delay': 0.1,
                 'drag_speed': 1.0,
+                'move_duration': 0.3,
+                'input_backend': 'auto',
+                'failsafe': False,
+                'move_rate': 120,
+                'drag_settle': 0.05,
+                'drag_corner_pause': 0.02,
+                'drag_corner_radius': 0.3,
+                'loop_max_fps': 30,
+                'loop_queue_size': 1,
+                'loop_max_age': 0.5,
+                'loop_budgets': {'capture': 20, 'recognize': 30, 'decide': 50, 'act': 300},
                 'screenshot_interval': 0.5,
-                'max_operation_retry': 3
+                'max_operation_retry': 3,
+                'change_threshold': 10.0,
+                'change_poll_interval': 0.01
             }
         }
     
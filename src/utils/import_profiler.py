@@ -0,0 +1,130 @@
+"""
+导入耗时分析
+以子进程运行 python -X importtime，解析并汇总各模块的导入耗时
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
+def _run_python(code: str, extra_args: Optional[List[str]] = None) -> subprocess.CompletedProcess:
+    """在项目根目录下启动一个全新的Python解释器执行代码"""
+    args = [sys.executable] + (extra_args or []) + ['-c', code]
+    return subprocess.run(args, capture_output=True, text=True, cwd=str(PROJECT_ROOT))
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    解析 -X importtime 的输出
+
+    Args:
+        stderr: 解释器的标准错误输出
+
+    Returns:
+        记录列表，每项包含 module、self_us、cumulative_us、depth
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+            cumulative_us = int(parts[1].strip())
+        except ValueError:
+            # 表头行
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append({
+            'module': name.strip(),
+            'self_us': self_us,
+            'cumulative_us': cumulative_us,
+            'depth': depth
+        })
+    return records
+
+
+def measure_import_times(module: str) -> List[Dict]:
+    """
+    在全新解释器中导入指定模块，获取每个子模块的导入耗时
+
+    Args:
+        module: 要导入的模块名称，如 'src.core'
+
+    Returns:
+        按累计耗时降序排列的记录列表
+    """
+    result = _run_python(f"import {module}", ['-X', 'importtime'])
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败: {result.stderr.strip().splitlines()[-1:]}")
+    records = parse_importtime(result.stderr)
+    return sorted(records, key=lambda r: r['cumulative_us'], reverse=True)
+
+
+def measure_cold_start(module: str, runs: int = 5) -> Dict:
+    """
+    多次冷启动导入模块，统计解释器启动加导入的总耗时
+
+    Args:
+        module: 要导入的模块名称
+        runs: 测量次数
+
+    Returns:
+        统计字典：中位数/最小/最大耗时（毫秒）及导入后已加载的重量级模块
+    """
+    code = (
+        f"import {module}\n"
+        "from src.utils.lazy_import import loaded_heavy_modules\n"
+        "print(','.join(loaded_heavy_modules()))"
+    )
+    durations = []
+    heavy = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = _run_python(code)
+        durations.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"导入 {module} 失败: {result.stderr.strip().splitlines()[-1:]}")
+        heavy = [name for name in result.stdout.strip().split(',') if name]
+
+    return {
+        'module': module,
+        'runs': runs,
+        'median_ms': round(statistics.median(durations), 1),
+        'min_ms': round(min(durations), 1),
+        'max_ms': round(max(durations), 1),
+        'heavy_modules_loaded': heavy
+    }
+
+
+def format_import_report(records: List[Dict], top: int = 15) -> str:
+    """
+    将导入耗时记录格式化为Markdown表格
+
+    Args:
+        records: measure_import_times 的返回值
+        top: 显示前多少项
+
+    Returns:
+        Markdown格式的表格文本
+    """
+    lines = [
+        "| 模块 | 自身耗时(ms) | 累计耗时(ms) |",
+        "| --- | ---: | ---: |"
+    ]
+    for record in records[:top]:
+        lines.append(
+            f"| {record['module']} | {record['self_us'] / 1000:.2f} | "
+            f"{record['cumulative_us'] / 1000:.2f} |"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,34 @@
+"""
+延迟分布统计
+把延迟样本汇总为平均值和分位数（毫秒），供决策客户端、游戏循环和延迟跟踪器共用
+"""
+
+from typing import Dict, Iterable
+
+
+def latency_distribution(samples: Iterable[float], scale: float = 1.0) -> Dict[str, float]:
+    """
+    延迟样本的分布
+    
+    Args:
+        samples: 延迟样本
+        scale: 样本换算为毫秒的倍数（样本为秒时传1000）
+    
+    Returns:
+        {'count', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'}
+    """
+    values = sorted(samples)
+    if not values:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p90_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    
+    def percentile(p: float) -> float:
+        return round(values[min(len(values) - 1, int(p * len(values)))] * scale, 1)
+    
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values) * scale, 1),
+        'p50_ms': percentile(0.5),
+        'p90_ms': percentile(0.9),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(values[-1] * scale, 1)
+    }
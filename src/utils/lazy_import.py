@@ -0,0 +1,82 @@
+"""
+延迟导入工具
+将cv2、numpy、pyautogui等重量级依赖推迟到首次使用时再导入，缩短冷启动时间
+"""
+
+import importlib
+import sys
+from typing import Callable, Optional
+
+
+class LazyModule:
+    """模块代理对象，首次访问属性时才真正导入模块"""
+
+    __slots__ = ('_lazy_name', '_lazy_module', '_lazy_on_load')
+
+    def __init__(self, name: str, on_load: Optional[Callable] = None):
+        """
+        初始化模块代理
+
+        Args:
+            name: 模块的完整名称，如 'PIL.Image'
+            on_load: 模块首次导入后的回调，参数为导入的模块
+        """
+        object.__setattr__(self, '_lazy_name', name)
+        object.__setattr__(self, '_lazy_module', None)
+        object.__setattr__(self, '_lazy_on_load', on_load)
+
+    def _load(self):
+        """导入并缓存真实模块"""
+        module = self._lazy_module
+        if module is None:
+            module = importlib.import_module(self._lazy_name)
+            object.__setattr__(self, '_lazy_module', module)
+            if self._lazy_on_load is not None:
+                self._lazy_on_load(module)
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        # 写入属性时转发到真实模块，保证 pyautogui.FAILSAFE = False 之类的设置生效
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "已加载" if self._lazy_module is not None else "未加载"
+        return f"<LazyModule '{self._lazy_name}' ({state})>"
+
+    @property
+    def is_loaded(self) -> bool:
+        """模块是否已经被真正导入"""
+        return self._lazy_module is not None
+
+
+def lazy_import(name: str, on_load: Optional[Callable] = None) -> LazyModule:
+    """
+    创建延迟导入的模块代理
+
+    Args:
+        name: 模块名称
+        on_load: 首次导入后的回调
+
+    Returns:
+        模块代理对象
+    """
+    return LazyModule(name, on_load)
+
+
+def loaded_heavy_modules(candidates: tuple = ('cv2', 'numpy', 'PIL', 'mss', 'pyautogui', 'easyocr')) -> list:
+    """
+    列出当前进程中已被导入的重量级模块（用于启动性能检查）
+
+    Args:
+        candidates: 需要检查的模块名称
+
+    Returns:
+        已导入的模块名称列表
+    """
+    return [name for name in candidates if name in sys.modules]
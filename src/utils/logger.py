@@ -6,7 +6,7 @@ Markdown格式的日志记录器
 import os
 import time
 from datetime import datetime
-from typing import Optional, List, Tuple
+from typing import Callable, Optional, List, Tuple
 from pathlib import Path
 
 
@@ -26,6 +26,8 @@ class MarkdownLogger:
         self.success_count = 0
         self.error_count = 0
         self.screenshot_count = 0
+        # 额外的统计来源（如延迟跟踪器），会话统计时一并输出
+        self._statistics_providers = {}
         
         # 确保日志目录存在
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
@@ -147,7 +149,9 @@ class MarkdownLogger:
         content += "\n"
         self._write_to_file(content)
     
-    def add_server_communication(self, request_data: dict, response_data: dict, success: bool):
+    def add_server_communication(self, request_data: dict, response_data: dict, success: bool,
+                                 request_size: Optional[int] = None, response_size: Optional[int] = None,
+                                 latency_ms: Optional[float] = None, encode_ms: Optional[float] = None):
         """
         添加服务器通信记录
         
@@ -155,11 +159,25 @@ class MarkdownLogger:
             request_data: 请求数据
             response_data: 响应数据
             success: 是否成功
+            request_size: 实际发送的字节数，None则按请求数据的字符数记录
+            response_size: 实际收到的字节数，None则按响应数据的字符数记录
+            latency_ms: 往返延迟（毫秒）
+            encode_ms: 请求载荷编码耗时（毫秒）
         """
         status = "✅ 成功" if success else "❌ 失败"
         content = f"- 🌐 **服务器通信**: {status}\n"
-        content += f"  - 请求大小: {len(str(request_data))} 字符\n"
-        content += f"  - 响应大小: {len(str(response_data))} 字符\n"
+        if request_size is None:
+            content += f"  - 请求大小: {len(str(request_data))} 字符\n"
+        else:
+            content += f"  - 请求大小: {request_size} 字节\n"
+        if response_size is None:
+            content += f"  - 响应大小: {len(str(response_data))} 字符\n"
+        else:
+            content += f"  - 响应大小: {response_size} 字节\n"
+        if latency_ms is not None:
+            content += f"  - 往返延迟: {latency_ms:.1f} ms\n"
+        if encode_ms is not None:
+            content += f"  - 编码耗时: {encode_ms:.2f} ms\n"
         
         if not success:
             content += f"  - 错误信息: {response_data.get('error', '未知错误')}\n"
@@ -172,6 +190,37 @@ class MarkdownLogger:
         content = "---\n\n"
         self._write_to_file(content)
     
+    def register_statistics(self, name: str, provider: Callable[[], dict]):
+        """
+        注册额外的统计来源
+        
+        Args:
+            name: 统计项名称，作为会话统计中的小标题
+            provider: 返回 {指标名: 值} 字典的函数
+        """
+        self._statistics_providers[name] = provider
+    
+    def get_metrics(self) -> dict:
+        """
+        获取当前会话的统计指标
+        
+        Returns:
+            包含操作计数和各注册统计来源结果的字典
+        """
+        metrics = {
+            'operation_count': self.operation_count,
+            'success_count': self.success_count,
+            'error_count': self.error_count,
+            'screenshot_count': self.screenshot_count,
+            'duration_s': (datetime.now() - self.session_start_time).total_seconds()
+        }
+        for name, provider in self._statistics_providers.items():
+            try:
+                metrics[name] = provider()
+            except Exception as e:
+                metrics[name] = {'错误': str(e)}
+        return metrics
+    
     def add_statistics(self):
         """添加统计信息"""
         duration = datetime.now() - self.session_start_time
@@ -189,6 +238,17 @@ class MarkdownLogger:
             content += f"- 📈 **成功率**: {success_rate:.1f}%\n"
         
         content += "\n"
+        for name, provider in self._statistics_providers.items():
+            try:
+                values = provider()
+            except Exception as e:
+                values = {'错误': str(e)}
+            if not values:
+                continue
+            content += f"### {name}\n\n"
+            for key, value in values.items():
+                content += f"- **{key}**: {value}\n"
+            content += "\n"
         self._write_to_file(content)
     
     def finalize_session(self):
@@ -76,6 +76,1402 @@ def test_logger_system():
     return True
 
 
+def test_lazy_imports():
+    """测试重量级依赖延迟导入"""
+    print("🧪 测试延迟导入...")
+    
+    from src.utils.import_profiler import measure_cold_start
+    
+    # 在全新解释器中导入核心包，不应加载cv2、numpy、pyautogui等依赖
+    stats = measure_cold_start('src.core', runs=1)
+    assert stats['heavy_modules_loaded'] == [], f"导入时加载了重量级依赖: {stats['heavy_modules_loaded']}"
+    print(f"   src.core 冷启动耗时: {stats['median_ms']} ms")
+    
+    print("✅ 延迟导入测试通过")
+    return True
+
+
+def test_x11_backend():
+    """测试X11窗口后端（需要X服务器，可在Xvfb下运行）"""
+    print("🧪 测试X11窗口后端...")
+    
+    import os
+    if not os.environ.get('DISPLAY'):
+        print("   ⚠️ 未设置DISPLAY，跳过X11后端测试")
+        return True
+    
+    from Xlib import X, display
+    from src.core.x11_backend import X11WindowBackend
+    
+    # 创建一个模拟游戏窗口
+    conn = display.Display()
+    screen = conn.screen()
+    window = screen.root.create_window(50, 60, 320, 240, 0, screen.root_depth,
+                                       X.InputOutput, X.CopyFromParent)
+    window.set_wm_name("Mini Motorways Test")
+    window.map()
+    conn.sync()
+    
+    backend = X11WindowBackend("Mini Motorways")
+    try:
+        info = backend.get_window_info(activate=False)
+        assert info and info['found'], f"X11窗口查找失败: {info}"
+        assert (info['width'], info['height']) == (320, 240), f"窗口大小错误: {info}"
+        assert "Mini Motorways Test" in backend.list_windows(), "窗口列表不包含测试窗口"
+        
+        # 移动并缩放窗口后应能收到事件
+        assert backend.move_resize(100, 120, 400, 300), "调整窗口失败"
+        changed = backend.wait_for_geometry_change(timeout=2.0)
+        assert changed is not None, "未收到窗口变化事件"
+        assert (changed['width'], changed['height']) == (400, 300), f"变化后窗口大小错误: {changed}"
+        print(f"   窗口几何: {changed}")
+    finally:
+        backend.close()
+        window.destroy()
+        conn.close()
+    
+    print("✅ X11窗口后端测试通过")
+    return True
+
+
+def test_process_tracker():
+    """测试游戏进程跟踪器"""
+    print("🧪 测试进程跟踪器...")
+    
+    import subprocess
+    from src.core.process_tracker import ProcessTracker
+    
+    # 用sleep模拟游戏进程，进程名在运行时拼接，避免匹配到启动本测试的命令行
+    process_name = "FakeMotorways" + str(int(time.time() * 1000))
+    command = ['bash', '-c', f'exec -a {process_name} sleep 30']
+    
+    events = []
+    tracker = ProcessTracker(process_name, poll_interval=0.1, rescan_interval=0.1)
+    tracker.subscribe(lambda event: events.append(event['type']))
+    
+    game = subprocess.Popen(command)
+    try:
+        time.sleep(0.2)
+        assert tracker.resolve() == game.pid, "进程PID解析错误"
+        assert tracker.is_alive(), "进程存活检查失败"
+        
+        tracker.start()
+        game.kill()
+        game.wait()
+        assert tracker.exited.wait(2.0), "未检测到进程退出"
+        
+        game = subprocess.Popen(command)
+        deadline = time.time() + 2.0
+        while 'restarted' not in events and time.time() < deadline:
+            time.sleep(0.05)
+        assert events == ['started', 'exited', 'restarted'], f"进程事件错误: {events}"
+    finally:
+        tracker.stop()
+        game.kill()
+        game.wait()
+    
+    print("✅ 进程跟踪器测试通过")
+    return True
+
+
+def test_coordinate_mapper():
+    """测试坐标映射器"""
+    print("🧪 测试坐标映射器...")
+    
+    import numpy as np
+    from src.core.coordinate_mapper import CoordinateMapper, IMAGE, REFERENCE, SCREEN
+    
+    # 参考布局1920x1080，窗口960x540位于(100, 50)，Retina截图为1920x1080物理像素
+    mapper = CoordinateMapper(reference_size=(1920, 1080), keep_aspect=False)
+    mapper.update((100, 50, 960, 540), generation=1)
+    mapper.update_pixel_ratio((1080, 1920, 3))
+    assert mapper.pixel_ratio == 2.0, f"HiDPI比例推断错误: {mapper.pixel_ratio}"
+    
+    assert mapper.to_screen(960, 540, source=REFERENCE) == (580, 320), "参考坐标映射错误"
+    assert mapper.to_screen(564, 497, source=IMAGE) == (382, 298), "截图坐标映射错误"
+    
+    # 批量转换并往返
+    points = np.array([[0, 0], [1920, 1080], [564, 497]])
+    screen = mapper.transform(points, REFERENCE, SCREEN)
+    assert np.allclose(mapper.transform(screen, SCREEN, REFERENCE), points), "往返转换误差过大"
+    boxes = mapper.transform_boxes([[0, 0, 192, 108]], REFERENCE, SCREEN)
+    assert np.allclose(boxes, [[100, 50, 196, 104]]), f"矩形框映射错误: {boxes}"
+    
+    # 几何代数不变时不重新计算
+    count = mapper.recompute_count
+    mapper.update((100, 50, 960, 540), generation=1)
+    assert mapper.recompute_count == count, "几何未变化时不应重新计算"
+    
+    print("✅ 坐标映射器测试通过")
+    return True
+
+
+def test_drag_planner():
+    """测试道路拖拽路径规划器"""
+    print("🧪 测试拖拽路径规划器...")
+    
+    from src.core.action_executor import ActionExecutor
+    from src.core.drag_planner import DragPlanner, compress_tile_path
+    
+    # 先向右4格，再斜向右下2格，再向下3格：只保留起点、两个拐点和终点
+    tiles = [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (5, 1), (6, 2), (6, 3), (6, 4), (6, 5)]
+    waypoints = compress_tile_path(tiles)
+    assert waypoints.tolist() == [[0, 0], [4, 0], [6, 2], [6, 5]], f"路径压缩错误: {waypoints.tolist()}"
+    
+    planner = DragPlanner(grid_origin=(100, 200), tile_pitch=30, drag_speed=1.0,
+                          settle=0.05, corner_pause=0.0, corner_radius=0.0)
+    trajectory = planner.plan(tiles)
+    assert trajectory.as_path() == [(100, 200), (220, 200), (280, 260), (280, 350)], "轨迹坐标错误"
+    assert len(trajectory.durations) == 3, "分段时长数量错误"
+    assert planner.BASE_DRAG_SPEED == ActionExecutor.BASE_DRAG_SPEED, "拖拽基准速度不一致"
+    assert abs(trajectory.durations[0] - 120 / planner.BASE_DRAG_SPEED) < 1e-9, "分段时长计算错误"
+    
+    # 拐点停顿：在拐点重复一个点，停顿段只停留不移动，其他段的时长不变
+    paused = DragPlanner(grid_origin=(100, 200), tile_pitch=30, drag_speed=1.0,
+                         settle=0.05, corner_pause=0.02, corner_radius=0.0).plan(tiles)
+    assert paused.as_path() == [(100, 200), (220, 200), (220, 200), (280, 260), (280, 260), (280, 350)], \
+        f"拐点停顿轨迹错误: {paused.as_path()}"
+    assert paused.durations[1] == paused.durations[3] == 0.02, "停顿段时长错误"
+    assert abs(paused.durations[0] - trajectory.durations[0]) < 1e-9, "停顿不应加在移动段上"
+    
+    # 拐角圆滑：圆弧点都在拐角格子内（距拐点不超过半个格距），每个拐角停顿一次
+    smooth = DragPlanner(grid_origin=(100, 200), tile_pitch=30, drag_speed=1.0,
+                         settle=0.05, corner_pause=0.02, corner_radius=0.4, corner_samples=4)
+    path = smooth.plan(tiles).as_path()
+    corners = [(220, 200), (280, 260)]
+    inner = path[1:-1]
+    assert len(inner) > 2 * 2, "拐角未圆滑"
+    assert all(min(max(abs(x - cx), abs(y - cy)) for cx, cy in corners) <= 15 for x, y in inner), \
+        f"圆弧离开了拐角格子: {path}"
+    assert sum(a == b for a, b in zip(path, path[1:])) == 2, "每个拐角应停顿一次"
+    
+    # 相同形状平移到其他位置时命中缓存（按压缩后的拐点列表缓存）
+    smooth.plan([(x + 3, y + 7) for x, y in tiles])
+    assert smooth.cache_info().hits == 1, "相同形状未命中缓存"
+    
+    print("✅ 拖拽路径规划器测试通过")
+    return True
+
+
+def test_input_backend():
+    """测试输入后端和执行器"""
+    print("🧪 测试输入后端...")
+    
+    from src.core.action_executor import ActionExecutor
+    from src.core.input_backend import RecordingInputBackend
+    
+    backend = RecordingInputBackend(move_rate=200)
+    executor = ActionExecutor(click_delay=0, move_duration=0, backend=backend)
+    try:
+        executor.click(10, 20)
+        executor.drag([(0, 0), (100, 0)], duration=0.05)
+        executor.key('ctrl', 's')
+        assert executor.flush(timeout=5.0), "执行器未在超时前完成"
+    finally:
+        executor.stop()
+    
+    types = [event['type'] for event in backend.events]
+    assert types[:3] == ['move', 'mouse_down', 'mouse_up'], f"点击事件顺序错误: {types[:3]}"
+    assert types[-2:] == ['mouse_up', 'hotkey'], f"拖拽/按键事件顺序错误: {types[-2:]}"
+    assert (backend.events[-3]['x'], backend.events[-3]['y']) == (100, 0), "拖拽终点错误"
+    # 0.05秒、每秒200次 => 10个插值移动事件，每个都带预定时间
+    scheduled = [event for event in backend.events if event['scheduled'] is not None]
+    assert len(scheduled) == 10, f"插值移动事件数量错误: {len(scheduled)}"
+    
+    summary = backend.summary()
+    print(f"事件数: {summary['events']}, 抖动p95: {summary['jitter_p95_ms']} ms")
+    
+    print("✅ 输入后端测试通过")
+    return True
+
+
+def test_action_executor():
+    """测试输入执行器的移动合并、完成顺序、取消和等待"""
+    print("🧪 测试输入执行器...")
+    
+    import threading
+    from src.core.action_executor import ActionExecutor
+    from src.core.input_backend import RecordingInputBackend
+    
+    backend = RecordingInputBackend()
+    executor = ActionExecutor(click_delay=0, move_duration=0, backend=backend)
+    gate = threading.Event()
+    try:
+        # 工作线程阻塞在等待条件上，之后提交的操作一起排队，便于向前查看合并
+        executor.wait_until(gate.is_set, timeout=5.0)
+        futures = [executor.move(1, 1), executor.move(2, 2), executor.move(3, 3),
+                   executor.click(10, 20), executor.move(30, 40)]
+        done = []
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda _, index=index: done.append(index))
+        gate.set()
+        assert executor.flush(timeout=5.0), "执行器未在超时前完成"
+        
+        results = [future.result(timeout=1.0) for future in futures]
+        assert done == [0, 1, 2, 3, 4], f"操作未按提交顺序完成: {done}"
+        assert [r['coalesced'] for r in results] == [True, True, True, False, False], "移动合并结果错误"
+        assert executor.stats['coalesced'] == 3, f"合并计数错误: {executor.stats}"
+        moves = [(e['x'], e['y']) for e in backend.events if e['type'] == 'move']
+        assert moves == [(10, 20), (30, 40)], f"被合并的移动不应发送: {moves}"
+        assert results[3]['action'] == 'click' and results[3]['issued_at'] >= results[3]['started_at'], \
+            "点击结果错误"
+        
+        # 拖拽：按下和松开之间的每次移动都是按住按键的拖拽事件，而不是普通移动
+        backend.clear()
+        executor.drag([(0, 0), (60, 0), (60, 40)], duration=0.03).result(timeout=5.0)
+        types = [e['type'] for e in backend.events]
+        down, up = types.index('mouse_down'), types.index('mouse_up')
+        assert down < up - 1 and set(types[down + 1:up]) == {'drag'}, f"拖拽应发送拖拽事件: {types}"
+        assert (backend.events[up - 1]['x'], backend.events[up - 1]['y']) == (60, 40), "拖拽终点错误"
+        
+        # 取消尚未开始的操作：Future被取消，事件不会发送
+        gate.clear()
+        waiting = executor.wait_until(gate.is_set, timeout=5.0)
+        pending = [executor.click(50, 60), executor.key('a')]
+        while not waiting.running():
+            time.sleep(0.005)
+        assert executor.cancel_pending() == 2, "取消的操作数错误"
+        assert all(future.cancelled() for future in pending), "未开始的操作应被取消"
+        assert not executor.flush(timeout=0.05), "等待条件未满足时不应空闲"
+        gate.set()
+        assert executor.flush(timeout=5.0), "取消后执行器未恢复空闲"
+        assert executor.stats['cancelled'] == 2, f"取消计数错误: {executor.stats}"
+        assert not any(e.get('x') == 50 or e['type'] == 'key' for e in backend.events), "已取消的操作被执行"
+    finally:
+        executor.stop()
+    
+    print("✅ 输入执行器测试通过")
+    return True
+
+
+def test_latency_tracker():
+    """测试点击到画面延迟统计"""
+    print("🧪 测试延迟跟踪器...")
+    
+    from src.core.latency_tracker import LatencyTracker
+    from src.utils.logger import get_logger
+    
+    tracker = LatencyTracker(screenshot_manager=None)
+    for ms in range(10, 110, 10):
+        tracker.record('click', ms / 1000, screen='main_menu')
+    tracker.record('click', 0.5, screen='in_game')
+    tracker.record('drag', 2.0, screen='in_game', changed=False)
+    
+    menu = tracker.distribution('click', 'main_menu')
+    assert menu['count'] == 10 and menu['p50_ms'] == 60.0 and menu['max_ms'] == 100.0, f"分布统计错误: {menu}"
+    assert tracker.distribution('click')['count'] == 11, "按操作类型汇总错误"
+    assert tracker.distribution(screen='in_game')['timeouts'] == 1, "超时计数错误"
+    assert tracker.suggested_delay('drag', default=1.0) == 1.0, "无样本时应返回默认值"
+    
+    # 统计结果进入会话指标
+    metrics = get_logger().get_metrics()
+    assert 'click @ main_menu' in metrics["点击到画面延迟"], "延迟统计未注册到会话指标"
+    
+    # begin/complete：点击发出30ms后画面变化，点击间隔为200ms，仍应测到约30ms的延迟
+    import numpy as np
+    from src.core.action_executor import ActionExecutor
+    from src.core.input_backend import RecordingInputBackend
+    from src.core.screenshot import ScreenshotManager
+    
+    before = np.zeros((20, 20, 3), dtype=np.uint8)
+    after = np.full((20, 20, 3), 200, dtype=np.uint8)
+    executor = ActionExecutor(click_delay=0.2, move_duration=0, backend=RecordingInputBackend())
+    screenshot_manager = ScreenshotManager()
+    
+    current = {'future': None}
+    
+    def fake_grab(region=None):
+        future = current['future']
+        issued_at = future.action.issued_at if future is not None else None
+        changed = issued_at is not None and time.monotonic() - issued_at >= 0.03
+        return after if changed else before
+    
+    screenshot_manager.grab = fake_grab
+    tracker = LatencyTracker(screenshot_manager, register=False)
+    probe = tracker.begin()
+    current['future'] = executor.click(10, 10)
+    change = tracker.complete(probe, current['future'], timeout=1.0, screen='main_menu')
+    assert not current['future'].done(), "应在点击间隔结束前就检测到变化"
+    assert change['changed'] and 0.03 <= change['latency_s'] < 0.1, f"延迟测量错误: {change['latency_s']}"
+    
+    # 拖拽的延迟从松开鼠标时算起，不包含拖拽本身的时长
+    executor.flush(1.0)
+    current['future'] = None
+    probe = tracker.begin()
+    current['future'] = executor.drag([(0, 0), (100, 0)], duration=0.15)
+    change = tracker.complete(probe, current['future'], timeout=1.0, screen='in_game')
+    assert change['changed'] and change['latency_s'] < 0.1, f"拖拽延迟不应包含拖拽时长: {change['latency_s']}"
+    assert tracker.distribution('drag', 'in_game')['count'] == 1, "拖拽样本未记录"
+    executor.stop()
+    
+    # 操作在发出输入之前失败：不记录延迟样本，计入超时
+    class FailingBackend(RecordingInputBackend):
+        def click(self, x, y, clicks=1, button='left'):
+            raise RuntimeError("输入被拒绝")
+    
+    failing = ActionExecutor(click_delay=0, move_duration=0, backend=FailingBackend())
+    probe = tracker.begin()
+    change = tracker.complete(probe, failing.click(10, 10), timeout=1.0, screen='options')
+    assert not change['issued'] and change['latency_s'] is None, f"未发出的操作不应测量延迟: {change}"
+    stats = tracker.distribution('click', 'options')
+    assert stats['count'] == 0 and stats['timeouts'] == 1, f"失败的操作应计入超时: {stats}"
+    
+    # 合并掉的操作没有 issued_at
+    change = tracker.complete(tracker.begin(), {'action': 'move', 'coalesced': True}, screen='options')
+    assert not change['issued'] and tracker.distribution('move', 'options')['timeouts'] == 1, "合并的操作统计错误"
+    failing.stop()
+    
+    print("✅ 延迟跟踪器测试通过")
+    return True
+
+
+def test_frame_views():
+    """测试帧对象的派生视图缓存"""
+    print("🧪 测试帧派生视图...")
+    
+    import cv2
+    import numpy as np
+    from src.core.frame import Frame
+    from src.recognition.template_matcher import TemplateMatcher
+    from src.recognition.screen_classifier import ScreenClassifier
+    
+    rng = np.random.default_rng(5)
+    bgr = cv2.resize(rng.integers(0, 255, (27, 48, 3), dtype=np.uint8), (480, 270), interpolation=cv2.INTER_NEAREST)
+    bgra = cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA)
+    frame = Frame(bgra, region=(0, 0, 480, 270), seq=7)
+    
+    assert frame.shape == (270, 480, 3) and frame.seq == 7, "帧属性错误"
+    assert (frame.bgr == bgr).all() and frame.bgr.flags['C_CONTIGUOUS'], "BGR视图错误"
+    assert (frame.gray == cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)).all(), "灰度视图错误"
+    assert frame.half.shape == (135, 240, 3) and frame.quarter.shape == (68, 120, 3), "缩小视图尺寸错误"
+    assert frame.hsv.shape == (270, 480, 3), "HSV视图错误"
+    
+    # 每个视图只计算一次，之后都是命中
+    misses = frame.misses
+    for _ in range(10):
+        frame.gray
+        frame.hsv
+    assert frame.misses == misses and frame.hits >= 20, "派生视图应只计算一次"
+    
+    # 模板匹配和界面分类直接使用帧对象，灰度金字塔在两次匹配之间共享
+    matcher = TemplateMatcher(template_dir='', scales=[1.0])
+    matcher.add_template('patch', bgr[100:140, 200:260].copy())
+    hit = matcher.find(frame, 'patch')
+    assert hit is not None and (hit['x'], hit['y']) == (200, 100), "帧对象模板匹配错误"
+    misses = frame.misses
+    matcher.find(frame, 'patch')
+    assert frame.misses == misses, "第二次匹配应复用帧的灰度金字塔"
+    
+    classifier = ScreenClassifier(profile_path='')
+    classifier.add_reference('main_menu', bgr)
+    assert classifier.classify(frame)['screen'] == 'main_menu', "帧对象界面分类错误"
+    
+    frame.release()
+    assert not frame.has_view('gray'), "释放后不应保留派生视图"
+    
+    print("✅ 帧派生视图测试通过")
+    return True
+
+
+def test_template_matcher():
+    """测试模板匹配引擎"""
+    print("🧪 测试模板匹配...")
+    
+    import cv2
+    import numpy as np
+    from src.recognition.template_matcher import TemplateMatcher
+    
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur((rng.random((540, 960)) * 40 + 100).astype(np.uint8), (5, 5), 0)
+    template = np.full((60, 160), 30, dtype=np.uint8)
+    cv2.putText(template, "PLAY", (15, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.4, 255, 3)
+    frame[200:260, 300:460] = template
+    frame[400:460, 700:860] = template
+    larger = cv2.resize(template, None, fx=1.1, fy=1.1)
+    frame[20:20 + larger.shape[0], 20:20 + larger.shape[1]] = larger
+    
+    matcher = TemplateMatcher(template_dir='', threshold=0.8, scales=[1.0, 1.1], pyramid_levels=3)
+    matcher.add_template('play', template)
+    hits = matcher.match(frame)
+    positions = sorted((hit['x'], hit['y'], hit['scale']) for hit in hits)
+    assert positions == [(20, 20, 1.1), (300, 200, 1.0), (700, 400, 1.0)], f"匹配结果错误: {positions}"
+    assert matcher.stats['coarse_searches'] > 0, "未使用金字塔粗搜索"
+    
+    # 搜索区域限制
+    hit = matcher.find(frame, 'play', roi=(250, 150, 300, 200))
+    assert hit is not None and hit['center'] == (380, 230), f"区域内匹配错误: {hit}"
+    print(f"单次匹配耗时: {matcher.stats['last_match_ms']} ms")
+    
+    print("✅ 模板匹配测试通过")
+    return True
+
+
+def test_screen_classifier():
+    """测试游戏界面分类器"""
+    print("🧪 测试界面分类器...")
+    
+    import cv2
+    import numpy as np
+    from src.recognition.screen_classifier import ScreenClassifier, MAIN_MENU, IN_GAME, PAUSED, UNKNOWN
+    
+    menu = np.full((540, 960, 3), (200, 220, 240), dtype=np.uint8)
+    cv2.rectangle(menu, (300, 150), (650, 350), (40, 40, 40), -1)
+    game = np.full((540, 960, 3), (120, 180, 120), dtype=np.uint8)
+    paused = game // 2
+    cv2.putText(paused, "PAUSED", (350, 270), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 4)
+    
+    classifier = ScreenClassifier(profile_path='')
+    classifier.add_reference(MAIN_MENU, menu)
+    classifier.add_reference(IN_GAME, game)
+    classifier.add_reference(PAUSED, paused)
+    
+    assert classifier.classify(menu)['screen'] == MAIN_MENU, "主菜单识别错误"
+    assert classifier.classify(paused)['screen'] == PAUSED, "暂停界面识别错误"
+    assert classifier.classify(np.zeros_like(menu))['screen'] == UNKNOWN, "未知界面应返回unknown"
+    
+    # 画面小幅变化（车辆移动）仍然命中缓存
+    moving = game.copy()
+    moving[100:106, 200:212] = (0, 0, 255)
+    classifier.classify(game)
+    result = classifier.classify(moving)
+    assert result['screen'] == IN_GAME and result['cached'], f"小幅变化未命中缓存: {result}"
+    print(f"缓存命中耗时: {classifier.stats['last_classify_us']} µs")
+    
+    print("✅ 界面分类器测试通过")
+    return True
+
+
+def test_ocr_service():
+    """测试OCR服务的批量识别和缓存"""
+    print("🧪 测试OCR服务...")
+    
+    import numpy as np
+    from src.recognition.ocr_service import OCRService
+    
+    class CountingReader:
+        """按文本框返回其高度的识别器，用于验证批量拼接和缓存（不加载模型）"""
+        
+        def __init__(self):
+            self.calls = []
+        
+        def recognize(self, image, horizontal_list, free_list, batch_size, allowlist, detail):
+            self.calls.append(len(horizontal_list))
+            return [([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], str(y2 - y1), 0.9)
+                    for x1, x2, y1, y2 in horizontal_list]
+    
+    reader = CountingReader()
+    service = OCRService(reader=reader, gpu=True, cache_size=2)
+    score = np.full((20, 60, 3), 255, dtype=np.uint8)
+    week = np.full((30, 40, 3), 200, dtype=np.uint8)
+    
+    results = service.read_batch([score, week, score])
+    assert [r['text'] for r in results] == ['20', '30', '20'], f"批量识别结果错位: {results}"
+    assert reader.calls == [2], f"GPU上应一次推理识别两个不同区域: {reader.calls}"
+    
+    # CPU上逐个区域推理，同样跳过检测阶段
+    cpu_reader = CountingReader()
+    results = OCRService(reader=cpu_reader, gpu=False).read_batch([score, week, score])
+    assert [r['text'] for r in results] == ['20', '30', '20'] and cpu_reader.calls == [1, 1], \
+        f"CPU上应逐个区域识别: {cpu_reader.calls}"
+    
+    # 未变化的区域直接命中缓存
+    again = service.read_batch([score, week])
+    assert all(r['cached'] for r in again) and reader.calls == [2], "未变化区域被重复识别"
+    assert service.hit_rate > 0.5, "缓存命中率统计错误"
+    
+    # LRU容量为2，第三个区域挤掉最久未用的score
+    service.read(np.zeros((10, 10), dtype=np.uint8))
+    assert not service.read(score)['cached'], "LRU淘汰失效"
+    
+    print("✅ OCR服务测试通过")
+    return True
+
+
+def test_palette_lut():
+    """测试调色板查找表"""
+    print("🧪 测试调色板查找表...")
+    
+    import numpy as np
+    from src.recognition.palette import (PaletteProfile, ROAD, TERRAIN, UNKNOWN,
+                                         class_id, class_name)
+    
+    frame = np.zeros((40, 60, 3), dtype=np.uint8)
+    frame[:] = (200, 226, 236)          # 地形
+    frame[10:20, :] = (250, 250, 250)   # 道路
+    frame[30:, 40:] = (86, 92, 230)     # 红色房屋
+    frame[0, 0] = (0, 0, 0)             # 调色板外的颜色
+    
+    profile = PaletteProfile.from_samples('test', [(frame, {
+        'terrain': [(0, 0, 60, 10)],
+        'road': [(0, 10, 60, 10)],
+        'house_red': [(40, 30, 20, 10)]
+    })])
+    classes = profile.classify(frame)
+    assert classes.shape == (40, 60) and classes.dtype == np.uint8, "类别图形状错误"
+    assert classes[15, 30] == ROAD and classes[5, 5] == TERRAIN, "道路/地形分类错误"
+    assert class_name(int(classes[35, 50])) == 'house_red', "房屋分类错误"
+    assert classes[0, 0] == UNKNOWN, "调色板外的颜色应为unknown"
+    assert class_id(class_name(class_id('destination_blue'))) == class_id('destination_blue'), "类别名称转换错误"
+    
+    # 配置可以序列化后还原
+    restored = PaletteProfile.from_dict(profile.to_dict())
+    assert (restored.classify(frame) == classes).all(), "配置还原后分类结果不一致"
+    
+    print("✅ 调色板查找表测试通过")
+    return True
+
+
+def test_grid_extractor():
+    """测试网格地图提取器"""
+    print("🧪 测试网格地图提取器...")
+    
+    import numpy as np
+    from src.recognition.grid_extractor import GridExtractor
+    from src.recognition.palette import (PaletteProfile, DEFAULT_ENTRIES, TERRAIN, ROAD, BRIDGE,
+                                         WATER, class_id)
+    
+    generation = [0]
+    extractor = GridExtractor(PaletteProfile('test', DEFAULT_ENTRIES),
+                              generation_source=lambda: generation[0],
+                              reference_size=(1920, 1080))
+    frame = np.empty((540, 960, 3), dtype=np.uint8)
+    frame[:] = (200, 226, 236)
+    calibration = extractor.calibration(frame.shape)
+    assert calibration.shape == (22, 40), f"网格形状错误: {calibration.shape}"
+    
+    def paint(col, row, color):
+        x, y = calibration.tile_center(col, row)
+        half = calibration.pitch / 2
+        frame[int(y - half):int(y + half), int(x - half):int(x + half)] = color
+    
+    for col in range(5, 15):
+        paint(col, 3, (250, 250, 250))
+    paint(10, 3, (214, 176, 120))
+    frame[int(calibration.tile_center(10, 3)[1]) - 3:int(calibration.tile_center(10, 3)[1]) + 3, :] = (250, 250, 250)
+    paint(20, 10, (214, 176, 120))
+    paint(4, 3, (86, 92, 230))
+    paint(15, 3, (190, 112, 32))
+    
+    grid = extractor.extract(frame)
+    assert grid.shape == (22, 40) and grid.dtype == np.uint8, "格子数组形状错误"
+    assert grid[3, 6] == ROAD and grid[3, 10] == BRIDGE, "道路/桥识别错误"
+    assert grid[10, 20] == WATER and grid[0, 0] == TERRAIN, "水面/地形识别错误"
+    assert grid[3, 4] == class_id('house_red') and grid[3, 15] == class_id('destination_blue'), "房屋/目的地识别错误"
+    
+    # 局部提取与整图一致；校准按几何缓存，几何变化后重新计算
+    rows, cols = calibration.tiles_in_rect((100, 40, 200, 60))
+    assert (extractor.extract_region(frame, rows, cols) == grid[rows, cols]).all(), "局部提取结果不一致"
+    assert extractor.stats['calibrations'] == 1, "校准应被缓存"
+    generation[0] += 1
+    extractor.calibration(frame.shape)
+    assert extractor.stats['calibrations'] == 2, "窗口几何变化后应重新校准"
+    
+    # 根据房屋尺寸估计缩放
+    assert abs(extractor.auto_zoom(frame) - 1.0) < 0.1, "缩放估计错误"
+    
+    print("✅ 网格地图提取器测试通过")
+    return True
+
+
+def test_map_state():
+    """测试增量地图状态"""
+    print("🧪 测试增量地图状态...")
+    
+    import numpy as np
+    from src.recognition.grid_extractor import GridExtractor
+    from src.recognition.map_state import MapState, APPEARED, DISAPPEARED
+    from src.recognition.palette import PaletteProfile, DEFAULT_ENTRIES, ROAD, class_id
+    
+    extractor = GridExtractor(PaletteProfile('test', DEFAULT_ENTRIES), reference_size=(1920, 1080))
+    state = MapState(extractor, register=False)
+    diffs = []
+    state.subscribe(diffs.append)
+    
+    frame = np.empty((540, 960, 3), dtype=np.uint8)
+    frame[:] = (200, 226, 236)
+    first = state.update(frame, timestamp=1.0)
+    assert first['reset'] and state.version == 1 and state.grid.shape == (22, 40), "初始提取错误"
+    
+    # 新出现一座红色房屋：只重新分类变化区域覆盖的格子
+    calibration = extractor.calibration(frame.shape)
+    x, y = calibration.tile_center(8, 5)
+    half = int(calibration.pitch / 2)
+    rect = (int(x) - half, int(y) - half, 2 * half, 2 * half)
+    frame[rect[1]:rect[1] + rect[3], rect[0]:rect[0] + rect[2]] = (86, 92, 230)
+    before = state.stats['tiles_reclassified']
+    diff = state.update(frame, [rect], timestamp=2.0)
+    assert state.stats['tiles_reclassified'] - before <= 4, "应只重新分类变化区域的格子"
+    assert [(c['event'], c['tile'], c['class']) for c in diff['changes']] == \
+        [(APPEARED, (8, 5), class_id('house_red'))], f"房屋出现事件错误: {diff['changes']}"
+    
+    # 房屋所在格子变为道路：先消失再出现
+    frame[rect[1]:rect[1] + rect[3], rect[0]:rect[0] + rect[2]] = (250, 250, 250)
+    diff = state.update(frame, [rect], timestamp=3.0)
+    assert [(c['event'], c['class']) for c in diff['changes']] == \
+        [(DISAPPEARED, class_id('house_red')), (APPEARED, ROAD)], "格子变化事件错误"
+    
+    # 没有变化时版本号不变，也不通知订阅者
+    assert state.update(frame, [], timestamp=4.0)['changes'] == [] and state.version == 3, "无变化时版本号不应增加"
+    assert [d['version'] for d in diffs] == [1, 2, 3], "订阅者收到的差异错误"
+    assert len(state.changes_since(1)) == 3 and state.entities(ROAD) == [(8, 5)], "变化记录查询错误"
+    
+    # 快照是副本：之后的原地更新不影响已交出的地图
+    grid, version = state.snapshot()
+    frame[rect[1]:rect[1] + rect[3], rect[0]:rect[0] + rect[2]] = (200, 226, 236)
+    state.update(frame, [rect], timestamp=5.0)
+    assert version == 3 and state.version == 4 and grid[5, 8] == ROAD, "快照被之后的更新修改"
+    
+    print("✅ 增量地图状态测试通过")
+    return True
+
+
+def test_road_network():
+    """测试道路网络图"""
+    print("🧪 测试道路网络图...")
+    
+    import numpy as np
+    from src.recognition.road_network import RoadNetwork, UNREACHABLE
+    from src.recognition.palette import ROAD, TERRAIN, class_id
+    
+    grid = np.zeros((25, 40), dtype=np.uint8)
+    grid[5, 2:20] = ROAD
+    grid[4, 2] = class_id('house_red')
+    grid[4, 19] = class_id('destination_red')
+    grid[10, 2:10] = ROAD
+    grid[9, 2] = class_id('house_blue')
+    grid[9, 30] = class_id('destination_blue')
+    network = RoadNetwork(grid, register=False)
+    
+    red, red_dest, blue = (2, 4), (19, 4), (2, 9)
+    assert network.unreachable_houses() == [blue], "不可达房屋判断错误"
+    assert network.distance(red, red_dest) == 19, "道路步数错误"
+    path = network.path(red, red_dest)
+    assert path[0] == red and path[-1] == red_dest and len(path) == 20, "最短路径错误"
+    extension = network.extension_cost(blue)
+    assert extension['cost'] == len(extension['tiles']) > 0, "新修道路估算错误"
+    
+    # 距离查询走缓存：同一连通分量未变化时不再搜索
+    network.distances_from(red)
+    runs = network.stats['bfs_runs'] + network.stats['astar_runs']
+    for _ in range(100):
+        network.distance(red, red_dest)
+    assert network.stats['bfs_runs'] + network.stats['astar_runs'] == runs, "距离查询应命中缓存"
+    
+    # 断开道路后只重建受影响的分量，恢复后重新连通
+    network.apply_changes({(10, 5): TERRAIN})
+    assert network.distance(red, red_dest) == UNREACHABLE, "断路后应不可达"
+    assert sorted(network.unreachable_houses()) == [red, blue], "断路后不可达房屋错误"
+    network.apply_changes({(10, 5): ROAD})
+    assert network.distance(red, red_dest) == 19 and network.unreachable_houses() == [blue], "恢复道路后应重新连通"
+    
+    # 增量结果与整体重建一致
+    rebuilt = RoadNetwork(network.grid, register=False)
+    indptr, indices = network.csr()
+    ref_indptr, ref_indices = rebuilt.csr()
+    assert (indptr == ref_indptr).all() and (indices == ref_indices).all(), "增量邻接与重建结果不一致"
+    
+    print("✅ 道路网络图测试通过")
+    return True
+
+
+def _pipeline_mean(frame, deps):
+    """流水线测试阶段：帧均值"""
+    return float(frame.mean())
+
+
+def _pipeline_double(frame, deps):
+    """流水线测试阶段：依赖均值阶段；首像素为0的帧故意变慢"""
+    if frame[0, 0, 0] == 0:
+        time.sleep(0.2)
+    return deps['mean'] * 2
+
+
+def _pipeline_slow(frame, deps):
+    """流水线测试阶段：固定耗时"""
+    time.sleep(0.2)
+    return 0
+
+
+def test_recognition_pipeline():
+    """测试多进程识别流水线"""
+    print("🧪 测试多进程识别流水线...")
+    
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+    from src.recognition.pipeline import RecognitionPipeline, Stage, default_stages
+    
+    # 默认阶段不单独限制并发，可以占满所有工作进程
+    assert all(stage.max_concurrency is None for stage in default_stages()), "默认阶段不应限制并发"
+    
+    stages = [Stage('mean', _pipeline_mean, max_concurrency=2),
+              Stage('double', _pipeline_double, deps=('mean',), max_concurrency=2)]
+    frames = [np.full((60, 80, 3), value, dtype=np.uint8) for value in (0, 1, 2, 3)]
+    
+    # 进程池 + 共享内存：不丢弃过期帧时按序号顺序交付
+    with RecognitionPipeline(stages, workers=2, drop_stale=False) as pipeline:
+        for frame in frames:
+            assert pipeline.submit(frame) is not None, "提交帧失败"
+        results = [pipeline.next_result(timeout=10) for _ in frames]
+    assert [r['seq'] for r in results] == [0, 1, 2, 3], "结果未按帧序号顺序交付"
+    assert [r['results']['double'] for r in results] == [0.0, 2.0, 4.0, 6.0], "阶段依赖结果错误"
+    
+    # 丢弃过期帧：慢的第0帧在更新的帧完成后被丢弃
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        pipeline = RecognitionPipeline(stages, executor=executor, drop_stale=True, max_frames=4)
+        for frame in frames[:2]:
+            pipeline.submit(frame)
+        first = pipeline.next_result(timeout=5)
+        time.sleep(0.3)
+        assert first['seq'] == 1 and pipeline.next_result(timeout=0.1) is None, "过期帧应被丢弃"
+        assert pipeline.stats['dropped_stale'] == 1 and pipeline.in_flight == 0, "过期帧统计错误"
+        pipeline.close()
+    
+    # 关闭时取消排队的任务：被取消的帧按丢弃处理（不作为失败结果交付），共享内存照常释放
+    from multiprocessing import shared_memory
+    pipeline = RecognitionPipeline([Stage('slow', _pipeline_slow)], workers=1, drop_stale=False, max_frames=5)
+    for value in range(5):
+        pipeline.submit(np.full((60, 80, 3), value, dtype=np.uint8))
+    names = [job.shm.name for job in pipeline._jobs.values()]
+    pipeline.close()
+    delivered = []
+    while (result := pipeline.next_result(timeout=0.1)) is not None:
+        delivered.append(result)
+    assert len(delivered) < 5 and not any(r['errors'] for r in delivered), f"取消的帧不应交付: {delivered}"
+    assert not pipeline._jobs, "取消的帧未被释放"
+    for name in names:
+        try:
+            shared_memory.SharedMemory(name=name).close()
+            assert False, "关闭后共享内存应已释放"
+        except FileNotFoundError:
+            pass
+    
+    try:
+        RecognitionPipeline([Stage('a', _pipeline_mean, deps=('b',)), Stage('b', _pipeline_mean, deps=('a',))],
+                            executor=ThreadPoolExecutor(max_workers=1))
+        assert False, "循环依赖应报错"
+    except ValueError:
+        pass
+    
+    print("✅ 多进程识别流水线测试通过")
+    return True
+
+
+def test_ui_layout():
+    """测试界面布局索引"""
+    print("🧪 测试界面布局索引...")
+    
+    import cv2
+    import numpy as np
+    from src.recognition.template_matcher import TemplateMatcher
+    from src.recognition.ui_layout import UILayout
+    
+    rng = np.random.default_rng(3)
+    logo = cv2.resize(rng.integers(0, 255, (10, 20, 3), dtype=np.uint8), (160, 80), interpolation=cv2.INTER_NEAREST)
+    reference = np.full((1080, 1920, 3), 40, dtype=np.uint8)
+    reference[300:380, 400:560] = logo
+    
+    matcher = TemplateMatcher(template_dir='', scales=[1.0])
+    matcher.add_template('test_logo', logo)
+    generation = [0]
+    layout = UILayout(layout_path='/nonexistent/layout.json', matcher=matcher,
+                      generation_source=lambda: generation[0], reference_size=(1920, 1080))
+    layout.layout['test'] = {
+        'anchors': {'logo': {'templates': ['missing_logo', 'test_logo'], 'at': [0, 0]}},
+        'elements': {'start': {'anchor': 'logo', 'offset': [100, 200], 'size': [60, 20]},
+                     'clock': {'at': [1800, 1000]}}
+    }
+    
+    # 半尺寸窗口：锚点在缩放到参考分辨率的截图上匹配，元素坐标换算回截图像素
+    frame = cv2.resize(reference, (960, 540), interpolation=cv2.INTER_AREA)
+    start = layout.locate('test', 'start', frame)
+    assert start['anchored'] and abs(start['center'][0] - 290) <= 2 and abs(start['center'][1] - 270) <= 2, \
+        f"元素定位错误: {start}"
+    assert start['rect'][2:] == (30, 10), "元素大小换算错误"
+    assert layout.locate('test', 'clock')['center'] == (900, 500), "固定位置元素换算错误"
+    
+    # 已锚定后的定位不再匹配模板；几何变化后自动重新锚定
+    searches = matcher.stats['matches']
+    for _ in range(100):
+        layout.locate('test', 'start', frame)
+    assert matcher.stats['matches'] == searches and layout.stats['anchorings'] == 1, "已锚定时不应重新匹配"
+    generation[0] += 1
+    assert layout.locate('test', 'start') is None, "几何变化后没有截图时无法定位"
+    assert layout.locate('test', 'start', reference)['center'] == (580, 540), "重新锚定后定位错误"
+    
+    # 登记元素后可以按同样方式定位
+    layout.record_element('test', 'settings', reference, (700, 400), size=(40, 40))
+    assert layout.locate('test', 'settings', frame)['center'] == (350, 200), "登记元素定位错误"
+    
+    # 默认布局：没有锚点模板时使用名义位置按比例换算
+    default = UILayout(layout_path='/nonexistent/layout.json', matcher=matcher, reference_size=(1920, 1080))
+    play = default.locate('main_menu', 'play_button', frame)
+    assert play['center'] == (282, 248) and not play['anchored'], "默认布局名义位置错误"
+    
+    print("✅ 界面布局索引测试通过")
+    return True
+
+
+async def _start_decision_server(handler):
+    """在本机随机端口启动替身决策服务器，返回 (runner, url)"""
+    from aiohttp import web
+    
+    app = web.Application()
+    app.router.add_post('/api/decision', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/api/decision"
+
+
+def test_decision_client():
+    """测试远程决策客户端（本机替身服务器）"""
+    print("🧪 测试远程决策客户端...")
+    
+    import asyncio
+    from aiohttp import web
+    from src.remote.decision_client import DecisionClient, DecisionError
+    
+    state = {'fail': 0, 'active': 0, 'peak': 0, 'delay': 0.0, 'status': 200}
+    
+    async def handler(request):
+        body = await request.json()
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        try:
+            if state['delay']:
+                await asyncio.sleep(state['delay'])
+            if state['fail'] > 0:
+                state['fail'] -= 1
+                return web.Response(status=503)
+            if state['status'] != 200:
+                return web.Response(status=state['status'], text='bad request')
+            return web.json_response({'action': 'wait', 'turn': body['turn']})
+        finally:
+            state['active'] -= 1
+    
+    async def scenario():
+        runner, url = await _start_decision_server(handler)
+        try:
+            async with DecisionClient(url=url, timeout=0.5, retry_times=2, max_in_flight=2,
+                                      backoff_base=0.001, log_requests=False, register=False) as client:
+                # 连续多个回合复用同一条keep-alive连接
+                for turn in range(5):
+                    decision = await client.decide({'turn': turn})
+                    assert decision == {'action': 'wait', 'turn': turn}, "决策响应错误"
+                assert client.stats['connections'] == 1, "连续请求应复用同一连接"
+                
+                # 503 按退避重试后成功
+                state['fail'] = 2
+                assert (await client.decide({'turn': 5}))['turn'] == 5, "重试后应成功"
+                assert client.stats['retries'] == 2, "应重试两次"
+                
+                # 在途请求数不超过上限
+                state['delay'] = 0.05
+                results = await asyncio.gather(*(client.decide({'turn': t}) for t in range(6)))
+                assert [r['turn'] for r in results] == list(range(6)), "并发响应错误"
+                assert state['peak'] <= 2 and client.stats['peak_in_flight'] <= 2, "在途请求数超过上限"
+                
+                # 超时重试用尽后报错
+                state['delay'] = 1.0
+                try:
+                    await client.decide({'turn': 7})
+                    assert False, "超时应抛出DecisionError"
+                except DecisionError:
+                    pass
+                
+                # 4xx 不重试
+                state['delay'] = 0.0
+                state['status'] = 400
+                retries = client.stats['retries']
+                try:
+                    await client.decide({'turn': 8})
+                    assert False, "400应抛出DecisionError"
+                except DecisionError:
+                    pass
+                assert client.stats['retries'] == retries, "不可重试的错误不应重试"
+                assert client.stats['failures'] == 2 and client.latency()['count'] == 12, "统计错误"
+                assert client.stats['bytes_sent'] > 0 and client.stats['bytes_received'] > 0, "大小统计错误"
+        finally:
+            await runner.cleanup()
+    
+    asyncio.run(scenario())
+    
+    print("✅ 远程决策客户端测试通过")
+    return True
+
+
+def test_decision_payload():
+    """测试决策载荷编码（msgpack、增量、截图后备）"""
+    print("🧪 测试决策载荷编码...")
+    
+    import asyncio
+    import numpy as np
+    from aiohttp import web
+    from src.remote.decision_client import DecisionClient
+    from src.remote.payload import PayloadEncoder, PayloadDecoder, PAYLOAD_CONTENT_TYPE
+    
+    rng = np.random.default_rng(3)
+    grid = rng.integers(0, 6, (40, 72), dtype=np.uint8)
+    state = {'time': 12.5, 'grid': grid, 'houses': [[3, 4], [10, 2]], 'hud': {'score': 17, 'week': 2}}
+    encoder = PayloadEncoder(register=False)
+    decoder = PayloadDecoder()
+    
+    full = encoder.encode(state)
+    decoded = decoder.decode(full)
+    assert (decoded['state']['grid'] == grid).all() and decoded['state']['hud'] == state['hud'], "完整载荷还原错误"
+    assert len(full) < grid.nbytes + 200, "数组应按原始字节打包"
+    
+    # 未确认前仍发送完整状态；确认后只发送变化部分
+    encoder.encode(state)
+    assert not encoder.last_report['delta'], "未确认时应发送完整状态"
+    assert encoder.acknowledge(decoded['seq']), "确认失败"
+    grid[5, 7] = 5
+    grid[20, 30] = 4
+    state['hud'] = {'score': 18, 'week': 2}
+    del state['houses']
+    delta = encoder.encode(state)
+    report = encoder.last_report
+    assert report['delta'] and report['patched_elements'] <= 2 and len(delta) < len(full) / 10, "增量载荷过大"
+    restored = decoder.decode(delta)['state']
+    assert (restored['grid'] == grid).all() and restored['hud']['score'] == 18, "增量载荷还原错误"
+    assert 'houses' not in restored and restored['time'] == 12.5, "删除/未变化字段还原错误"
+    
+    # 原地修改嵌套的列表和字典也要作为变化发送
+    assert encoder.acknowledge(encoder.last_report['seq']), "确认失败"
+    state['houses'] = [[1, 1]]
+    decoder.decode(encoder.encode(state))
+    encoder.acknowledge(encoder.last_report['seq'])
+    state['houses'].append([8, 9])
+    state['hud']['score'] = 19
+    restored = decoder.decode(encoder.encode(state))['state']
+    assert encoder.last_report['fields'] == 2, "原地修改的字段应被发送"
+    assert restored['houses'] == [[1, 1], [8, 9]] and restored['hud']['score'] == 19, "原地修改还原错误"
+    
+    # 列表/字典里嵌套的数组按内容比较
+    encoder.acknowledge(encoder.last_report['seq'])
+    state['entities'] = [{'pos': np.array([1, 2])}]
+    decoder.decode(encoder.encode(state))
+    encoder.acknowledge(encoder.last_report['seq'])
+    decoder.decode(encoder.encode(state))
+    assert encoder.last_report['fields'] == 0, "未变化的嵌套数组不应重发"
+    encoder.acknowledge(encoder.last_report['seq'])
+    state['entities'][0]['pos'] = np.array([1, 3])
+    restored = decoder.decode(encoder.encode(state))['state']
+    assert encoder.last_report['fields'] == 1 and list(restored['entities'][0]['pos']) == [1, 3], "嵌套数组变化还原错误"
+    
+    # 截图只在明确传入时附带
+    screenshot = rng.integers(0, 255, (90, 160, 3), dtype=np.uint8)
+    decoder.decode(encoder.encode(state, screenshot=screenshot))
+    assert encoder.last_report['screenshot'], "应附带截图"
+    
+    # 客户端按服务器确认推进基线，服务器要求重新同步时发送完整状态
+    server = PayloadDecoder()
+    requests = []
+    
+    async def handler(request):
+        assert request.content_type == PAYLOAD_CONTENT_TYPE
+        try:
+            result = server.decode(await request.read())
+        except KeyError:
+            return web.json_response({'resync': True})
+        requests.append(result)
+        return web.json_response({'action': 'wait', 'ack': result['seq']})
+    
+    async def scenario():
+        runner, url = await _start_decision_server(handler)
+        try:
+            async with DecisionClient(url=url, retry_times=0, log_requests=False, register=False) as client:
+                client_encoder = PayloadEncoder(register=False)
+                await client.decide_state(state, client_encoder)
+                grid[0, 0] = 1
+                await client.decide_state(state, client_encoder)
+                assert client_encoder.last_report['delta'], "确认后应发送增量"
+                server._states.clear()
+                grid[0, 1] = 2
+                response = await client.decide_state(state, client_encoder)
+                assert response.get('resync') and client_encoder.baseline is None, "应丢弃基线"
+                await client.decide_state(state, client_encoder)
+                assert not client_encoder.last_report['delta'], "重新同步应发送完整状态"
+                assert (requests[-1]['state']['grid'] == grid).all(), "服务器还原的地图错误"
+        finally:
+            await runner.cleanup()
+    
+    asyncio.run(scenario())
+    
+    print("✅ 决策载荷编码测试通过")
+    return True
+
+
+def test_decision_stream():
+    """测试WebSocket决策流（本机替身服务器）"""
+    print("🧪 测试决策流...")
+    
+    import asyncio
+    import numpy as np
+    from aiohttp import web, WSMsgType
+    from src.remote.decision_client import DecisionClient, DecisionError
+    from src.remote.payload import PayloadDecoder, packb, unpackb
+    
+    server = {'decoder': PayloadDecoder(), 'sockets': []}
+    
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        server['sockets'].append(ws)
+        async for message in ws:
+            if message.type != WSMsgType.BINARY:
+                continue
+            try:
+                result = server['decoder'].decode(message.data)
+            except KeyError:
+                await ws.send_bytes(packb({'seq': unpackb(message.data)['seq'], 'resync': True}))
+                continue
+            state = result['state']
+            if state.get('silent'):
+                continue
+            await ws.send_bytes(packb({'seq': result['seq'], 'decision': {'turn': state['turn'],
+                                                                          'roads': int(state['grid'].sum())}}))
+        return ws
+    
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/api/stream', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f"ws://127.0.0.1:{runner.addresses[0][1]}/api/stream"
+        grid = np.zeros((40, 72), dtype=np.uint8)
+        try:
+            async with DecisionClient(timeout=0.5, log_requests=False, register=False) as client:
+                async with client.stream(url=url, heartbeat=0.2, backoff_base=0.01, register=False) as stream:
+                    assert await stream.wait_connected(2.0), "决策流连接失败"
+                    for turn in range(30):
+                        grid[turn % 40, turn] = 1
+                        decision = await stream.decide_state({'turn': turn, 'grid': grid})
+                        assert decision == {'turn': turn, 'roads': turn + 1}, "决策与状态序号不对应"
+                    assert stream.encoder.last_report['delta'], "连接建立后应发送增量"
+                    latency = stream.latency()
+                    assert latency['count'] == 30 and latency['p50_ms'] < 10, f"本机决策延迟过高: {latency}"
+                    
+                    # 流水线发送：多个状态在途，决策按序号对应
+                    futures = [await stream.send_state({'turn': 100 + i, 'grid': grid}) for i in range(5)]
+                    results = await asyncio.gather(*futures)
+                    assert [r['turn'] for r in results] == [100, 101, 102, 103, 104], "流水线决策错误"
+                    
+                    # 长连接不受单次请求超时影响，心跳保持连接
+                    await asyncio.sleep(0.8)
+                    assert stream.connected and stream.stats['connects'] == 1, "长连接不应断开"
+                    
+                    # 服务器丢失基线：客户端按要求以完整状态重发
+                    server['decoder']._states.clear()
+                    decision = await stream.decide_state({'turn': 200, 'grid': grid})
+                    assert decision['turn'] == 200 and stream.stats['resyncs'] == 1, "重新同步失败"
+                    
+                    # 多个增量状态在途时服务器丢失基线：每个状态各自以完整内容重发，决策与自己的状态对应
+                    server['decoder']._states.clear()
+                    resyncs = stream.stats['resyncs']
+                    futures = [await stream.send_state({'turn': 400 + i, 'grid': grid}) for i in range(3)]
+                    results = await asyncio.gather(*futures)
+                    assert [r['turn'] for r in results] == [400, 401, 402], f"重新同步后决策错位: {results}"
+                    assert stream.stats['resyncs'] - resyncs == 3, "每个在途状态只应重新同步一次"
+                    
+                    # 等待决策超时：等待者被注销，不在连接上累积
+                    try:
+                        await stream.decide_state({'turn': 500, 'grid': grid, 'silent': True}, timeout=0.05)
+                        assert False, "服务器不回复时应超时"
+                    except DecisionError:
+                        pass
+                    assert stream.stats['timeouts'] == 1 and not stream._waiters, "超时的等待者未被注销"
+                    
+                    # 服务器断开连接：自动重连，重连后第一条状态为完整状态
+                    await server['sockets'][-1].close()
+                    await asyncio.sleep(0.05)
+                    assert await stream.wait_connected(2.0), "断线后应自动重连"
+                    decision = await stream.decide_state({'turn': 300, 'grid': grid})
+                    assert decision['turn'] == 300 and not stream.encoder.last_report['delta'], "重连后应发送完整状态"
+                    assert stream.stats['connects'] == 2, "应重连一次"
+        finally:
+            await runner.cleanup()
+    
+    asyncio.run(scenario())
+    
+    print("✅ 决策流测试通过")
+    return True
+
+
+def test_game_loop():
+    """测试流水线游戏循环"""
+    print("🧪 测试流水线游戏循环...")
+    
+    import asyncio
+    from src.core.game_loop import GameLoop, LoopStage, CAPTURE, RECOGNIZE, DECIDE, ACT
+    
+    def capture():
+        time.sleep(0.01)
+        return {'captured': time.monotonic()}
+    
+    def recognize(frame):
+        time.sleep(0.02)
+        return dict(frame, state=True)
+    
+    async def decide(state):
+        await asyncio.sleep(0.02)
+        return dict(state, decision=True)
+    
+    acted = []
+    
+    def act(decision):
+        time.sleep(0.02)
+        acted.append(decision)
+        return True
+    
+    # 各阶段重叠执行：吞吐量接近最慢阶段（20ms），而不是各阶段之和（70ms）
+    loop = GameLoop([LoopStage(CAPTURE, capture), LoopStage(RECOGNIZE, recognize),
+                     LoopStage(DECIDE, decide), LoopStage(ACT, act)],
+                    max_fps=0, max_age=1.0, register=False)
+    summary = asyncio.run(loop.run(duration=0.6))
+    assert summary['completed'] == len(acted) and acted, "操作阶段没有执行"
+    assert summary['fps'] > 1.8 / 0.07, f"流水线吞吐量过低: {summary['fps']} 帧/秒"
+    assert summary['stages'][CAPTURE]['processed'] > summary['completed'], "截图应领先于操作"
+    assert all(d['state'] and d['decision'] for d in acted), "阶段结果传递错误"
+    
+    # 预算、跳过、失败和过期丢弃
+    count = {'n': 0}
+    
+    def flaky(frame):
+        count['n'] += 1
+        if count['n'] % 3 == 0:
+            raise RuntimeError("识别失败")
+        if count['n'] % 3 == 1:
+            return None
+        time.sleep(0.01)
+        return frame
+    
+    async def slow_decide(state):
+        await asyncio.sleep(0.06)
+        return state
+    
+    loop = GameLoop([LoopStage(CAPTURE, capture), LoopStage(RECOGNIZE, flaky, budget_ms=5),
+                     LoopStage(DECIDE, slow_decide), LoopStage(ACT, act, max_age=0.04)],
+                    max_fps=50, max_age=1.0, register=False)
+    done = len(acted)
+    summary = asyncio.run(loop.run(frames=12))
+    stages = summary['stages']
+    assert summary['frames'] == 12 and summary['completed'] == 0 and len(acted) == done, "过期的决策不应执行"
+    assert stages[ACT]['stale'] > 0 and stages[RECOGNIZE]['errors'] > 0 and stages[RECOGNIZE]['skipped'] > 0, "丢弃统计错误"
+    assert stages[RECOGNIZE]['over_budget'] > 0, "超出预算应计数"
+    
+    print("✅ 流水线游戏循环测试通过")
+    return True
+
+
+def test_run_game_loop():
+    """测试主程序的游戏循环（替身决策服务器、记录输入后端）"""
+    print("🧪 测试主程序游戏循环...")
+    
+    import asyncio
+    import itertools
+    import numpy as np
+    from aiohttp import web
+    from main import run_game_loop
+    from src.core.action_executor import ActionExecutor
+    from src.core.frame import Frame
+    from src.core.input_backend import RecordingInputBackend
+    from src.recognition.grid_extractor import GridExtractor
+    from src.recognition.map_state import MapState
+    from src.recognition.palette import PaletteProfile, DEFAULT_ENTRIES, class_id
+    from src.recognition.screen_classifier import IN_GAME
+    from src.remote.payload import PayloadDecoder
+    
+    config = get_config()
+    window_manager = WindowManager()
+    window_manager.backend = _StubWindowBackend({'found': True, 'x': 0, 'y': 0, 'width': 960, 'height': 540})
+    window_manager.apply_window_geometry(window_manager.backend.window)
+    region = window_manager.get_window_screenshot_region()
+    moved = {'found': True, 'x': 200, 'y': 100, 'width': 960, 'height': 540}
+    
+    # 第5帧起出现一座红色房屋，第8帧时窗口被移动
+    extractor = GridExtractor(PaletteProfile('test', DEFAULT_ENTRIES), reference_size=(1920, 1080))
+    image = np.empty((540, 960, 3), dtype=np.uint8)
+    image[:] = (200, 226, 236)
+    calibration = extractor.calibration(image.shape)
+    x, y = calibration.tile_center(8, 5)
+    half = int(calibration.pitch / 2)
+    house = image.copy()
+    house[int(y) - half:int(y) + half, int(x) - half:int(x) + half] = (86, 92, 230)
+    seqs = itertools.count()
+    
+    captured_regions = []
+    
+    def grab_frame(region=None):
+        seq = next(seqs)
+        if seq == 8:
+            window_manager.backend.window = moved
+        region = region or screenshot_manager.capture_region
+        captured_regions.append(region)
+        return Frame((house if seq >= 5 else image).copy(), region, seq)
+    
+    screenshot_manager = ScreenshotManager()
+    screenshot_manager.grab_frame = grab_frame
+    
+    class InGameClassifier:
+        def classify(self, frame):
+            return {'screen': IN_GAME}
+    
+    decoder = PayloadDecoder()
+    states = []
+    
+    async def handler(request):
+        payload = decoder.decode(await request.read())
+        states.append(payload['state'])
+        return web.json_response({'ack': payload['seq'], 'actions': [{'type': 'click', 'x': 960, 'y': 540}]})
+    
+    backend = RecordingInputBackend()
+    executor = ActionExecutor(click_delay=0, move_duration=0, backend=backend)
+    map_state = MapState(extractor, register=False)
+    url, streaming = config.get('remote_server.url'), config.get('remote_server.streaming', False)
+    watch_interval = config.get('game.window_watch_interval', 0.5)
+    
+    async def scenario():
+        runner, server_url = await _start_decision_server(handler)
+        config.set('remote_server.url', server_url)
+        config.set('remote_server.streaming', False)
+        config.set('game.window_watch_interval', 0.02)
+        try:
+            return await run_game_loop(window_manager, screenshot_manager, duration=0.8, executor=executor,
+                                       classifier=InGameClassifier(), map_state=map_state)
+        finally:
+            config.set('remote_server.url', url)
+            config.set('remote_server.streaming', streaming)
+            config.set('game.window_watch_interval', watch_interval)
+            await runner.cleanup()
+    
+    try:
+        summary = asyncio.run(scenario())
+    finally:
+        executor.stop()
+    
+    assert summary['completed'] > 0 and states, f"游戏循环没有完成任何帧: {summary}"
+    assert all(state['screen'] == IN_GAME and 'grid' in state for state in states), "决策请求缺少地图"
+    assert states[-1]['map_version'] == map_state.version and \
+        (states[-1]['grid'] == map_state.grid).all(), "决策请求的地图与版本号不一致"
+    # 只有第一帧整幅提取，之后只重新分类截图阶段检测到的变化区域
+    assert map_state.stats['full_extractions'] == 1, f"应只整幅提取一次: {map_state.stats}"
+    assert map_state.stats['frames'] > 5, "房屋出现前游戏循环已结束"
+    assert map_state.entities(class_id('house_red')) == [(8, 5)], "变化区域内的房屋未识别"
+    clicks = [e for e in backend.events if e['type'] == 'mouse_down']
+    assert clicks and (clicks[0]['x'], clicks[0]['y']) == (region[0] + 480, region[1] + 270), \
+        f"决策操作未按窗口映射: {clicks[:1]}"
+    
+    # 窗口移动后，截图区域和点击坐标都跟随新位置
+    assert captured_regions[0] == region and captured_regions[-1] == (200, 100, 960, 540), \
+        f"截图区域未跟随窗口移动: {captured_regions[-1]}"
+    assert (clicks[-1]['x'], clicks[-1]['y']) == (200 + 480, 100 + 270), f"点击坐标未跟随窗口移动: {clicks[-1]}"
+    
+    print("✅ 主程序游戏循环测试通过")
+    return True
+
+
+class _StubWindowBackend:
+    """替身窗口后端：返回预设的窗口几何并记录调用次数，没有显示连接时 screen_size 报错"""
+    
+    supports_events = False
+    
+    def __init__(self, window=None):
+        self.window = window
+        self.info_calls = 0
+        self.geometry_calls = 0
+    
+    def get_window_info(self, activate=True):
+        self.info_calls += 1
+        return self.window
+    
+    def get_window_geometry(self):
+        self.geometry_calls += 1
+        return self.window
+    
+    def screen_size(self):
+        raise RuntimeError("没有显示连接")
+    
+    def activate(self):
+        return True
+    
+    def list_windows(self):
+        return []
+    
+    def close(self):
+        pass
+
+
+class _StubProcessTracker:
+    """替身进程跟踪器：进程一直存活，记录存活检查次数"""
+    
+    pid = 4321
+    
+    def __init__(self):
+        self.alive_checks = 0
+    
+    def resolve(self):
+        return self.pid
+    
+    def is_alive(self):
+        self.alive_checks += 1
+        return True
+    
+    def start(self):
+        pass
+    
+    def stop(self):
+        pass
+
+
+def test_window_discovery():
+    """测试窗口查找（替身后端和进程跟踪器）"""
+    print("🧪 测试窗口查找...")
+    
+    # 找不到窗口且无法读取屏幕分辨率时，全屏回退使用预期分辨率
+    window_manager = WindowManager()
+    window_manager.backend = _StubWindowBackend()
+    window_manager.process_tracker = _StubProcessTracker()
+    assert window_manager.find_game_window(max_attempts=2, wait_interval=0), "全屏回退失败"
+    width, height = window_manager.expected_resolution
+    assert window_manager.get_window_region() == (0, 0, width, height), \
+        f"全屏回退区域错误: {window_manager.get_window_region()}"
+    
+    # TTL缓存：TTL内的查询不探测，过期后只廉价探测一次几何和进程，不重新完整查找
+    backend = _StubWindowBackend({'found': True, 'x': 10, 'y': 20, 'width': 800, 'height': 600})
+    tracker = _StubProcessTracker()
+    window_manager = WindowManager()
+    window_manager.backend = backend
+    window_manager.process_tracker = tracker
+    window_manager.cache_ttl = 0.2
+    assert window_manager.find_game_window(max_attempts=1) and backend.info_calls == 1, "窗口查找失败"
+    discoveries = window_manager.cache_stats['full_discoveries']
+    
+    for _ in range(5):
+        assert window_manager.refresh_window_info(), "缓存内刷新失败"
+    assert backend.geometry_calls == 0 and tracker.alive_checks == 0, "TTL内不应探测"
+    assert window_manager.cache_stats['hits'] == 10 and window_manager.cache_stats['probes'] == 0, \
+        f"缓存命中统计错误: {window_manager.cache_stats}"
+    
+    time.sleep(0.25)
+    backend.window = dict(backend.window, width=1024, height=768)
+    generation = window_manager.geometry_generation
+    assert window_manager.refresh_window_info(), "过期后刷新失败"
+    assert backend.geometry_calls == 1 and tracker.alive_checks == 1, "过期后应探测一次几何和进程"
+    assert window_manager.cache_stats['probes'] == 2, f"探测统计错误: {window_manager.cache_stats}"
+    assert window_manager.get_window_region() == (10, 20, 1024, 768), "探测结果未更新窗口区域"
+    assert window_manager.geometry_generation == generation + 1, "几何变化时几何代数应加一"
+    assert window_manager.cache_stats['full_discoveries'] == discoveries and backend.info_calls == 1, \
+        "探测成功时不应重新完整查找"
+    
+    print("✅ 窗口查找测试通过")
+    return True
+
+
 def test_window_manager():
     """测试窗口管理器"""
     print("🧪 测试窗口管理器...")
@@ -111,6 +1507,42 @@ def test_window_manager():
     return True
 
 
+def test_window_watcher():
+    """测试窗口监视器和几何缓存"""
+    print("🧪 测试窗口监视器...")
+    
+    from src.core.window_watcher import GenerationCache, WindowWatcher
+    
+    window_manager = WindowManager()
+    watcher = WindowWatcher(window_manager, poll_interval=0.05)
+    cache = GenerationCache(lambda: watcher.generation)
+    
+    events = []
+    watcher.subscribe(lambda region, generation: events.append((region, generation)))
+    geometry = {'found': True, 'x': 10, 'y': 20, 'width': 800, 'height': 600}
+    
+    # 几何变化：几何代数加一并通知订阅者，相同几何不重复通知
+    assert watcher.apply(geometry), "窗口几何变化未检测到"
+    assert not watcher.apply(dict(geometry)), "相同几何不应视为变化"
+    assert len(events) == 1 and events[0][1] == watcher.generation, f"订阅回调错误: {events}"
+    assert not watcher.apply({'found': False}), "未找到窗口时不应更新几何"
+    
+    cache['layout'] = 'old'
+    cache.setdefault('anchors', 'old')
+    assert len(cache) == 2 and cache.get('layout') == 'old', "缓存读写错误"
+    
+    # 几何再次变化：旧几何下的条目对所有访问方式都不可见
+    geometry['width'] = 1024
+    assert watcher.apply(geometry) and len(events) == 2, "窗口缩放未通知订阅者"
+    assert len(cache) == 0 and list(cache) == [] and list(cache.items()) == [], "缓存未随几何代数失效"
+    assert cache.pop('layout', None) is None and 'anchors' not in cache, "pop/in 返回了失效条目"
+    assert cache.setdefault('layout', 'new') == 'new', "setdefault 返回了失效条目"
+    assert cache.invalidations == 1, f"失效次数错误: {cache.invalidations}"
+    
+    print("✅ 窗口监视器测试通过")
+    return True
+
+
 def test_screenshot_manager():
     """测试截图管理器"""
     print("🧪 测试截图管理器...")
@@ -159,6 +1591,57 @@ def test_screenshot_manager():
     return True
 
 
+def test_screen_change():
+    """测试画面变化/稳定检测（用预设的帧序列代替截图）"""
+    print("🧪 测试画面变化检测...")
+    
+    import itertools
+    import numpy as np
+    
+    screenshot_manager = ScreenshotManager()
+    dark = np.zeros((40, 60, 3), dtype=np.uint8)
+    dim = np.full((40, 60, 3), 5, dtype=np.uint8)
+    bright = np.full((40, 60, 3), 200, dtype=np.uint8)
+    
+    def play(*frames):
+        """grab 依次返回给定的帧，用完后一直返回最后一帧"""
+        sequence = iter(frames)
+        screenshot_manager.grab = lambda region=None: next(sequence, frames[-1])
+    
+    # 第一帧作为基准，差异低于阈值的帧不算变化
+    play(dark, dim, dim, bright)
+    change = screenshot_manager.wait_for_change(threshold=10.0, timeout=1.0, interval=0)
+    assert change['changed'] and change['frames'] == 3, f"变化检测错误: {change}"
+    assert change['frame'] is bright and change['score'] >= 10.0, "返回的帧或差异错误"
+    
+    # 超时：画面始终低于阈值
+    play(dark, dim)
+    change = screenshot_manager.wait_for_change(threshold=10.0, timeout=0.05, interval=0.01)
+    assert not change['changed'] and change['latency_s'] >= 0.05, f"超时结果错误: {change}"
+    
+    # 提供基准帧时不再截取基准；since 把延迟起点提前到输入事件发出时
+    play(bright)
+    since = time.monotonic() - 0.2
+    change = screenshot_manager.wait_for_change(baseline=dark, since=since, threshold=10.0,
+                                                timeout=1.0, interval=0)
+    assert change['changed'] and change['frames'] == 1, f"基准帧未生效: {change}"
+    assert 0.2 <= change['latency_s'] < 0.3, f"延迟起点错误: {change['latency_s']}"
+    
+    # 稳定检测：动画结束后连续3帧不变
+    play(dark, bright, dark, bright, bright, bright, bright)
+    stable = screenshot_manager.wait_for_stable(stable_frames=3, timeout=1.0, interval=0)
+    assert stable['stable'] and stable['frames'] == 7 and stable['frame'] is bright, f"稳定检测错误: {stable}"
+    
+    # 一直闪烁的画面在超时前不会稳定
+    flicker = itertools.cycle([dark, bright])
+    screenshot_manager.grab = lambda region=None: next(flicker)
+    stable = screenshot_manager.wait_for_stable(stable_frames=3, timeout=0.05, interval=0.005)
+    assert not stable['stable'] and stable['elapsed_s'] >= 0.05, f"闪烁画面不应判定为稳定: {stable}"
+    
+    print("✅ 画面变化检测测试通过")
+    return True
+
+
 def run_integration_test():
     """运行集成测试"""
     print("🧪 运行集成测试...")
@@ -254,8 +1737,34 @@ def main():
     tests = [
         ("配置系统", test_config_system),
         ("日志系统", test_logger_system),
+        ("延迟导入", test_lazy_imports),
+        ("X11窗口后端", test_x11_backend),
+        ("进程跟踪器", test_process_tracker),
+        ("坐标映射器", test_coordinate_mapper),
+        ("拖拽路径规划", test_drag_planner),
+        ("输入后端", test_input_backend),
+        ("输入执行器", test_action_executor),
+        ("延迟跟踪", test_latency_tracker),
+        ("帧派生视图", test_frame_views),
+        ("模板匹配", test_template_matcher),
+        ("界面分类", test_screen_classifier),
+        ("界面布局索引", test_ui_layout),
+        ("OCR服务", test_ocr_service),
+        ("调色板查找表", test_palette_lut),
+        ("网格地图提取器", test_grid_extractor),
+        ("增量地图状态", test_map_state),
+        ("道路网络图", test_road_network),
+        ("多进程识别流水线", test_recognition_pipeline),
+        ("远程决策客户端", test_decision_client),
+        ("决策载荷编码", test_decision_payload),
+        ("决策流", test_decision_stream),
+        ("流水线游戏循环", test_game_loop),
+        ("主程序游戏循环", test_run_game_loop),
         ("窗口管理器", test_window_manager),
+        ("窗口查找", test_window_discovery),
+        ("窗口监视器", test_window_watcher),
         ("截图管理器", test_screenshot_manager),
+        ("画面变化检测", test_screen_change),
         ("集成测试", run_integration_test)
     ]
     